@@ -4,9 +4,16 @@
 import { useEffect, useRef, useState } from 'react';
 import { AnalysisResult, ThoughtMessage } from '@/types';
 
+export interface StreamedInsight {
+  agent: string;
+  kind: 'insights' | 'recommendations' | 'patterns' | 'bottlenecks';
+  item: any;
+}
+
 interface ProcessLensSocketOptions {
   taskId: string | null;
   onUpdate?: (data: AnalysisResult) => void;
+  onInsight?: (insight: StreamedInsight) => void;
   onError?: (error: any) => void;
   autoReconnect?: boolean;
   maxRetries?: number;
@@ -15,17 +22,19 @@ interface ProcessLensSocketOptions {
 interface SocketState {
   status: 'connecting' | 'connected' | 'disconnected' | 'error';
   data: AnalysisResult | null;
+  insights: StreamedInsight[];
   error?: any;
 }
 
 export const useProcessLensSocket = ({
   taskId,
   onUpdate,
+  onInsight,
   onError,
   autoReconnect = true,
   maxRetries = 5
 }: ProcessLensSocketOptions) => {
-  const [state, setState] = useState<SocketState>({ status: 'disconnected', data: null });
+  const [state, setState] = useState<SocketState>({ status: 'disconnected', data: null, insights: [] });
   const wsRef = useRef<WebSocket | null>(null);
   const retriesRef = useRef(0);
   const timeoutRef = useRef<NodeJS.Timeout | null>(null);
@@ -82,6 +91,13 @@ export const useProcessLensSocket = ({
               onUpdate?.(transformedData);
               break;
 
+            case 'insight':
+              // Partial model output, delivered before the analysis completes
+              const { taskId: _insightTask, ...insight } = data;
+              setState(prev => ({ ...prev, insights: [...prev.insights, insight] }));
+              onInsight?.(insight);
+              break;
+
             case 'error':
               console.error('Server error:', data);
               setState(prev => ({ ...prev, error: data }));
@@ -147,6 +163,7 @@ export const useProcessLensSocket = ({
 
   useEffect(() => {
     if (taskId) {
+      setState(prev => ({ ...prev, insights: [] }));
       connect();
     }
 
@@ -167,6 +184,7 @@ export const useProcessLensSocket = ({
     isConnected: state.status === 'connected',
     thoughts: state.data?.thoughts || [],
     results: state.data?.results || null,
+    insights: state.insights,
     latestThought: state.data?.thoughts?.[state.data.thoughts.length - 1],
     reconnect: () => {
       if (wsRef.current) {
@@ -58,6 +58,7 @@ export interface AnalysisResults {
 export interface AnalysisResult {
   taskId: string;
   status: "processing" | "completed" | "failed";
+  partial?: boolean;
   progress: number;
   thoughts: ThoughtMessage[];
   results?: AnalysisResults;
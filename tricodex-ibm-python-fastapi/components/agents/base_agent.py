@@ -1,19 +1,32 @@
 """
 Base agent class for all LLM agents
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from abc import ABC, abstractmethod
 import logging
 import json
 from datetime import datetime
-import pandas as pd
+from utils.deadline import within_deadline
+from utils.normalizer import normalize
+from utils.json_extractor import extract_json
+from utils.distributions import json_default
+from .circuit_breaker import CircuitOpenError
+from .hedging import Hedge, HedgeTarget
+from .response_cache import commit_responses, pending_responses
+from .streaming import IncrementalJSONParser, insight_listener
 
 logger = logging.getLogger(__name__)
 
 class BaseAgent(ABC):
+    name = "agent"
+    
     def __init__(self, timeout: int = 300):
         self.timeout = timeout
         self.start_time: Optional[datetime] = None
+        # Other provider to degrade to while this agent's circuit is open, and the
+        # hedge for slow calls; both set by the factory from Config.HEDGING
+        self.fallback: Optional[HedgeTarget] = None
+        self.hedge: Optional[Hedge] = None
         self._reset_state()
     
     def _reset_state(self) -> None:
@@ -31,11 +44,18 @@ class BaseAgent(ABC):
             self._validate_input_data(data)
             sanitized_data = self._sanitize_data(data)
             
-            # Execute analysis with progress tracking
-            result = await self._run_analysis(sanitized_data)
+            # Responses are only cached once the output built from them validates
+            with pending_responses() as fetched:
+                # Bounded by the agent timeout and the task's deadline, whichever is sooner
+                try:
+                    result = await within_deadline(self._run_analysis(sanitized_data), cap=self.timeout)
+                except TimeoutError:
+                    raise TimeoutError(f"{self.name} analysis ran out of time")
             
             # Validate output structure
             self._validate_output_structure(result)
+            if self._is_usable(result):
+                await commit_responses(fetched)
             return result
             
         except Exception as e:
@@ -69,27 +89,66 @@ class BaseAgent(ABC):
             logger.error(f"Invalid output structure: {output.keys()}")
             raise ValueError("Output missing required fields")
     
+    @staticmethod
+    def _is_usable(output: Dict[str, Any]) -> bool:
+        """Whether the model's answer parsed into findings worth replaying"""
+        return output.get("status") == "success" and any(
+            output.get(field) for field in ("insights", "patterns", "metrics", "recommendations")
+        )
+    
     def _sanitize_data(self, data: Any) -> Any:
-        """Recursively sanitize data"""
-        if isinstance(data, dict):
-            return {str(k): self._sanitize_data(v) for k, v in data.items()}
-        elif isinstance(data, list):
-            return [self._sanitize_data(item) for item in data]
-        elif isinstance(data, (pd.Timestamp, datetime)):
-            return data.isoformat()
-        elif pd.isna(data) or (isinstance(data, float) and pd.isna(data)):
-            return None
-        elif hasattr(data, 'to_dict'):
-            return self._sanitize_data(data.to_dict())
-        elif hasattr(data, 'item'):
-            return data.item()
-        return data
+        """Normalize data to plain JSON values"""
+        return normalize(data)
     
     @abstractmethod
     async def _run_analysis(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Implement specific analysis logic in subclasses"""
         pass
     
+    async def _complete(self, client: Any, prompt: str, model: str, params: Dict[str, Any]) -> str:
+        """Full completion text, streamed when an insight listener is active
+        
+        Insights, recommendations, patterns and bottlenecks are published to
+        the listener as soon as each one closes, before the response ends.
+        Calls are hedged to the agent's backup target when one is set, and
+        sent straight to the fallback while the client's circuit is open.
+        """
+        primary = HedgeTarget(client, model, params)
+        if self.fallback is None:
+            return await self._complete_with(primary, prompt, self.hedge)
+        if not client.breaker.allows_calls:
+            return await self._degrade(prompt, f"{client.provider} circuit is {client.breaker.state}")
+        try:
+            return await self._complete_with(primary, prompt, self.hedge)
+        except CircuitOpenError as e:
+            return await self._degrade(prompt, str(e))
+    
+    async def _degrade(self, prompt: str, reason: str) -> str:
+        logger.warning(f"{reason}; {self.name} agent degrades to {self.fallback.name}")
+        return await self._complete_with(self.fallback, prompt, None)
+    
+    async def _complete_with(self, target: HedgeTarget, prompt: str, hedge: Optional[Hedge]) -> str:
+        listener = insight_listener()
+        if listener is None:
+            if hedge is not None:
+                return await hedge.generate(target, prompt)
+            return await target.client.generate(prompt, target.model, target.params)
+        
+        parser = IncrementalJSONParser()
+        parts = []
+        if hedge is not None:
+            chunks = hedge.stream(target, prompt)
+        else:
+            chunks = target.client.stream(prompt, target.model, target.params)
+        async for chunk in chunks:
+            parts.append(chunk)
+            for kind, item in parser.feed(chunk):
+                try:
+                    await listener({"agent": self.name, "kind": kind, "item": item})
+                except Exception as e:
+                    logger.warning(f"Failed to publish streamed {kind}: {e}")
+        return "".join(parts)
+    
     def _check_timeout(self) -> None:
         """Check if analysis has exceeded timeout"""
         if not self.start_time:
@@ -134,27 +193,78 @@ class BaseAgent(ABC):
             return 0.0
         return (datetime.now() - self.start_time).total_seconds()
     
+    @staticmethod
+    def _format_process_context(data: Dict[str, Any]) -> str:
+        """Render the mined process summary as a prompt section"""
+        summary = data.get("process_mining") or data.get("context", {}).get("process_mining")
+        if not summary:
+            return ""
+        return f"""
+        Process Mining Summary (directly-follows relations and variants computed from the event log):
+        {json.dumps(summary, indent=2, default=json_default)}
+        """
+    
+    @staticmethod
+    def _format_anomaly_context(data: Dict[str, Any]) -> str:
+        """Render locally flagged anomalies as a prompt section"""
+        anomalies = data.get("anomalies") or data.get("context", {}).get("anomalies")
+        if not anomalies:
+            return ""
+        return f"""
+        Anomalies (flagged locally with robust z-scores, IQR fences and volume baselines; explain likely causes):
+        {json.dumps(anomalies, indent=2, default=json_default)}
+        """
+    
+    @staticmethod
+    def _format_sla_context(data: Dict[str, Any]) -> str:
+        """Render SLA metrics per single dimension as a prompt section"""
+        sla = data.get("sla") or data.get("context", {}).get("sla")
+        if not sla:
+            return ""
+        groups = {label: entries for label, entries in sla.get("groups", {}).items() if " x " not in label}
+        medians = {
+            label: curve.get("median_hours") if label == "overall" else {key: value.get("median_hours") for key, value in curve.items()}
+            for label, curve in (sla.get("survival") or {}).items()
+        }
+        return f"""
+        SLA Metrics (hours; breach rates against targets {json.dumps(sla.get("targets_hours"), default=json_default)}):
+        {json.dumps({"basis": sla.get("basis"), "groups": groups, "median_hours_to_resolution": medians}, indent=2, default=json_default)}
+        """
+    
+    @staticmethod
+    def _measured_bottlenecks(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Bottleneck transitions computed from the event log, if any"""
+        summary = data.get("process_mining") or data.get("context", {}).get("process_mining") or {}
+        return summary.get("performance", {}).get("bottlenecks", [])
+    
+    def _bottleneck_instruction(self, data: Dict[str, Any]) -> str:
+        """Ask the model to explain measured bottlenecks rather than guess them"""
+        if self._measured_bottlenecks(data):
+            return "Explanation of the measured bottleneck transitions in the process mining summary (do not invent others)"
+        return "Bottleneck Identification"
+    
     @staticmethod
     def _validate_json(text: str) -> Dict[str, Any]:
         """Safely parse JSON from text"""
-        try:
-            return json.loads(text)
-        except json.JSONDecodeError:
-            # Attempt to extract JSON-like structure from text
-            sections = {}
-            current_section = None
-            current_items = []
+        parsed = extract_json(text)
+        if parsed is not None:
+            return parsed
+        
+        # No JSON object at all: fall back to "section:" headings with "- item" lists
+        sections = {}
+        current_section = None
+        current_items = []
+        
+        for line in text.split("\n"):
+            if ":" in line and not line.strip().startswith("-"):
+                if current_section and current_items:
+                    sections[current_section] = current_items
+                current_section = line.split(":")[0].strip().lower()
+                current_items = []
+            elif line.strip().startswith("-"):
+                current_items.append(line.strip("- ").strip())
+        
+        if current_section and current_items:
+            sections[current_section] = current_items
             
-            for line in text.split("\n"):
-                if ":" in line and not line.strip().startswith("-"):
-                    if current_section and current_items:
-                        sections[current_section] = current_items
-                    current_section = line.split(":")[0].strip().lower()
-                    current_items = []
-                elif line.strip().startswith("-"):
-                    current_items.append(line.strip("- ").strip())
-            
-            if current_section and current_items:
-                sections[current_section] = current_items
-                
-            return sections
\ No newline at end of file
+        return sections
\ No newline at end of file
@@ -0,0 +1,217 @@
+"""
+Per-provider circuit breakers: fail fast while a provider is degraded, probe to recover
+"""
+from typing import Dict, Any, Deque, Optional, Tuple
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+import logging
+import time
+from config import Config
+from utils.helpers import ModelError
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Client errors say nothing about the provider's health, except timeouts and throttling
+_CLIENT_ERRORS = range(400, 500)
+_OVERLOAD_STATUSES = {408, 429}
+
+
+class CircuitOpenError(ModelError):
+    """Raised instead of calling a provider whose circuit is open"""
+    pass
+
+
+@dataclass(frozen=True)
+class BreakerSettings:
+    error_rate: float = 0.5
+    slow_call_seconds: float = 60.0
+    slow_call_rate: float = 0.5
+    min_calls: int = 10
+    window_seconds: float = 60.0
+    open_seconds: float = 30.0
+    half_open_probes: int = 2
+
+
+class _Attempt:
+    __slots__ = ("started", "probe", "generation", "latency")
+
+    def __init__(self, probe: bool, generation: int = 0):
+        self.started = time.monotonic()
+        self.probe = probe
+        # Half-open period the probe was admitted in
+        self.generation = generation
+        self.latency: Optional[float] = None
+
+    def first_chunk(self) -> None:
+        """Judge a streamed call by its time to first chunk"""
+        if self.latency is None:
+            self.latency = time.monotonic() - self.started
+
+
+def _counts_as_failure(error: Exception) -> bool:
+    """Transport errors, timeouts, overload and server errors; not bad requests"""
+    status = getattr(error, "details", {}).get("status") if isinstance(error, ModelError) else None
+    return status is None or status not in _CLIENT_ERRORS or status in _OVERLOAD_STATUSES
+
+
+class CircuitBreaker:
+    """Closed, open and half-open states over a rolling window of call outcomes
+
+    The circuit opens when, over the last ``window_seconds`` and at least
+    ``min_calls`` calls, the failure rate or the share of calls slower than
+    ``slow_call_seconds`` reaches its threshold. While open, calls fail at
+    once with CircuitOpenError. After ``open_seconds`` up to
+    ``half_open_probes`` calls are let through; if all succeed in time the
+    circuit closes, and any failure opens it again.
+    """
+
+    def __init__(self, provider: str, settings: BreakerSettings = BreakerSettings()):
+        self.provider = provider
+        self.settings = settings
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._outcomes: Deque[Tuple[float, bool, bool]] = deque()
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._generation = 0
+        self.counters = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.settings.open_seconds:
+            self._state = HALF_OPEN
+            self._generation += 1
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+            logger.info(f"Circuit for {self.provider} half-open; probing")
+        return self._state
+
+    @contextmanager
+    def attempt(self):
+        """Admit one provider call, or raise CircuitOpenError, and record how it went"""
+        call = self._admit()
+        try:
+            yield call
+        except Exception as e:
+            self._finish(call, failed=_counts_as_failure(e))
+            raise
+        except BaseException:
+            # Cancelled by the caller (deadline, losing hedge): no verdict on the provider
+            self._release_probe(call)
+            raise
+        else:
+            self._finish(call, failed=False)
+
+    def check(self) -> None:
+        """Raise CircuitOpenError now if a call would not be admitted"""
+        if not self.allows_calls:
+            self._reject()
+
+    def _admit(self) -> _Attempt:
+        state = self.state
+        if state == CLOSED:
+            return _Attempt(probe=False)
+        if state == HALF_OPEN and self._probes_in_flight < self.settings.half_open_probes:
+            self._probes_in_flight += 1
+            return _Attempt(probe=True, generation=self._generation)
+        self._reject()
+
+    def _reject(self) -> None:
+        self.counters["rejected"] += 1
+        state = self.state
+        raise CircuitOpenError(
+            f"{self.provider} circuit is {state}; failing fast",
+            {"provider": self.provider, "state": state, "retry_in": self._retry_in()}
+        )
+
+    def _retry_in(self) -> float:
+        return round(max(0.0, self.settings.open_seconds - (time.monotonic() - self._opened_at)), 1)
+
+    def _finish(self, call: _Attempt, failed: bool) -> None:
+        now = time.monotonic()
+        latency = call.latency if call.latency is not None else now - call.started
+        slow = latency >= self.settings.slow_call_seconds
+        self.counters["calls"] += 1
+        self.counters["failures"] += failed
+
+        if call.probe:
+            if not self._release_probe(call) or self._state != HALF_OPEN:
+                # A probe from an earlier half-open period says nothing about this one
+                return
+            if failed or slow:
+                self._open(now, "probe failed" if failed else f"probe took {latency:.1f}s")
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.settings.half_open_probes:
+                self._state = CLOSED
+                self._outcomes.clear()
+                logger.info(f"Circuit for {self.provider} closed")
+            return
+
+        if self._state != CLOSED:
+            return
+        self._outcomes.append((now, failed, slow))
+        cutoff = now - self.settings.window_seconds
+        while self._outcomes and self._outcomes[0][0] < cutoff:
+            self._outcomes.popleft()
+        calls = len(self._outcomes)
+        if calls < self.settings.min_calls:
+            return
+        failure_rate = sum(outcome[1] for outcome in self._outcomes) / calls
+        slow_rate = sum(outcome[2] for outcome in self._outcomes) / calls
+        if failure_rate >= self.settings.error_rate:
+            self._open(now, f"failure rate {failure_rate:.0%} over {calls} calls")
+        elif slow_rate >= self.settings.slow_call_rate:
+            self._open(now, f"{slow_rate:.0%} of {calls} calls slower than {self.settings.slow_call_seconds:.0f}s")
+
+    def _release_probe(self, call: _Attempt) -> bool:
+        """Free the probe's slot; False for probes admitted before the current half-open period"""
+        if not call.probe or call.generation != self._generation:
+            return False
+        self._probes_in_flight = max(0, self._probes_in_flight - 1)
+        return True
+
+    def _open(self, now: float, reason: str) -> None:
+        self._state = OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self.counters["opened"] += 1
+        logger.warning(f"Circuit for {self.provider} opened: {reason}")
+
+    @property
+    def allows_calls(self) -> bool:
+        state = self.state
+        return state == CLOSED or (state == HALF_OPEN and self._probes_in_flight < self.settings.half_open_probes)
+
+    def status(self) -> Dict[str, Any]:
+        state = self.state
+        calls = len(self._outcomes)
+        status = {
+            "state": state,
+            "window_calls": calls,
+            "failure_rate": sum(outcome[1] for outcome in self._outcomes) / calls if calls else 0.0,
+            "slow_rate": sum(outcome[2] for outcome in self._outcomes) / calls if calls else 0.0,
+            **self.counters
+        }
+        if state == OPEN:
+            status["retry_in"] = self._retry_in()
+        return status
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(provider: str) -> CircuitBreaker:
+    """Shared breaker for every client of a provider"""
+    if provider not in _breakers:
+        _breakers[provider] = CircuitBreaker(provider, BreakerSettings(**Config.CIRCUIT_BREAKER))
+    return _breakers[provider]
+
+
+def breaker_status() -> Dict[str, Dict[str, Any]]:
+    return {provider: breaker.status() for provider, breaker in _breakers.items()}
@@ -0,0 +1,410 @@
+"""
+Shared async LLM clients with pooled connections and bounded concurrency
+"""
+from typing import Dict, Any, Optional, AsyncIterator, Tuple
+from abc import ABC, abstractmethod
+import asyncio
+import importlib.util
+import json
+import logging
+import time
+import httpx
+from utils.helpers import ModelError
+from utils.singleflight import SingleFlight
+from .circuit_breaker import get_circuit_breaker
+from .rate_limiter import get_rate_limiter, estimate_tokens, RateLimiter
+from .response_cache import get_response_cache, remember_response, response_key, close_response_cache
+
+logger = logging.getLogger(__name__)
+
+# Multiplex requests over one connection per provider when h2 is installed
+_HTTP2 = importlib.util.find_spec("h2") is not None
+
+# Identical prompts in flight across all clients and agents
+_prompt_flights = SingleFlight()
+_END_OF_STREAM = object()
+
+
+def _http_client(base_url: str, max_concurrency: int, timeout: float) -> httpx.AsyncClient:
+    """Keep-alive connection pool sized to the provider's concurrency cap"""
+    return httpx.AsyncClient(
+        base_url=base_url,
+        http2=_HTTP2,
+        timeout=httpx.Timeout(timeout, connect=10.0),
+        limits=httpx.Limits(
+            max_connections=max_concurrency,
+            max_keepalive_connections=max_concurrency,
+            keepalive_expiry=300.0
+        )
+    )
+
+
+def _retry_after(response: httpx.Response, default: float = 5.0) -> float:
+    try:
+        return float(response.headers.get("retry-after", default))
+    except ValueError:
+        return default
+
+
+def _raise_for_status(provider: str, response: httpx.Response, limiter: Optional[RateLimiter] = None) -> None:
+    if response.status_code == 429 and limiter is not None:
+        limiter.penalize(_retry_after(response))
+    if response.is_error:
+        raise ModelError(
+            f"{provider} request failed with status {response.status_code}",
+            {"provider": provider, "status": response.status_code, "body": response.text[:500]}
+        )
+
+
+async def _sse_events(response: httpx.Response) -> AsyncIterator[Dict[str, Any]]:
+    """JSON payloads of a server-sent event stream"""
+    async for line in response.aiter_lines():
+        if line.startswith("data:"):
+            data = line[5:].strip()
+            if data and data != "[DONE]":
+                yield json.loads(data)
+
+
+class LLMClient(ABC):
+    """Pooled provider client; identical requests are answered from the response cache"""
+
+    provider = ""
+    max_tokens_param = ""
+
+    def __init__(self, base_url: str, max_concurrency: int, timeout: float):
+        self.max_concurrency = max_concurrency
+        self._http = _http_client(base_url, max_concurrency, timeout)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.breaker = get_circuit_breaker(self.provider)
+
+    @property
+    def in_flight(self) -> int:
+        return self.max_concurrency - self._semaphore._value
+
+    async def generate(self, prompt: str, model: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Generated text for a prompt"""
+        params = params or {}
+        key = response_key(self.provider, model, params, prompt)
+        cache = get_response_cache()
+        if cache is not None:
+            cached = await cache.get(key)
+            if cached is not None:
+                return cached
+        # Identical prompts already in flight share one provider call
+        return await _prompt_flights.do(key, lambda: self._fetch(key, prompt, model, params))
+
+    async def _fetch(self, key: str, prompt: str, model: str, params: Dict[str, Any]) -> str:
+        text = await self._generate(prompt, model, params)
+        await remember_response(key, text)
+        return text
+
+    async def stream(self, prompt: str, model: str, params: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Text chunks as they are generated
+
+        Cached responses, and responses to an identical prompt already in
+        flight, arrive as one chunk once complete.
+        """
+        params = params or {}
+        key = response_key(self.provider, model, params, prompt)
+        cache = get_response_cache()
+        if cache is not None:
+            cached = await cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        flight = _prompt_flights.in_flight(key)
+        if flight is not None:
+            _prompt_flights.coalesced += 1
+            yield await _prompt_flights.wait(flight)
+            return
+
+        # The provider stream runs in its own task, so a leader that stops
+        # early (a losing hedge, a disconnect) does not end it for followers
+        future = _prompt_flights.lead(key)
+        chunks: asyncio.Queue = asyncio.Queue()
+        producer = asyncio.ensure_future(self._produce(key, prompt, model, params, chunks, future))
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is _END_OF_STREAM:
+                    break
+                yield chunk
+            future.result()
+        finally:
+            if not producer.done() and not _prompt_flights.waiters(future):
+                producer.cancel()
+
+    async def _produce(self, key: str, prompt: str, model: str, params: Dict[str, Any],
+                       chunks: asyncio.Queue, future: asyncio.Future) -> None:
+        """Feed provider chunks to the leader and resolve the shared flight"""
+        parts = []
+        try:
+            async for chunk in self._stream(prompt, model, params):
+                parts.append(chunk)
+                chunks.put_nowait(chunk)
+            text = "".join(parts)
+            await remember_response(key, text)
+            if not future.done():
+                future.set_result(text)
+        except asyncio.CancelledError:
+            if not future.done():
+                future.set_exception(ModelError("Streaming generation was abandoned", {"provider": self.provider}))
+            raise
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        finally:
+            chunks.put_nowait(_END_OF_STREAM)
+
+    async def _reserve(self, prompt: str, model: str, params: Dict[str, Any]) -> Tuple[RateLimiter, int]:
+        """Wait for rate limit budget covering the prompt and the output cap
+
+        Fails fast, before queueing, while the provider's circuit is open.
+        """
+        self.breaker.check()
+        limiter = get_rate_limiter(self.provider, model)
+        reserved = estimate_tokens(prompt) + int(params.get(self.max_tokens_param, 0))
+        await limiter.acquire(reserved)
+        return limiter, reserved
+
+    @abstractmethod
+    async def _generate(self, prompt: str, model: str, params: Dict[str, Any]) -> str:
+        """Completion text from the provider"""
+        pass
+
+    @abstractmethod
+    def _stream(self, prompt: str, model: str, params: Dict[str, Any]) -> AsyncIterator[str]:
+        """Text chunks from the provider's streaming endpoint"""
+        pass
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+
+class WatsonxClient(LLMClient):
+    """Async watsonx.ai text generation with a cached IAM token"""
+
+    provider = "watson"
+    max_tokens_param = "max_new_tokens"
+
+    IAM_URL = "https://iam.cloud.ibm.com/identity/token"
+    API_VERSION = "2023-05-29"
+
+    def __init__(self, api_key: str, project_id: str, url: str, max_concurrency: int = 8, timeout: float = 120.0):
+        super().__init__(url, max_concurrency, timeout)
+        self.api_key = api_key
+        self.project_id = project_id
+        self._token: Optional[str] = None
+        self._token_expiry = 0.0
+        self._token_lock = asyncio.Lock()
+
+    async def _bearer_token(self) -> str:
+        """IAM access token, refreshed a minute before it expires"""
+        if self._token and time.time() < self._token_expiry - 60:
+            return self._token
+        async with self._token_lock:
+            if self._token and time.time() < self._token_expiry - 60:
+                return self._token
+            response = await self._http.post(
+                self.IAM_URL,
+                data={"grant_type": "urn:ibm:params:oauth:grant-type:apikey", "apikey": self.api_key},
+                headers={"Accept": "application/json"}
+            )
+            _raise_for_status("watsonx-iam", response)
+            payload = response.json()
+            self._token = payload["access_token"]
+            self._token_expiry = float(payload.get("expiration") or time.time() + payload.get("expires_in", 3600))
+            return self._token
+
+    def _body(self, prompt: str, model_id: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "model_id": model_id,
+            "project_id": self.project_id,
+            "input": prompt,
+            "parameters": parameters
+        }
+
+    @staticmethod
+    def _usage(result: Dict[str, Any]) -> Optional[int]:
+        if "generated_token_count" not in result:
+            return None
+        return result.get("input_token_count", 0) + result["generated_token_count"]
+
+    async def _generate(self, prompt: str, model_id: str, parameters: Dict[str, Any]) -> str:
+        limiter, reserved = await self._reserve(prompt, model_id, parameters)
+        async with self._semaphore:
+            with self.breaker.attempt():
+                for attempt in range(2):
+                    token = await self._bearer_token()
+                    response = await self._http.post(
+                        "/ml/v1/text/generation",
+                        params={"version": self.API_VERSION},
+                        headers={"Authorization": f"Bearer {token}", "Accept": "application/json"},
+                        json=self._body(prompt, model_id, parameters)
+                    )
+                    if response.status_code == 401 and attempt == 0:
+                        # Token revoked or expired early; fetch a new one once
+                        self._token = None
+                        continue
+                    _raise_for_status("watsonx", response, limiter)
+                    result = (response.json().get("results") or [{}])[0]
+                    limiter.settle(reserved, self._usage(result))
+                    return result.get("generated_text", "")
+        return ""
+
+    async def _stream(self, prompt: str, model_id: str, parameters: Dict[str, Any]) -> AsyncIterator[str]:
+        limiter, reserved = await self._reserve(prompt, model_id, parameters)
+        async with self._semaphore:
+            with self.breaker.attempt() as call:
+                for attempt in range(2):
+                    token = await self._bearer_token()
+                    async with self._http.stream(
+                        "POST",
+                        "/ml/v1/text/generation_stream",
+                        params={"version": self.API_VERSION},
+                        headers={"Authorization": f"Bearer {token}", "Accept": "text/event-stream"},
+                        json=self._body(prompt, model_id, parameters)
+                    ) as response:
+                        if response.status_code == 401 and attempt == 0:
+                            self._token = None
+                            continue
+                        if response.is_error:
+                            await response.aread()
+                            _raise_for_status("watsonx", response, limiter)
+                        used = None
+                        async for event in _sse_events(response):
+                            result = (event.get("results") or [{}])[0]
+                            used = self._usage(result) or used
+                            if result.get("generated_text"):
+                                call.first_chunk()
+                                yield result["generated_text"]
+                        limiter.settle(reserved, used)
+                        return
+
+
+class GeminiClient(LLMClient):
+    """Async Gemini generateContent calls over the REST API"""
+
+    provider = "gemini"
+    max_tokens_param = "max_output_tokens"
+    BASE_URL = "https://generativelanguage.googleapis.com"
+
+    def __init__(self, api_key: str, api_version: str = "v1beta", max_concurrency: int = 8, timeout: float = 120.0):
+        super().__init__(self.BASE_URL, max_concurrency, timeout)
+        self.api_key = api_key
+        self.api_version = api_version
+
+    @staticmethod
+    def _generation_config(params: Dict[str, Any]) -> Dict[str, Any]:
+        """snake_case generation params as the camelCase fields the API expects"""
+        def camel(name: str) -> str:
+            head, *rest = name.split("_")
+            return head + "".join(part.title() for part in rest)
+        return {camel(key): value for key, value in params.items()}
+
+    def _body(self, prompt: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": self._generation_config(params)
+        }
+
+    @staticmethod
+    def _text(payload: Dict[str, Any]) -> Optional[str]:
+        """Concatenated text of the first candidate, None when there is none"""
+        candidates = payload.get("candidates") or []
+        if not candidates:
+            return None
+        parts = candidates[0].get("content", {}).get("parts", [])
+        return "".join(part.get("text", "") for part in parts)
+
+    async def _generate(self, prompt: str, model: str, params: Dict[str, Any]) -> str:
+        limiter, reserved = await self._reserve(prompt, model, params)
+        async with self._semaphore:
+            with self.breaker.attempt():
+                response = await self._http.post(
+                    f"/{self.api_version}/models/{model}:generateContent",
+                    headers={"x-goog-api-key": self.api_key},
+                    json=self._body(prompt, params)
+                )
+                _raise_for_status("gemini", response, limiter)
+        payload = response.json()
+        limiter.settle(reserved, payload.get("usageMetadata", {}).get("totalTokenCount"))
+        text = self._text(payload)
+        if text is None:
+            raise ModelError("Gemini returned no candidates", {"provider": "gemini", "body": response.text[:500]})
+        return text
+
+    async def _stream(self, prompt: str, model: str, params: Dict[str, Any]) -> AsyncIterator[str]:
+        limiter, reserved = await self._reserve(prompt, model, params)
+        async with self._semaphore:
+            with self.breaker.attempt() as call:
+                async with self._http.stream(
+                    "POST",
+                    f"/{self.api_version}/models/{model}:streamGenerateContent",
+                    params={"alt": "sse"},
+                    headers={"x-goog-api-key": self.api_key},
+                    json=self._body(prompt, params)
+                ) as response:
+                    if response.is_error:
+                        await response.aread()
+                        _raise_for_status("gemini", response, limiter)
+                    used = None
+                    async for payload in _sse_events(response):
+                        used = payload.get("usageMetadata", {}).get("totalTokenCount", used)
+                        text = self._text(payload)
+                        if text:
+                            call.first_chunk()
+                            yield text
+                    limiter.settle(reserved, used)
+
+
+# One client, and so one connection pool, per provider and credential
+_clients: Dict[str, LLMClient] = {}
+
+
+def get_watsonx_client(config: Dict[str, Any]) -> WatsonxClient:
+    """Shared watsonx client for these credentials"""
+    key = f"watsonx:{config['url']}:{config['project_id']}:{config['api_key']}"
+    if key not in _clients:
+        _clients[key] = WatsonxClient(
+            api_key=config["api_key"],
+            project_id=config["project_id"],
+            url=config["url"],
+            max_concurrency=config.get("max_concurrency", 8)
+        )
+    return _clients[key]
+
+
+def get_gemini_client(config: Dict[str, Any]) -> GeminiClient:
+    """Shared Gemini client for this API key"""
+    api_version = (config.get("http_options") or {}).get("api_version", "v1beta")
+    key = f"gemini:{api_version}:{config['api_key']}"
+    if key not in _clients:
+        _clients[key] = GeminiClient(
+            api_key=config["api_key"],
+            api_version=api_version,
+            max_concurrency=config.get("max_concurrency", 8)
+        )
+    return _clients[key]
+
+
+def client_status() -> Dict[str, Dict[str, Any]]:
+    """In-flight requests per shared client, without credentials"""
+    status = {
+        key.split(":", 1)[0] + f"#{index}": {"in_flight": client.in_flight, "max_concurrency": client.max_concurrency}
+        for index, (key, client) in enumerate(_clients.items())
+    }
+    status["coalesced_prompts"] = _prompt_flights.stats()
+    return status
+
+
+async def close_clients() -> None:
+    """Close every pooled connection; called on application shutdown"""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"Failed to close LLM client: {e}")
+    close_response_cache()
@@ -6,9 +6,10 @@ from datetime import datetime
 import logging
 import asyncio
 import os
-from beeai_framework import BaseAgent
-from langchain_ibm import WatsonxLLM
-from google import genai  # Updated Gemini import
+from .base_agent import BaseAgent
+from .clients import close_clients, get_watsonx_client, get_gemini_client
+from .hedging import HedgeTarget, register_hedge
+from .response_cache import bypass_response_cache
 from .watson_agent import WatsonAgent
 from .gemini_agent import GeminiAgent
 from .function_calling_agent import FunctionCallingAgent
@@ -35,6 +36,7 @@ class AgentFactory:
                 "api_key": os.getenv("IBM_API_KEY"),
                 "project_id": os.getenv("PROJECT_ID"),
                 "url": os.getenv("WATSONX_URL", "https://us-south.ml.cloud.ibm.com"),
+                "max_concurrency": Config.WATSON_CONFIG["max_concurrency"],
                 "params": {
                     "decoding_method": "greedy",
                     "max_new_tokens": 1024,
@@ -51,6 +53,8 @@ class AgentFactory:
             gemini_config = {
                 "api_key": os.getenv("GOOGLE_API_KEY"),
                 "model": "gemini-2.0-flash",
+                "params": Config.GEMINI_CONFIG["params"],
+                "max_concurrency": Config.GEMINI_CONFIG["max_concurrency"],
                 "http_options": {"api_version": "v1alpha"}
             }
 
@@ -66,9 +70,14 @@ class AgentFactory:
             # Create instances
             cls._instances["watson"] = await cls._create_agent("watson", watson_config)
             cls._instances["gemini"] = await cls._create_agent("gemini", gemini_config)
+            cls._instances["function"] = FunctionCallingAgent(
+                cls._instances["watson"], cls._instances["gemini"]
+            )
+            cls._configure_backups({"watson": watson_config, "gemini": gemini_config})
 
-            # Test connections
-            for agent_type, agent in cls._instances.items():
+            # Test connections; the function agent only wraps the other two
+            for agent_type in ("watson", "gemini"):
+                agent = cls._instances[agent_type]
                 if not await cls._test_agent(agent, agent_type):
                     errors.append(f"Connection test failed for {agent_type}")
 
@@ -108,6 +117,27 @@ class AgentFactory:
             
         return True
 
+    @classmethod
+    def _configure_backups(cls, configs: Dict[str, Dict[str, Any]]) -> None:
+        """Give each stage with a configured backup a fallback and, if enabled, a hedge"""
+        for stage, settings in Config.HEDGING.items():
+            agent = cls._instances.get(stage)
+            provider, _, model = settings["backup"].partition(":")
+            if agent is None or provider not in configs:
+                continue
+            config = configs[provider]
+            if provider == "watson":
+                backup = HedgeTarget(get_watsonx_client(config), model or config["model_id"], config.get("params", {}))
+            else:
+                backup = HedgeTarget(get_gemini_client(config), model or config["model"], config.get("params", {}))
+            agent.fallback = backup
+            if Config.HEDGE_ENABLED:
+                agent.hedge = register_hedge(
+                    stage, backup, Config.HEDGE_BUDGET,
+                    percentile=settings["percentile"], min_delay=settings["min_delay"]
+                )
+            logger.info(f"{stage} calls fall back{' and are hedged' if agent.hedge else ''} to {backup.name}")
+
     @classmethod
     async def _test_agent(cls, agent: Union[WatsonAgent, GeminiAgent, FunctionCallingAgent], 
                          agent_type: str) -> bool:
@@ -127,10 +157,15 @@ class AgentFactory:
             }
             
             logger.info(f"Starting connection test for {agent_type}")
-            await asyncio.wait_for(
-                agent.analyze(test_input), 
-                timeout=60.0  # Increased timeout for initial connection
-            )
+            # A cached answer would say nothing about connectivity
+            with bypass_response_cache():
+                result = await asyncio.wait_for(
+                    agent.analyze(test_input), 
+                    timeout=60.0  # Increased timeout for initial connection
+                )
+            if result.get("status") == "error":
+                logger.error(f"Connection test failed for {agent_type}: {result.get('error')}")
+                return False
             logger.info(f"Connection test successful for {agent_type}")
             return True
             
@@ -142,20 +177,15 @@ class AgentFactory:
             return False
 
     @classmethod
-    async def _create_agent(cls, agent_type: str, timeout: int = 300) -> BaseAgent:
+    async def _create_agent(cls, agent_type: str, config: Optional[Dict[str, Any]] = None,
+                            timeout: int = 300) -> BaseAgent:
         """Create an agent instance with proper initialization"""
         try:
-            config = Config.get_model_config(agent_type)
+            config = config or Config.get_model_config(agent_type)
             
             if agent_type == "watson":
                 logger.info("Creating watson agent")
-                return WatsonAgent(
-                    model_id=config["model_id"],
-                    api_key=config["api_key"],
-                    project_id=config["project_id"],
-                    url=config["url"],
-                    timeout=timeout
-                )
+                return WatsonAgent(config=config, timeout=timeout)
                 
             elif agent_type == "gemini":
                 logger.info("Creating gemini agent")
@@ -188,6 +218,12 @@ class AgentFactory:
         cls._initialization_time.clear()
         logger.info("All agent instances reset")
 
+    @classmethod
+    async def shutdown(cls) -> None:
+        """Reset agents and close the shared LLM connection pools"""
+        cls.reset_agents()
+        await close_clients()
+
     @classmethod
     def get_agent_status(cls) -> Dict[str, Any]:
         """Get status of all agents"""
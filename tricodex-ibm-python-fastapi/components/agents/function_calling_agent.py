@@ -15,16 +15,19 @@ logger = logging.getLogger(__name__)
 
 class FunctionCallingAgent(BaseAgent):
     """Agent with function calling capabilities combining Watson and Gemini"""
+    name = "function"
     
     def __init__(self, watson_agent: WatsonAgent, gemini_agent: GeminiAgent, timeout: int = 300):
         super().__init__(timeout)
         self.watson = watson_agent
         self.gemini = gemini_agent
         self._api_calls = 0
-        self._last_call_time = 0
         
     async def _run_analysis(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute combined analysis using both Watson and Gemini"""
+        """Synthesize given Watson and Gemini results, or run both and combine them"""
+        if data.get("task") == "synthesize_results":
+            return await self._synthesize(data.get("watson_results"), data.get("gemini_results"))
+        
         try:
             logger.info("Starting combined analysis")
             start_time = time.time()
@@ -40,21 +43,7 @@ class FunctionCallingAgent(BaseAgent):
                 return_exceptions=True
             )
             
-            # Handle potential errors
-            if isinstance(watson_result, Exception):
-                logger.error(f"Watson analysis failed: {watson_result}")
-                watson_result = {}
-            if isinstance(gemini_result, Exception):
-                logger.error(f"Gemini analysis failed: {gemini_result}")
-                gemini_result = {}
-                
-            # Merge and enhance results
-            combined_results = await self._merge_results(watson_result, gemini_result)
-            
-            # Add meta-analysis
-            if combined_results:
-                meta_insights = await self._generate_meta_insights(combined_results)
-                combined_results["meta_analysis"] = meta_insights
+            combined_results = await self._synthesize(watson_result, gemini_result)
             
             execution_time = time.time() - start_time
             logger.info(f"Combined analysis completed in {execution_time:.2f}s")
@@ -64,6 +53,52 @@ class FunctionCallingAgent(BaseAgent):
         except Exception as e:
             logger.error(f"Combined analysis failed: {e}")
             raise
+    
+    def _validate_input_data(self, data: Dict[str, Any]) -> None:
+        """Synthesis takes upstream agent results instead of raw metadata and metrics"""
+        if isinstance(data, dict) and data.get("task") == "synthesize_results":
+            missing = {"watson_results", "gemini_results"} - set(data.keys())
+            if missing:
+                raise ValueError(f"Missing required fields: {missing}")
+            return
+        super()._validate_input_data(data)
+    
+    async def _synthesize(self, watson_result: Any, gemini_result: Any) -> Dict[str, Any]:
+        """Merge already computed agent results and add the meta-analysis, without new LLM calls"""
+        watson_result = self._usable_result("watson", watson_result)
+        gemini_result = self._usable_result("gemini", gemini_result)
+        if not watson_result and not gemini_result:
+            logger.warning("No usable Watson or Gemini result to synthesize")
+            return {
+                "status": "skipped",
+                "reason": "No usable Watson or Gemini result to synthesize",
+                "insights": [],
+                "patterns": [],
+                "metrics": {},
+                "recommendations": [],
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        # Merge and enhance results
+        combined_results = await self._merge_results(watson_result, gemini_result)
+        
+        # Add meta-analysis
+        structured = self._structure_output(combined_results)
+        structured["meta_analysis"] = await self._generate_meta_insights(combined_results)
+        return structured
+    
+    @staticmethod
+    def _usable_result(source: str, result: Any) -> Dict[str, Any]:
+        """Agent result to merge, empty when the agent failed"""
+        if isinstance(result, Exception):
+            logger.error(f"{source.capitalize()} analysis failed: {result}")
+            return {}
+        if not isinstance(result, dict):
+            return {}
+        if result.get("status") == "error":
+            logger.warning(f"Skipping failed {source} result: {result.get('error')}")
+            return {}
+        return result
             
     async def _merge_results(self, watson_results: Dict[str, Any], gemini_results: Dict[str, Any]) -> Dict[str, Any]:
         """Merge and reconcile results from both models"""
@@ -86,6 +121,8 @@ class FunctionCallingAgent(BaseAgent):
             seen_patterns = set()
             
             for pattern in watson_results.get("patterns", []) + gemini_results.get("patterns", []):
+                if not isinstance(pattern, dict):
+                    pattern = {"name": str(pattern)}
                 pattern_key = f"{pattern.get('name', '')}_{pattern.get('type', '')}"
                 if pattern_key not in seen_patterns:
                     seen_patterns.add(pattern_key)
@@ -97,6 +134,10 @@ class FunctionCallingAgent(BaseAgent):
             all_metrics = {}
             for source, results in [("watson", watson_results), ("gemini", gemini_results)]:
                 for key, metric in results.get("metrics", {}).items():
+                    if not isinstance(metric, dict):
+                        metric = {"value": metric}
+                    if not isinstance(metric.get("value", 0), (int, float)):
+                        continue
                     if key not in all_metrics:
                         all_metrics[key] = {"values": [], "units": set()}
                     all_metrics[key]["values"].append(metric.get("value", 0))
@@ -115,8 +156,11 @@ class FunctionCallingAgent(BaseAgent):
             # Combine recommendations with source tracking
             for source, results in [("watson", watson_results), ("gemini", gemini_results)]:
                 for rec in results.get("recommendations", []):
-                    rec["source"] = source
-                    merged["recommendations"].append(rec)
+                    # Copied, so the upstream agent results stay as they were
+                    if isinstance(rec, dict):
+                        merged["recommendations"].append({**rec, "source": source})
+                    else:
+                        merged["recommendations"].append({"recommendation": rec, "source": source})
             
             # Merge data quality assessments
             merged["data_quality"] = {
@@ -143,8 +187,8 @@ class FunctionCallingAgent(BaseAgent):
         """Calculate agreement level between Watson and Gemini results"""
         try:
             # Compare patterns
-            watson_patterns = {p.get("name") for p in watson_results.get("patterns", [])}
-            gemini_patterns = {p.get("name") for p in gemini_results.get("patterns", [])}
+            watson_patterns = {p.get("name") if isinstance(p, dict) else str(p) for p in watson_results.get("patterns", [])}
+            gemini_patterns = {p.get("name") if isinstance(p, dict) else str(p) for p in gemini_results.get("patterns", [])}
             
             if watson_patterns or gemini_patterns:
                 pattern_agreement = len(watson_patterns & gemini_patterns) / len(watson_patterns | gemini_patterns)
@@ -203,7 +247,7 @@ class FunctionCallingAgent(BaseAgent):
                    
         for insight in insights:
             for keyword in keywords:
-                if keyword in insight.lower():
+                if keyword in str(insight).lower():
                     themes.add(keyword)
                     
         return list(themes)
@@ -225,11 +269,11 @@ class FunctionCallingAgent(BaseAgent):
             for pattern in combined_results["patterns"]:
                 confidence = self._assess_pattern_confidence(pattern)
                 if confidence >= 0.8:
-                    meta_insights["confidence_levels"]["high"].append(pattern["name"])
+                    meta_insights["confidence_levels"]["high"].append(pattern.get("name"))
                 elif confidence >= 0.5:
-                    meta_insights["confidence_levels"]["medium"].append(pattern["name"])
+                    meta_insights["confidence_levels"]["medium"].append(pattern.get("name"))
                 else:
-                    meta_insights["confidence_levels"]["low"].append(pattern["name"])
+                    meta_insights["confidence_levels"]["low"].append(pattern.get("name"))
             
             # Cross-validate findings
             meta_insights["cross_validation"] = await self._cross_validate_findings(combined_results)
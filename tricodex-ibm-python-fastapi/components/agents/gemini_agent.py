@@ -1,11 +1,11 @@
 """
 Process analysis agent using Google's Gemini model
 """
-import asyncio
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import logging
-from google import genai
 from .base_agent import BaseAgent
+from .clients import get_gemini_client
+from utils.distributions import json_default
 import json
 import time
 
@@ -14,19 +14,17 @@ logger = logging.getLogger(__name__)
 class GeminiAgent(BaseAgent):
     """Process analysis agent using Gemini"""
     
+    name = "gemini"
+    
     def __init__(self, config: Dict[str, Any], timeout: int = 300):
         super().__init__(timeout)
         if not config.get("api_key"):
             raise ValueError("Gemini API key is required")
         
-        # Initialize Gemini
-        genai.configure(api_key=config["api_key"])
-        self.model = genai.GenerativeModel(
-            model_name=config.get("model", "gemini-2.0-flash"),
-            generation_config=config.get("params", {})
-        )
+        self.client = get_gemini_client(config)
+        self.model = config.get("model", "gemini-2.0-flash")
+        self.params = config.get("params", {})
         self._api_calls = 0
-        self._last_call_time = 0
     
     async def _run_analysis(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Execute analysis with Gemini"""
@@ -40,11 +38,14 @@ class GeminiAgent(BaseAgent):
             response = await self._generate_response(prompt)
             structured = self._structure_output(self._validate_json(response))
             
-            # Add Gemini-specific language analysis
-            if "metadata" in data:
+            # Language distribution is profiled locally; the extra call only
+            # runs for datasets that have no profile but list languages
+            language_profile = self._language_profile(data)
+            if language_profile:
+                structured["language_insights"] = language_profile
+            elif data.get("metadata", {}).get("languages"):
                 logger.info("Running language pattern analysis")
-                language_insights = await self._analyze_language_patterns(data["metadata"])
-                structured["language_insights"] = language_insights
+                structured["language_insights"] = await self._analyze_language_patterns(data["metadata"])
             
             execution_time = time.time() - start_time
             logger.info(f"Gemini analysis completed in {execution_time:.2f}s with {self._api_calls} API calls")
@@ -61,31 +62,15 @@ class GeminiAgent(BaseAgent):
             self._check_timeout()
             self._api_calls += 1
             
-            # Rate limiting
-            current_time = time.time()
-            if self._last_call_time:
-                time_since_last = current_time - self._last_call_time
-                if time_since_last < 1.0:
-                    await asyncio.sleep(1.0 - time_since_last)
-            
             logger.info(f"Making Gemini API call #{self._api_calls}")
             start_time = time.time()
             
-            # Use async generation
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                prompt
-            )
+            response = await self._complete(self.client, prompt, self.model, self.params)
             
-            self._last_call_time = time.time()
-            execution_time = self._last_call_time - start_time
+            execution_time = time.time() - start_time
             
             logger.debug(f"Gemini API call completed in {execution_time:.2f}s")
-            
-            # Handle response based on new API
-            if hasattr(response, 'text'):
-                return response.text
-            return str(response)
+            return response
             
         except Exception as e:
             self._error_count += 1
@@ -118,25 +103,40 @@ class GeminiAgent(BaseAgent):
             logger.warning(f"Language analysis failed: {e}")
             return {}
     
+    @staticmethod
+    def _language_profile(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Locally computed language profile from the input or its context"""
+        return data.get("language_profile") or data.get("context", {}).get("language_profile")
+    
+    def _format_language_context(self, data: Dict[str, Any]) -> str:
+        """Prompt section with the local language profile"""
+        profile = self._language_profile(data)
+        if not profile:
+            return ""
+        return f"""
+        Language Profile (computed locally):
+        {json.dumps({"distribution": profile.get("distribution"), "per_language": profile.get("per_language")}, indent=2, default=json_default)}
+        """
+    
     def _create_analysis_prompt(self, data: Dict[str, Any]) -> str:
         """Create structured analysis prompt"""
         return f"""Analyze this process data and provide insights:
 
         Metadata:
-        {json.dumps(data.get('metadata', {}), indent=2)}
+        {json.dumps(data.get('metadata', {}), indent=2, default=json_default)}
         
         Metrics:
-        {json.dumps(data.get('metrics', {}), indent=2)}
+        {json.dumps(data.get('metrics', {}), indent=2, default=json_default)}
         
         Patterns:
-        {json.dumps(data.get('patterns', []), indent=2)}
+        {json.dumps(data.get('patterns', []), indent=2, default=json_default)}
         
         Data Quality:
-        {json.dumps(data.get('data_quality', {}), indent=2)}
-        
+        {json.dumps(data.get('data_quality', {}), indent=2, default=json_default)}
+        {self._format_process_context(data)}{self._format_language_context(data)}{self._format_anomaly_context(data)}{self._format_sla_context(data)}
         Provide detailed analysis including:
         1. Key insights and patterns
-        2. Process bottlenecks
+        2. {self._bottleneck_instruction(data)}
         3. Improvement recommendations
         4. Data quality impact
         5. Language and regional considerations
@@ -0,0 +1,211 @@
+"""
+Hedged LLM calls: race a backup model when the primary runs into its latency tail
+"""
+from typing import Dict, Any, Optional, AsyncIterator, Awaitable, Callable, Deque, Tuple
+from collections import deque
+from dataclasses import dataclass
+import asyncio
+import logging
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class HedgeTarget:
+    """A client with the model and generation params to call it with"""
+    client: Any
+    model: str
+    params: Dict[str, Any]
+
+    @property
+    def name(self) -> str:
+        return f"{self.client.provider}:{self.model}"
+
+
+class LatencyTracker:
+    """Recent call latencies of one target, in seconds"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """None until enough calls have been seen to trust the tail"""
+        if len(self._samples) < self.min_samples:
+            return None
+        return float(np.percentile(self._samples, q))
+
+
+class HedgeBudget:
+    """Backup calls allowed per primary call, shared by every stage
+
+    A hedge is only sent while hedges stay within ``ratio`` of the primary
+    calls made so far; the ratio is capped at 1, so hedging can never more
+    than double the number of provider calls.
+    """
+
+    def __init__(self, ratio: float = 0.1):
+        self.ratio = max(0.0, min(ratio, 1.0))
+        self.primaries = 0
+        self.hedges = 0
+        self.denied = 0
+
+    def primary(self) -> None:
+        self.primaries += 1
+
+    def spend(self) -> bool:
+        if self.hedges + 1 > self.ratio * self.primaries:
+            self.denied += 1
+            return False
+        self.hedges += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {"ratio": self.ratio, "primaries": self.primaries, "hedges": self.hedges, "denied": self.denied}
+
+
+# Latencies per target and call mode ("generate" to completion, "stream" to first chunk)
+_latencies: Dict[Tuple[str, str], LatencyTracker] = {}
+
+
+def _tracker(target: HedgeTarget, mode: str) -> LatencyTracker:
+    key = (target.name, mode)
+    if key not in _latencies:
+        _latencies[key] = LatencyTracker()
+    return _latencies[key]
+
+
+async def _first_chunk(chunks: AsyncIterator[str]) -> Optional[str]:
+    """First chunk of a stream, None if it ends without one"""
+    try:
+        return await chunks.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+class Hedge:
+    """Hedged completions for one pipeline stage
+
+    The primary call starts alone. If it is still running once it passes
+    the primary's observed latency percentile (p90 by default), and the
+    shared budget allows, the same prompt goes to the backup target; the
+    first to succeed is used and the other is cancelled. Streamed calls race
+    on the first chunk, so a stream that has started is never duplicated.
+    """
+
+    def __init__(self, stage: str, backup: HedgeTarget, budget: HedgeBudget,
+                 percentile: float = 90.0, min_delay: float = 1.0):
+        self.stage = stage
+        self.backup = backup
+        self.budget = budget
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.counters = {"calls": 0, "hedged": 0, "backup_wins": 0}
+
+    def delay(self, primary: HedgeTarget, mode: str) -> Optional[float]:
+        """Seconds to wait on the primary before hedging, None if there is no latency history yet"""
+        observed = _tracker(primary, mode).percentile(self.percentile)
+        return None if observed is None else max(observed, self.min_delay)
+
+    async def generate(self, primary: HedgeTarget, prompt: str) -> str:
+        """Completion text from whichever target answers first"""
+        def call(target: HedgeTarget) -> Awaitable[str]:
+            return target.client.generate(prompt, target.model, target.params)
+        text, _ = await self._race(primary, call, "generate")
+        return text
+
+    async def stream(self, primary: HedgeTarget, prompt: str) -> AsyncIterator[str]:
+        """Text chunks from whichever target starts streaming first"""
+        streams: Dict[str, AsyncIterator[str]] = {}
+
+        def call(target: HedgeTarget) -> Awaitable[Optional[str]]:
+            streams[target.name] = target.client.stream(prompt, target.model, target.params).__aiter__()
+            return _first_chunk(streams[target.name])
+
+        try:
+            first, winner = await self._race(primary, call, "stream")
+            for name in [name for name in streams if name != winner.name]:
+                await streams.pop(name).aclose()
+            if first is None:
+                return
+            yield first
+            async for chunk in streams[winner.name]:
+                yield chunk
+        finally:
+            # Also stops the winner when the consumer leaves early
+            for chunks in streams.values():
+                await chunks.aclose()
+
+    def _backup_available(self, primary: HedgeTarget) -> bool:
+        breaker = getattr(self.backup.client, "breaker", None)
+        return primary.name != self.backup.name and (breaker is None or breaker.allows_calls)
+
+    async def _race(self, primary: HedgeTarget, call: Callable[[HedgeTarget], Awaitable[Any]],
+                    mode: str) -> Tuple[Any, HedgeTarget]:
+        self.counters["calls"] += 1
+        self.budget.primary()
+        started = {primary.name: time.monotonic()}
+        primary_task = asyncio.ensure_future(call(primary))
+        tasks = {primary_task: primary}
+        try:
+            delay = self.delay(primary, mode)
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self._backup_available(primary) and self.budget.spend():
+                    logger.info(f"Hedging {self.stage} call to {self.backup.name} after {delay:.1f}s")
+                    self.counters["hedged"] += 1
+                    started[self.backup.name] = time.monotonic()
+                    tasks[asyncio.ensure_future(call(self.backup))] = self.backup
+
+            pending, first_error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    target = tasks[task]
+                    if task.exception() is None:
+                        _tracker(target, mode).record(time.monotonic() - started[target.name])
+                        if target is not primary:
+                            self.counters["backup_wins"] += 1
+                        return task.result(), target
+                    if first_error is None or target is primary:
+                        first_error = task.exception()
+            raise first_error
+        finally:
+            losers = [task for task in tasks if not task.done()]
+            for task in losers:
+                task.cancel()
+            if losers:
+                await asyncio.gather(*losers, return_exceptions=True)
+            if primary_task.cancelled():
+                # A cancelled primary took at least this long; keep the tail in view
+                _tracker(primary, mode).record(time.monotonic() - started[primary.name])
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backup": self.backup.name, "percentile": self.percentile, **self.counters}
+
+
+_hedges: Dict[str, Hedge] = {}
+_budget: Optional[HedgeBudget] = None
+
+
+def register_hedge(stage: str, backup: HedgeTarget, ratio: float, percentile: float = 90.0,
+                   min_delay: float = 1.0) -> Hedge:
+    """Hedge for a stage, drawing on the process-wide budget"""
+    global _budget
+    if _budget is None:
+        _budget = HedgeBudget(ratio)
+    _hedges[stage] = Hedge(stage, backup, _budget, percentile=percentile, min_delay=min_delay)
+    return _hedges[stage]
+
+
+def hedge_status() -> Dict[str, Any]:
+    """Per-stage hedging counters and the shared budget"""
+    status: Dict[str, Any] = {stage: hedge.stats() for stage, hedge in _hedges.items()}
+    if _budget is not None:
+        status["budget"] = _budget.stats()
+    return status
@@ -5,21 +5,23 @@ import json
 from typing import Dict, Any, List
 import logging
 import time
-import asyncio
-from langchain_ibm import WatsonxLLM
 from .base_agent import BaseAgent
+from .clients import get_watsonx_client
 
 logger = logging.getLogger(__name__)
 
 class ProcessLensAgent(BaseAgent):
     """Process analysis agent using IBM Granite"""
     
-    def __init__(self, llm: WatsonxLLM, tools: List[Any], timeout: int = 300):
+    name = "processlens"
+    
+    def __init__(self, config: Dict[str, Any], tools: List[Any], timeout: int = 300):
         super().__init__(timeout)
-        self.llm = llm
+        self.client = get_watsonx_client(config)
+        self.model_id = config["model_id"]
+        self.params = config.get("params", {})
         self.tools = tools
         self._api_calls = 0
-        self._last_call_time = 0
         self.MAX_API_CALLS = 3  # Limit total API calls per analysis
     
     async def _run_analysis(self, data: Dict[str, Any]) -> Dict[str, Any]:
@@ -48,11 +50,18 @@ class ProcessLensAgent(BaseAgent):
             execution_time = time.time() - start_time
             logger.info(f"WatsonX analysis completed in {execution_time:.2f}s with {self._api_calls} API calls")
             
-            return self._structure_output({
+            structured = self._structure_output({
                 "analysis": main_analysis,
                 "metrics": metrics or {}
             })
             
+            # Bottlenecks come from measured waiting times, not the model
+            bottlenecks = self._measured_bottlenecks(data)
+            if bottlenecks:
+                structured["bottlenecks"] = bottlenecks
+            
+            return structured
+            
         except Exception as e:
             logger.error(f"WatsonX analysis failed after {time.time() - start_time:.2f}s: {e}")
             raise
@@ -66,13 +75,13 @@ class ProcessLensAgent(BaseAgent):
         
         Process Metrics:
         {json.dumps(data.get('metrics', {}), indent=2)}
-        
+        {self._format_process_context(data)}{self._format_anomaly_context(data)}{self._format_sla_context(data)}
         Analysis Requirements:
         1. Key Performance Indicators (KPIs)
         2. Process Patterns and Anomalies
         3. Efficiency Analysis
         4. Resource Utilization
-        5. Bottleneck Identification
+        5. {self._bottleneck_instruction(data)}
         6. Improvement Recommendations
         
         Return a single comprehensive JSON response with all analyses combined.
@@ -103,28 +112,20 @@ class ProcessLensAgent(BaseAgent):
             logger.error(f"Metrics analysis failed: {e}")
             return {}
 
-    async def _generate_response(self, prompt: str) -> Dict[str, Any]:
+    async def _generate_response(self, prompt: str) -> str:
         """Generate response from WatsonX with rate limiting"""
         try:
             self._check_timeout()
             
-            # Rate limiting
-            current_time = time.time()
-            if self._last_call_time:
-                time_since_last = current_time - self._last_call_time
-                if time_since_last < 1.0:
-                    await asyncio.sleep(1.0 - time_since_last)
-            
             logger.info(f"Making WatsonX API call #{self._api_calls}")
             start_time = time.time()
             
-            response = await self.llm.agenerate(prompt)
+            response = await self._complete(self.client, prompt, self.model_id, self.params)
             
-            self._last_call_time = time.time()
-            execution_time = self._last_call_time - start_time
+            execution_time = time.time() - start_time
             
             logger.debug(f"WatsonX API call completed in {execution_time:.2f}s")
-            return self._validate_json(response)
+            return response
             
         except Exception as e:
             logger.error(f"WatsonX generation failed: {e}")
@@ -0,0 +1,225 @@
+"""
+Token-bucket rate limiting for LLM providers, shared by every agent and request
+"""
+from typing import Dict, Any, List, Optional, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from pymongo.errors import DuplicateKeyError
+from config import Config
+from db import Database
+
+logger = logging.getLogger(__name__)
+
+# Lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+_priority: ContextVar[int] = ContextVar("llm_request_priority", default=PRIORITY_INTERACTIVE)
+
+
+@contextmanager
+def request_priority(priority: int):
+    """Run LLM calls made inside the block (and tasks it spawns) at this priority"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt size, about four characters per token"""
+    return max(1, len(text) // 4)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Per-minute budgets; zero disables a budget"""
+    requests_per_minute: int
+    tokens_per_minute: int = 0
+
+
+class TokenBucket:
+    """Bucket holding up to one minute of budget, refilled continuously"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until the amount is available; requests above capacity wait for a full bucket"""
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        deficit = min(amount, self.capacity) - self.level
+        return deficit / self.rate if deficit > 0 else 0.0
+
+    def take(self, amount: float) -> None:
+        if self.enabled:
+            self._refill()
+            self.level -= min(amount, self.capacity)
+
+    def give(self, amount: float) -> None:
+        if self.enabled:
+            self._refill()
+            self.level = min(self.capacity, self.level + amount)
+
+    def drain(self, seconds: float) -> None:
+        """Leave nothing available for the given number of seconds"""
+        if self.enabled:
+            self._refill()
+            self.level = min(self.level, -seconds * self.rate)
+
+
+class MongoRateWindow:
+    """Fixed one-minute request and token counters shared by all workers"""
+
+    collection = "rate_limits"
+
+    async def reserve(self, key: str, tokens: int, limit: RateLimit) -> float:
+        """Zero when the reservation fits this minute, else seconds until the next one"""
+        if Database.db is None:
+            return 0.0
+        now = time.time()
+        window = int(now // 60)
+        conditions: Dict[str, Any] = {"_id": f"{key}:{window}"}
+        if limit.requests_per_minute > 0:
+            conditions["requests"] = {"$lte": limit.requests_per_minute - 1}
+        if limit.tokens_per_minute > 0:
+            conditions["tokens"] = {"$lte": max(limit.tokens_per_minute - tokens, 0)}
+        try:
+            # A full window fails the filter, and the upsert then collides on _id
+            await Database.db[self.collection].update_one(
+                conditions,
+                {
+                    "$inc": {"requests": 1, "tokens": tokens},
+                    "$setOnInsert": {"expires_at": datetime.utcnow() + timedelta(minutes=2)}
+                },
+                upsert=True
+            )
+            return 0.0
+        except DuplicateKeyError:
+            return (window + 1) * 60 - now
+        except Exception as e:
+            logger.warning(f"Shared rate limit check failed for {key}, using local limits only: {e}")
+            return 0.0
+
+
+class RateLimiter:
+    """Request and token budgets for one provider and model
+
+    Waiters queue by (priority, arrival), so interactive calls overtake
+    batch work and equal priorities are served in order. Only the head of
+    the queue may take from the buckets; everyone else sleeps until it
+    leaves. Reservations use an estimate and are settled against the
+    usage the provider reports.
+    """
+
+    def __init__(self, provider: str, model: str, limit: RateLimit, shared: Optional[MongoRateWindow] = None):
+        self.key = f"{provider}:{model}"
+        self.limit = limit
+        self.shared = shared
+        self.requests = TokenBucket(limit.requests_per_minute)
+        self.tokens = TokenBucket(limit.tokens_per_minute)
+        self._queue: List[Tuple[int, int, asyncio.Event]] = []
+        self._seq = itertools.count()
+        self.granted = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    async def acquire(self, tokens: int = 0, priority: Optional[int] = None) -> float:
+        """Wait for one request and the given tokens; returns the seconds waited"""
+        priority = _priority.get() if priority is None else priority
+        entry = (priority, next(self._seq), asyncio.Event())
+        heapq.heappush(self._queue, entry)
+        started = time.monotonic()
+        try:
+            while True:
+                wait = None
+                if self._queue[0] is entry:
+                    wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                    if wait <= 0 and self.shared is not None:
+                        wait = await self.shared.reserve(self.key, tokens, self.limit)
+                    if wait <= 0:
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        break
+                entry[2].clear()
+                try:
+                    await asyncio.wait_for(entry[2].wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._queue.remove(entry)
+            heapq.heapify(self._queue)
+            if self._queue:
+                self._queue[0][2].set()
+
+        waited = time.monotonic() - started
+        self.granted += 1
+        self.wait_seconds += waited
+        return waited
+
+    def settle(self, reserved: int, used: Optional[int]) -> None:
+        """Correct the token bucket once the real usage is known"""
+        if used is None:
+            return
+        if used < reserved:
+            self.tokens.give(reserved - used)
+        elif used > reserved:
+            self.tokens.take(used - reserved)
+
+    def penalize(self, retry_after: float) -> None:
+        """Back off every caller after the provider answered 429"""
+        self.throttled += 1
+        self.requests.drain(retry_after)
+        logger.warning(f"Rate limited by {self.key}, pausing requests for {retry_after:.1f}s")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "requests_per_minute": self.limit.requests_per_minute,
+            "tokens_per_minute": self.limit.tokens_per_minute,
+            "queued": len(self._queue),
+            "granted": self.granted,
+            "throttled": self.throttled,
+            "avg_wait_seconds": self.wait_seconds / self.granted if self.granted else 0.0
+        }
+
+
+_limiters: Dict[str, RateLimiter] = {}
+
+
+def get_rate_limiter(provider: str, model: str) -> RateLimiter:
+    """Shared limiter for a provider and model, using the provider's configured budgets"""
+    key = f"{provider}:{model}"
+    if key not in _limiters:
+        budgets = Config.RATE_LIMITS.get(provider, {})
+        limit = RateLimit(
+            requests_per_minute=budgets.get("requests_per_minute", 0),
+            tokens_per_minute=budgets.get("tokens_per_minute", 0)
+        )
+        shared = MongoRateWindow() if Config.RATE_LIMIT_SHARED else None
+        _limiters[key] = RateLimiter(provider, model, limit, shared)
+    return _limiters[key]
+
+
+def limiter_status() -> Dict[str, Dict[str, Any]]:
+    return {key: limiter.status() for key, limiter in _limiters.items()}
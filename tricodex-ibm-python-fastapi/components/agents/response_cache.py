@@ -0,0 +1,278 @@
+"""
+Persistent cache of raw LLM responses keyed by model, parameters and prompt
+"""
+from typing import Dict, Any, Iterator, Optional, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from config import Config
+from db import Database
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"[ \t]+")
+
+# Set while responses must neither come from nor go into the cache
+_bypass: ContextVar[bool] = ContextVar("bypass_response_cache", default=False)
+# Responses fetched inside an agent run, held until the run's output validates
+_pending: ContextVar[Optional[Dict[str, str]]] = ContextVar("pending_responses", default=None)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Prompt with the f-string indentation and trailing spaces removed"""
+    lines = (_WHITESPACE.sub(" ", line).strip() for line in prompt.strip().splitlines())
+    return "\n".join(lines)
+
+
+def response_key(provider: str, model: str, params: Dict[str, Any], prompt: str) -> str:
+    """Stable hash of everything that determines a response"""
+    header = json.dumps({"provider": provider, "model": model, "params": params}, sort_keys=True, default=str)
+    digest = hashlib.sha256(header.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_prompt(prompt).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class SQLiteResponseStore:
+    """Local disk tier; one row per key with zlib-compressed text"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, body BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        purged = self.purge_expired()
+        if purged:
+            logger.info(f"Purged {purged} expired LLM responses from {path}")
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT body, expires_at FROM responses WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+
+    def set(self, key: str, body: bytes, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, expires_at) VALUES (?, ?, ?)", (key, body, expires_at)
+            )
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),)).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """Memory, SQLite and optional MongoDB tiers in front of every LLM call
+
+    Lookups try the in-process dict first (no I/O, no hashing beyond the
+    key), then SQLite, then the shared ``llm_responses`` collection; hits
+    in a slower tier are promoted to the faster ones. Entries expire after
+    the TTL in every tier.
+    """
+
+    collection = "llm_responses"
+
+    def __init__(self, path: Optional[str] = None, ttl: int = 86400, max_memory: int = 512,
+                 use_mongo: bool = False, compression_level: int = 6, purge_interval: float = 3600.0):
+        self.ttl = ttl
+        self.max_memory = max_memory
+        self.use_mongo = use_mongo
+        self.compression_level = compression_level
+        self.purge_interval = purge_interval
+        self._purged_at = time.monotonic()
+        self._memory: Dict[str, Tuple[str, float]] = {}
+        self._disk: Optional[SQLiteResponseStore] = None
+        if path:
+            try:
+                self._disk = SQLiteResponseStore(path)
+            except sqlite3.Error as e:
+                logger.warning(f"LLM response cache disabled its disk tier: {e}")
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "mongo_hits": 0, "misses": 0, "stores": 0}
+
+    def _remember(self, key: str, text: str, expires_at: float) -> None:
+        if key not in self._memory and len(self._memory) >= self.max_memory:
+            # Remove oldest entry
+            del self._memory[next(iter(self._memory))]
+        self._memory[key] = (text, expires_at)
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[1] > time.time():
+                self.counters["memory_hits"] += 1
+                return entry[0]
+            del self._memory[key]
+
+        if self._disk is not None:
+            try:
+                row = await asyncio.to_thread(self._disk.get, key)
+            except sqlite3.Error as e:
+                logger.warning(f"LLM response cache read failed: {e}")
+                row = None
+            if row is not None:
+                text = zlib.decompress(row[0]).decode("utf-8")
+                self._remember(key, text, row[1])
+                self.counters["disk_hits"] += 1
+                return text
+
+        if self.use_mongo and Database.db is not None:
+            try:
+                doc = await Database.db[self.collection].find_one(
+                    {"_id": key, "expires_at": {"$gt": datetime.utcnow()}}
+                )
+            except Exception as e:
+                logger.warning(f"LLM response cache lookup in MongoDB failed: {e}")
+                doc = None
+            if doc is not None:
+                text = zlib.decompress(doc["body"]).decode("utf-8")
+                expires_at = time.time() + (doc["expires_at"] - datetime.utcnow()).total_seconds()
+                self._remember(key, text, expires_at)
+                if self._disk is not None:
+                    await asyncio.to_thread(self._disk.set, key, doc["body"], expires_at)
+                self.counters["mongo_hits"] += 1
+                return text
+
+        self.counters["misses"] += 1
+        return None
+
+    async def set(self, key: str, text: str) -> None:
+        expires_at = time.time() + self.ttl
+        self._remember(key, text, expires_at)
+        body = zlib.compress(text.encode("utf-8"), self.compression_level)
+        self.counters["stores"] += 1
+        if self._disk is not None:
+            try:
+                await asyncio.to_thread(self._disk.set, key, body, expires_at)
+                await self._purge_if_due()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM response cache write failed: {e}")
+        if self.use_mongo and Database.db is not None:
+            try:
+                await Database.db[self.collection].replace_one(
+                    {"_id": key},
+                    {"_id": key, "body": body, "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl)},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.warning(f"LLM response cache write to MongoDB failed: {e}")
+
+    async def _purge_if_due(self) -> None:
+        """Delete expired disk rows at most once per purge interval"""
+        now = time.monotonic()
+        if now - self._purged_at < self.purge_interval:
+            return
+        self._purged_at = now
+        purged = await asyncio.to_thread(self._disk.purge_expired)
+        if purged:
+            logger.debug(f"Purged {purged} expired LLM responses")
+
+    def clear_memory(self) -> None:
+        self._memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["mongo_hits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory)
+        }
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide response cache, or None when disabled or bypassed"""
+    global _cache
+    if not Config.LLM_CACHE_ENABLED or _bypass.get():
+        return None
+    if _cache is None:
+        _cache = ResponseCache(
+            path=Config.LLM_CACHE_PATH,
+            ttl=Config.LLM_CACHE_TTL,
+            use_mongo=Config.LLM_CACHE_MONGO
+        )
+    return _cache
+
+
+@contextmanager
+def bypass_response_cache() -> Iterator[None]:
+    """Send every call inside the block to the provider, and store nothing"""
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+@contextmanager
+def pending_responses() -> Iterator[Dict[str, str]]:
+    """Hold responses fetched inside the block instead of storing them
+
+    The caller stores them with ``commit_responses`` once the output built
+    from them has validated, so a bad answer is not replayed on retry.
+    """
+    pending: Dict[str, str] = {}
+    token = _pending.set(pending)
+    try:
+        yield pending
+    finally:
+        _pending.reset(token)
+
+
+async def remember_response(key: str, text: str) -> None:
+    """Store a fresh response now, or hold it for the enclosing pending_responses block"""
+    cache = get_response_cache()
+    if cache is None or not text:
+        return
+    pending = _pending.get()
+    if pending is not None:
+        pending[key] = text
+    else:
+        await cache.set(key, text)
+
+
+async def commit_responses(pending: Dict[str, str]) -> None:
+    cache = get_response_cache()
+    if cache is None:
+        return
+    for key, text in pending.items():
+        await cache.set(key, text)
+
+
+def cache_stats() -> Dict[str, Any]:
+    return _cache.stats() if _cache is not None else {}
+
+
+def close_response_cache() -> None:
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
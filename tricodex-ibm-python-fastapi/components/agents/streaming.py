@@ -0,0 +1,38 @@
+"""
+Incremental delivery of insights while an LLM response is still streaming
+"""
+from typing import Dict, Any, Optional, Callable, Awaitable, Iterable
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+from utils.json_extractor import JSONExtractor
+
+logger = logging.getLogger(__name__)
+
+# Array keys whose elements are published as soon as each one closes
+STREAMED_KEYS = ("insights", "recommendations", "patterns", "bottlenecks")
+
+InsightListener = Callable[[Dict[str, Any]], Awaitable[None]]
+
+_listener: ContextVar[Optional[InsightListener]] = ContextVar("insight_listener", default=None)
+
+
+@contextmanager
+def stream_insights(listener: InsightListener):
+    """Publish streamed items from LLM calls made inside the block to the listener"""
+    token = _listener.set(listener)
+    try:
+        yield
+    finally:
+        _listener.reset(token)
+
+
+def insight_listener() -> Optional[InsightListener]:
+    return _listener.get()
+
+
+class IncrementalJSONParser(JSONExtractor):
+    """JSON extractor that reports elements of the streamed array keys as they close"""
+
+    def __init__(self, keys: Iterable[str] = STREAMED_KEYS):
+        super().__init__(keys)
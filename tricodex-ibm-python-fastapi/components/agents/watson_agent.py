@@ -1,21 +1,26 @@
 """
 Process analysis agent using IBM Granite LLM
 """
+import json
 import logging
 from typing import Dict, Any
-from langchain_ibm import WatsonxLLM
 from .base_agent import BaseAgent
+from .clients import get_watsonx_client
+from utils.distributions import json_default
 
 logger = logging.getLogger(__name__)
 
 class WatsonAgent(BaseAgent):
     """Process analysis agent using IBM Granite"""
     
-    def __init__(self, llm: WatsonxLLM, timeout: int = 300):
+    name = "watson"
+    
+    def __init__(self, config: Dict[str, Any], timeout: int = 300):
         super().__init__(timeout)
-        self.model = llm
+        self.client = get_watsonx_client(config)
+        self.model_id = config["model_id"]
+        self.params = config.get("params", {})
         self._api_calls = 0
-        self._last_call_time = 0
         logger.info("Watson LLM initialized successfully")
     
     async def _run_analysis(self, data: Dict[str, Any]) -> Dict[str, Any]:
@@ -41,14 +46,29 @@ class WatsonAgent(BaseAgent):
                 "error": str(e)
             }
     
+    def _create_analysis_prompt(self, data: Dict[str, Any]) -> str:
+        """Create structured analysis prompt"""
+        return f"""Analyze this process data and provide insights:
+
+        Metadata:
+        {json.dumps(data.get('metadata', {}), indent=2, default=json_default)}
+        
+        Metrics:
+        {json.dumps(data.get('metrics', {}), indent=2, default=json_default)}
+        
+        Patterns:
+        {json.dumps(data.get('patterns', []), indent=2, default=json_default)}
+        {self._format_process_context(data)}{self._format_anomaly_context(data)}{self._format_sla_context(data)}
+        Return a JSON object with "insights", "patterns", "metrics" and "recommendations".
+        """
+    
     async def _generate_response(self, prompt: str) -> str:
         """Generate response from Watson with safety checks"""
         try:
             self._api_calls += 1
             logger.info(f"Making Watson API call #{self._api_calls}")
             
-            response = await self.model.agenerate([prompt])
-            return response.generations[0][0].text
+            return await self._complete(self.client, prompt, self.model_id, self.params)
             
         except Exception as e:
             self._error_count += 1
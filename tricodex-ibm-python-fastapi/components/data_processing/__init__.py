@@ -2,5 +2,32 @@
 ProcessLens data processing package
 """
 from .ticket_processor import TicketProcessor, ProcessingConfig
+from .timestamp_formats import TimestampFormatDetector
+from .schema_plan import SchemaPlan, SchemaPlanCompiler, ColumnPlan
+from .parallel import ColumnParallelExecutor, ColumnStats, shutdown_executors
+from .duplicates import NearDuplicateDetector, DuplicateReport
+from .language_profile import LanguageProfiler, profile_languages
+from .anomalies import AnomalyDetector
+from .sla import SLAEngine, SLAConfig
+from .cardinality import CardinalityEstimator, HyperLogLog
 
-__all__ = ["TicketProcessor", "ProcessingConfig"]
\ No newline at end of file
+__all__ = [
+    "TicketProcessor",
+    "ProcessingConfig",
+    "TimestampFormatDetector",
+    "SchemaPlan",
+    "SchemaPlanCompiler",
+    "ColumnPlan",
+    "ColumnParallelExecutor",
+    "ColumnStats",
+    "shutdown_executors",
+    "NearDuplicateDetector",
+    "DuplicateReport",
+    "LanguageProfiler",
+    "profile_languages",
+    "AnomalyDetector",
+    "SLAEngine",
+    "SLAConfig",
+    "CardinalityEstimator",
+    "HyperLogLog"
+]
\ No newline at end of file
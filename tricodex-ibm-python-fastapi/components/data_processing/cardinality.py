@@ -0,0 +1,142 @@
+"""
+Approximate distinct counts with early exit for column role inference
+"""
+from typing import Any, Optional
+from dataclasses import dataclass
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Columns with fewer distinct values than this share of rows are categorical
+CATEGORICAL_RATIO = 0.05
+
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Exact bit length of uint64 values by binary search over shifts"""
+    x = values.copy()
+    length = np.zeros(len(x), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = x >= (np.uint64(1) << np.uint64(shift))
+        length[high] += shift
+        x[high] >>= np.uint64(shift)
+    return length + (x > 0)
+
+
+class HyperLogLog:
+    """HyperLogLog sketch over 64-bit hashes, updated a chunk at a time"""
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / np.sqrt(len(self.registers))
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        # Guard bit caps the rank when all remaining bits are zero
+        rest = ((hashes << p) & _MASK64) | (np.uint64(1) << (p - np.uint64(1)))
+        rank = (65 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def add(self, values: Any) -> None:
+        # The sketch ignores repeats, so only each chunk's distinct values are hashed
+        uniques = pd.unique(np.asarray(values, dtype=object))
+        uniques = uniques[~pd.isna(uniques)]
+        if len(uniques):
+            self.add_hashes(pd.util.hash_array(uniques, categorize=False))
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return float(m * np.log(m / zeros))
+        return float(raw)
+
+
+@dataclass(frozen=True)
+class CardinalityEstimate:
+    """Distinct count estimate and how much of the column it took"""
+    distinct: int
+    rows: int
+    scanned: int
+    method: str  # "exact", "sample", "hll" or "hll_early_exit"
+    exceeds: bool
+
+    @property
+    def exact(self) -> bool:
+        return self.method == "exact"
+
+
+class CardinalityEstimator:
+    """Decide whether columns are low cardinality without exact distinct counts
+
+    A random sample is counted exactly first: mostly-unique samples mark
+    text-heavy columns straight away. Otherwise a HyperLogLog sketch streams
+    over the column in geometrically growing chunks and stops as soon as the
+    estimate clearly exceeds the limit, so only low-cardinality columns are
+    read in full.
+    """
+
+    def __init__(self, ratio: float = CATEGORICAL_RATIO, sample_size: int = 2000, text_ratio: float = 0.5,
+                 chunk_rows: int = 4096, max_chunk_rows: int = 1 << 17, precision: int = 12):
+        self.ratio = ratio
+        self.sample_size = sample_size
+        self.text_ratio = text_ratio
+        self.chunk_rows = chunk_rows
+        self.max_chunk_rows = max_chunk_rows
+        self.precision = precision
+
+    def limit(self, rows: int) -> float:
+        return rows * self.ratio
+
+    def estimate(self, series: pd.Series, limit: Optional[float] = None) -> CardinalityEstimate:
+        """Distinct non-null values, stopping once they clearly exceed the limit"""
+        rows = len(series)
+        limit = self.limit(rows) if limit is None else limit
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            distinct = int(np.count_nonzero(np.bincount(codes[codes >= 0], minlength=1)))
+            return CardinalityEstimate(distinct, rows, rows, "exact", distinct >= limit)
+
+        if rows <= self.sample_size:
+            distinct = int(series.nunique())
+            return CardinalityEstimate(distinct, rows, rows, "exact", distinct >= limit)
+
+        sample = series.sample(self.sample_size, random_state=0).dropna()
+        sample_distinct = int(sample.nunique())
+        if len(sample) and sample_distinct >= self.text_ratio * len(sample):
+            # Mostly-unique sample: text-heavy, whatever the full count is
+            return CardinalityEstimate(sample_distinct, rows, self.sample_size, "sample", True)
+
+        sketch = HyperLogLog(self.precision)
+        stop_at = limit * (1 + 3 * sketch.relative_error)
+        array = series.to_numpy()
+        scanned, chunk = 0, self.chunk_rows
+        while scanned < len(array):
+            sketch.add(array[scanned:scanned + chunk])
+            scanned = min(scanned + chunk, len(array))
+            chunk = min(chunk * 2, self.max_chunk_rows)
+            if scanned < len(array) and sketch.estimate() > stop_at:
+                return CardinalityEstimate(int(round(sketch.estimate())), rows, scanned, "hll_early_exit", True)
+
+        distinct = int(round(sketch.estimate()))
+        return CardinalityEstimate(distinct, rows, len(array), "hll", distinct >= limit)
+
+    def is_low_cardinality(self, series: pd.Series) -> bool:
+        return not self.estimate(series).exceeds
@@ -0,0 +1,254 @@
+"""
+Near-duplicate ticket detection with MinHash signatures and LSH banding
+"""
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, field
+import logging
+import re
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Normalized names of free-text columns worth comparing, in priority order
+TEXT_COLUMN_NAMES = ('subject', 'ticketsubject', 'title', 'summary',
+                     'body', 'ticketdescription', 'description', 'text', 'message', 'content')
+
+_MERSENNE_SHIFT = np.uint64(32)
+_UINT32_MASK = np.uint64(0xFFFFFFFF)
+_ROLL_BASE = np.uint64(1099511628211)  # FNV-1a 64-bit prime
+
+
+def _normalize(name: Any) -> str:
+    return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+
+def shingle_hashes(encoded: Sequence[bytes], k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """32-bit hashes of every k-byte window, text by text, and the window count per text"""
+    lengths = np.fromiter((len(item) for item in encoded), dtype=np.int64, count=len(encoded))
+    buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+    windows = np.maximum(lengths - k + 1, 0)
+
+    # Rolling polynomial hash of every k-byte window in one pass
+    n_windows = max(len(buffer) - k + 1, 0)
+    hashes = np.zeros(n_windows, dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for j in range(k):
+            hashes = hashes * _ROLL_BASE + buffer[j:j + n_windows]
+
+    # Keep windows that lie inside a single text
+    text_ends = np.cumsum(windows)
+    window_pos = np.repeat(starts - (text_ends - windows), windows) + np.arange(text_ends[-1] if len(text_ends) else 0)
+    selected = hashes[window_pos]
+    return (selected ^ (selected >> _MERSENNE_SHIFT)) & _UINT32_MASK, windows
+
+
+def select_text_columns(df: pd.DataFrame, candidates: Sequence[str] = ()) -> List[str]:
+    """Subject/body style columns, falling back to the longest candidate text column"""
+    normalized = {_normalize(col): col for col in df.columns}
+    named = [normalized[name] for name in TEXT_COLUMN_NAMES if name in normalized]
+    if named:
+        return named
+    if not candidates:
+        return []
+    lengths = {col: df[col].dropna().astype(str).str.len().mean() for col in candidates}
+    return [max(lengths, key=lambda col: lengths[col] if pd.notna(lengths[col]) else 0)]
+
+
+@dataclass
+class DuplicateReport:
+    """Near-duplicate clusters and their share of ticket volume"""
+    columns: List[str]
+    rows_analyzed: int
+    duplicate_rows: int
+    clusters: List[Dict[str, Any]] = field(default_factory=list)
+    cluster_count: int = 0
+
+    @property
+    def duplicate_share(self) -> float:
+        return self.duplicate_rows / self.rows_analyzed if self.rows_analyzed else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "columns": self.columns,
+            "rows_analyzed": self.rows_analyzed,
+            "cluster_count": self.cluster_count,
+            "duplicate_rows": self.duplicate_rows,
+            "duplicate_share": self.duplicate_share,
+            "top_clusters": self.clusters
+        }
+
+
+class NearDuplicateDetector:
+    """MinHash over character shingles, grouped with LSH bands
+
+    Shingle hashes are rolled over one concatenated byte buffer, signatures are
+    min-reduced per text in fixed-size chunks, and every LSH bucket is linked to
+    its first member after a signature check, so cost stays linear in the
+    number of texts rather than quadratic. Every cluster member is checked
+    against the cluster representative, so clusters never chain through
+    intermediate rows.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, shingle_size: int = 5,
+                 threshold: float = 0.8, chunk_shingles: int = 1 << 14, seed: int = 17):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self.chunk_shingles = chunk_shingles
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hash family: high 32 bits of (a * x + b) mod 2**64, a odd
+        self._a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+
+    def signatures(self, texts: Sequence[str]) -> np.ndarray:
+        """MinHash signature matrix of shape (len(texts), num_perm)"""
+        k = self.shingle_size
+        # Pad so texts shorter than a shingle still produce one
+        encoded = [(" ".join(str(text).lower().split()) + " " * (k - 1)).encode("utf-8") for text in texts]
+        shingles, windows = shingle_hashes(encoded, k)
+        text_ends = np.cumsum(windows)
+
+        signatures = np.full((len(encoded), self.num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+        if not len(shingles):
+            return signatures
+
+        # Chunk on text boundaries so each text is reduced exactly once
+        first = 0
+        while first < len(encoded):
+            offset = text_ends[first] - windows[first]
+            last = int(np.searchsorted(text_ends, offset + self.chunk_shingles, side='right'))
+            last = max(last, first + 1)
+            chunk = shingles[offset:text_ends[last - 1]]
+            # Permutation-major layout keeps the per-text reduction contiguous
+            with np.errstate(over='ignore'):
+                permuted = ((self._a[:, None] * chunk[None, :] + self._b[:, None]) >> _MERSENNE_SHIFT).astype(np.uint32)
+            local_starts = (text_ends[first:last] - windows[first:last]) - offset
+            nonempty = windows[first:last] > 0
+            if nonempty.any():
+                reduced = np.minimum.reduceat(permuted, local_starts[nonempty], axis=1)
+                signatures[first:last][nonempty] = reduced.T
+            first = last
+
+        return signatures
+
+    def similarity(self, signatures: np.ndarray, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        """Estimated Jaccard similarity for row pairs"""
+        return (signatures[left] == signatures[right]).mean(axis=1)
+
+    def cluster(self, signatures: np.ndarray) -> np.ndarray:
+        """Cluster label per row (its representative, the smallest row index in the cluster)"""
+        n = len(signatures)
+        labels = np.arange(n)
+        edges_left, edges_right = [], []
+
+        band_weights = np.random.default_rng(0).integers(1, 2 ** 63, self.rows, dtype=np.uint64) | np.uint64(1)
+        for band in range(self.bands):
+            rows = signatures[:, band * self.rows:(band + 1) * self.rows].astype(np.uint64)
+            with np.errstate(over='ignore'):
+                keys = (rows * band_weights).sum(axis=1)
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            group_start = np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+            # Link each bucket member to the bucket's first row (a star, not all pairs)
+            leader = order[np.maximum.accumulate(np.where(group_start, np.arange(n), 0))]
+            members = ~group_start
+            edges_left.append(leader[members])
+            edges_right.append(order[members])
+
+        if not edges_left:
+            return labels
+        left = np.concatenate(edges_left)
+        right = np.concatenate(edges_right)
+        if len(left):
+            pairs = np.unique(np.stack([left, right], axis=1), axis=0)
+            left, right = pairs[:, 0], pairs[:, 1]
+            keep = self.similarity(signatures, left, right) >= self.threshold
+            left, right = left[keep], right[keep]
+
+        # Min-label propagation with pointer jumping gives the candidate components
+        while len(left):
+            merged = np.minimum(labels[left], labels[right])
+            previous = labels.copy()
+            np.minimum.at(labels, left, merged)
+            np.minimum.at(labels, right, merged)
+            labels = labels[labels]
+            if np.array_equal(labels, previous):
+                break
+        return self._split_components(signatures, labels)
+
+    def _split_components(self, signatures: np.ndarray, labels: np.ndarray) -> np.ndarray:
+        """Re-cluster components around representatives so linked pairs cannot chain
+
+        Components of two rows are a single verified pair and stay as they are.
+        Larger ones are split greedily: the smallest unassigned row becomes the
+        representative and takes every unassigned row within the threshold of it.
+        """
+        labels = labels.copy()
+        component_ids, inverse, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+        inverse = inverse.reshape(-1)
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.concatenate(([0], np.cumsum(sizes)))
+        for component in np.flatnonzero(sizes > 2):
+            pending = order[bounds[component]:bounds[component + 1]]
+            while len(pending):
+                leader = pending[0]
+                close = self.similarity(signatures, np.full(len(pending), leader), pending) >= self.threshold
+                close[0] = True
+                labels[pending[close]] = leader
+                pending = pending[~close]
+        return labels
+
+    def detect(self, df: pd.DataFrame, columns: Optional[List[str]] = None, top_k: int = 10) -> Optional[DuplicateReport]:
+        """Near-duplicate clusters over the concatenated text columns"""
+        columns = columns or select_text_columns(df)
+        if not columns:
+            return None
+
+        # Categorical subjects are cast first so missing values can become empty strings
+        parts = df[columns].astype(object).fillna("").astype(str)
+        text = parts.agg(" ".join, axis=1) if len(columns) > 1 else parts[columns[0]]
+        valid = text.str.strip().str.len().to_numpy() > 0
+        rows = np.flatnonzero(valid)
+        texts = text.to_numpy()[valid]
+        if len(texts) < 2:
+            return DuplicateReport(columns=columns, rows_analyzed=int(len(texts)), duplicate_rows=0)
+
+        signatures = self.signatures(texts)
+        labels = self.cluster(signatures)
+        cluster_ids, inverse, sizes = np.unique(labels, return_inverse=True, return_counts=True)
+        duplicated = sizes > 1
+
+        ranked = np.flatnonzero(duplicated)
+        ranked = ranked[np.argsort(-sizes[ranked], kind='stable')][:top_k]
+        clusters = []
+        for cluster in ranked:
+            leader = int(cluster_ids[cluster])
+            members = np.flatnonzero(inverse.reshape(-1) == cluster)
+            members = members[members != leader]
+            similarity = self.similarity(signatures, np.full(len(members), leader), members)
+            clusters.append({
+                "size": int(sizes[cluster]),
+                "share": float(sizes[cluster] / len(texts)),
+                "mean_similarity": float(similarity.mean()),
+                "min_similarity": float(similarity.min()),
+                "representative_row": int(rows[leader]),
+                "sample": texts[leader][:160]
+            })
+
+        report = DuplicateReport(
+            columns=list(columns),
+            rows_analyzed=int(len(texts)),
+            # Rows beyond the first of each cluster are the redundant volume
+            duplicate_rows=int((sizes[duplicated] - 1).sum()),
+            clusters=clusters,
+            cluster_count=int(duplicated.sum())
+        )
+        logger.info(f"Found {report.cluster_count} near-duplicate clusters covering "
+                    f"{report.duplicate_share:.1%} of {report.rows_analyzed} tickets")
+        return report
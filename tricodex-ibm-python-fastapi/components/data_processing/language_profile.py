@@ -0,0 +1,201 @@
+"""
+Local language profiling with hashed character trigram scoring
+"""
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import logging
+import re
+import numpy as np
+import pandas as pd
+from .duplicates import shingle_hashes, select_text_columns
+from utils.distributions import Distribution, Contingency
+
+logger = logging.getLogger(__name__)
+
+# Normalized names of columns that already carry a language label
+LANGUAGE_COLUMN_NAMES = ('language', 'lang', 'locale', 'ticketlanguage')
+
+# Frequent function words per language; their trigrams seed the default profiles
+SEED_WORDS = {
+    "en": "the and to of you your for is in that it this with have be are on we not please can my thank would issue "
+          "problem help our as if was will an or at from dear regards",
+    "de": "der die und das ist nicht ich sie mit den von zu ein eine für auf wir ihr bitte können haben dem des sich "
+          "vielen dank grüßen sehr geehrte problem unser wurde",
+    "es": "el la de que y en los las un una por con para es no su se del al lo como más estimado gracias saludos "
+          "problema nuestro podría ayuda sobre",
+    "fr": "le la les de des et est un une pour que qui dans pas vous nous sur avec ce au du merci bonjour cordialement "
+          "problème votre notre pouvez être",
+    "pt": "o a os as de do da que e em um uma para com não por se na no mais você nosso obrigado prezado atenciosamente "
+          "problema ajuda sobre está",
+    "it": "il la di che e per non un una con sono del della gli le si come grazie cordiali saluti gentile problema "
+          "nostro essere questo",
+    "nl": "de het een en van is dat niet ik je op te met voor zijn wij ons u bedankt groeten geachte probleem kunt "
+          "graag hebben wordt"
+}
+
+TRIGRAM = 3
+BUCKETS = 1 << 14
+UNKNOWN = "unknown"
+
+
+def _encode(texts: Sequence[Any], max_chars: int) -> List[bytes]:
+    """Lowercased letters-only text, padded so word edges become trigrams"""
+    return [
+        (" " + " ".join(re.findall(r"[^\W\d_]+", str(text).lower()[:max_chars])) + " ").encode("utf-8")
+        for text in texts
+    ]
+
+
+def _bucket_counts(encoded: Sequence[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+    hashes, windows = shingle_hashes(encoded, TRIGRAM)
+    return (hashes % np.uint64(BUCKETS)).astype(np.int64), windows
+
+
+def _log_profile(counts: np.ndarray, alpha: float = 0.5) -> np.ndarray:
+    smoothed = counts + alpha
+    return np.log(smoothed / smoothed.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+class LanguageProfiler:
+    """Naive Bayes language scoring over hashed character trigrams
+
+    Profiles are seeded from function words and replaced by profiles fitted on
+    a labelled language column when the dataset has one, so only unlabelled
+    rows are classified.
+    """
+
+    def __init__(self, max_chars: int = 600, chunk_trigrams: int = 1 << 16, min_trigrams: int = 8):
+        self.max_chars = max_chars
+        self.chunk_trigrams = chunk_trigrams
+        self.min_trigrams = min_trigrams
+        seed_texts = [" ".join(f" {word} " for word in words.split()) for words in SEED_WORDS.values()]
+        self.languages = np.array(list(SEED_WORDS))
+        self.log_probs = self._fit_counts(_encode(seed_texts, 10_000), np.arange(len(seed_texts)), len(seed_texts))
+
+    @classmethod
+    def fitted(cls, texts: Sequence[Any], labels: Sequence[Any], **kwargs) -> 'LanguageProfiler':
+        """Profiler whose profiles come from labelled tickets"""
+        profiler = cls(**kwargs)
+        codes, languages = pd.factorize(pd.Series(labels).astype(str))
+        profiler.languages = np.asarray(languages)
+        profiler.log_probs = profiler._fit_counts(_encode(texts, profiler.max_chars), codes, len(languages))
+        return profiler
+
+    def _fit_counts(self, encoded: Sequence[bytes], codes: np.ndarray, n_languages: int) -> np.ndarray:
+        buckets, windows = _bucket_counts(encoded)
+        owners = np.repeat(np.asarray(codes, dtype=np.int64), windows)
+        counts = np.bincount(owners * BUCKETS + buckets, minlength=n_languages * BUCKETS)
+        return _log_profile(counts.reshape(n_languages, BUCKETS).astype(np.float64))
+
+    def scores(self, texts: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """Summed log-likelihood per (text, language) and the trigram count per text"""
+        buckets, windows = _bucket_counts(_encode(texts, self.max_chars))
+        scores = np.zeros((len(windows), len(self.languages)), dtype=np.float32)
+        text_ends = np.cumsum(windows)
+
+        first = 0
+        while first < len(windows):
+            offset = text_ends[first] - windows[first]
+            last = max(int(np.searchsorted(text_ends, offset + self.chunk_trigrams, side='right')), first + 1)
+            nonempty = windows[first:last] > 0
+            if nonempty.any():
+                # Gather language log-probs for every trigram, then sum per text
+                gathered = self.log_probs[:, buckets[offset:text_ends[last - 1]]]
+                local_starts = (text_ends[first:last] - windows[first:last])[nonempty] - offset
+                scores[first:last][nonempty] = np.add.reduceat(gathered, local_starts, axis=1).T
+            first = last
+        return scores, windows
+
+    def classify(self, texts: Sequence[Any]) -> np.ndarray:
+        """Most likely language per text, UNKNOWN when there is too little text"""
+        scores, windows = self.scores(texts)
+        labels = self.languages[scores.argmax(axis=1)] if len(self.languages) else np.full(len(windows), UNKNOWN)
+        return np.where(windows >= self.min_trigrams, labels, UNKNOWN)
+
+
+def detect_language_column(df: pd.DataFrame) -> Optional[str]:
+    normalized = {re.sub(r'[^a-z0-9]', '', str(col).lower()): col for col in df.columns}
+    for name in LANGUAGE_COLUMN_NAMES:
+        if name in normalized:
+            return normalized[name]
+    return None
+
+
+def profile_languages(df: pd.DataFrame, text_columns: Optional[List[str]] = None,
+                      durations: Optional[pd.Series] = None, durations_label: Optional[str] = None,
+                      group_columns: Sequence[str] = ('priority', 'type', 'queue', 'Ticket Priority', 'Ticket Type'),
+                      top_k: int = 5) -> Optional[Dict[str, Any]]:
+    """Language distribution and per-language ticket metrics, computed locally"""
+    language_column = detect_language_column(df)
+    text_columns = text_columns or select_text_columns(df)
+    if language_column is None and not text_columns:
+        return None
+
+    labels = df[language_column].astype(object) if language_column else pd.Series(np.nan, index=df.index, dtype=object)
+    # Blank labels (e.g. after fillna('')) count as missing
+    labels = labels.where(labels.astype(str).str.strip() != "", np.nan)
+    missing = labels.isna().to_numpy()
+    detected = 0
+    agreement = None
+
+    if text_columns and missing.any():
+        text = df[text_columns].astype(object).fillna("").astype(str).agg(" ".join, axis=1)
+        labelled = ~missing
+        if labelled.sum() >= 50 and labels[labelled].nunique() > 1:
+            profiler = LanguageProfiler.fitted(text[labelled].to_numpy(), labels[labelled].to_numpy())
+        else:
+            profiler = LanguageProfiler()
+        predicted = profiler.classify(text[missing].to_numpy())
+        labels = labels.copy()
+        labels[missing] = predicted
+        detected = int(missing.sum())
+    elif text_columns and language_column:
+        # Report how well local scoring matches the labels, on a bounded sample
+        sample = df.sample(min(len(df), 2000), random_state=0) if len(df) > 2000 else df
+        text = sample[text_columns].astype(object).fillna("").astype(str).agg(" ".join, axis=1)
+        predicted = LanguageProfiler().classify(text.to_numpy())
+        known = np.isin(sample[language_column].astype(str).to_numpy(), list(SEED_WORDS))
+        if known.any():
+            agreement = float((predicted[known] == sample[language_column].astype(str).to_numpy()[known]).mean())
+
+    labels = labels.fillna(UNKNOWN).astype(str)
+    counts = labels.value_counts()
+    total = int(counts.sum())
+
+    per_language: Dict[str, Dict[str, Any]] = {
+        language: {"tickets": int(count), "share": float(count / total) if total else 0.0}
+        for language, count in counts.head(top_k * 2).items()
+    }
+
+    if durations is not None:
+        # Negative intervals are swapped or mis-parsed timestamps, not fast tickets
+        durations = durations.where(durations >= 0)
+        grouped = durations.groupby(labels).agg(["mean", "median", "count"])
+        for language, row in grouped.iterrows():
+            if language in per_language and row["count"]:
+                per_language[language][durations_label or "duration_seconds"] = {
+                    "mean": float(row["mean"]),
+                    "median": float(row["median"])
+                }
+
+    for col in group_columns:
+        if col in df.columns and col != language_column:
+            table = Contingency.from_series(labels, df[col].astype(object))
+            rows = {language: i for i, language in enumerate(table.rows.tolist())}
+            for language in per_language:
+                if language in rows:
+                    row = pd.Series(table.values[rows[language]], index=table.columns)
+                    # Top three values as shares of all the language's tickets
+                    per_language[language][str(col)] = Distribution.from_counts(
+                        row.sort_values(ascending=False, kind="stable")
+                    ).normalize().head(3)
+
+    return {
+        "source": "column" if not detected else ("detected" if language_column is None else "column+detected"),
+        "language_column": language_column,
+        "text_columns": text_columns,
+        "languages": int(len(counts)),
+        "distribution": Distribution.from_counts(counts).normalize().head(top_k * 2),
+        "detected_rows": detected,
+        "local_agreement": agreement,
+        "per_language": per_language
+    }
@@ -0,0 +1,246 @@
+"""
+Column-parallel statistics over shared-memory column buffers
+"""
+from typing import Dict, Any, List, Optional, Set, Tuple
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import logging
+import os
+import weakref
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_datetime64_ns_dtype, is_string_dtype
+from utils.distributions import Distribution
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 5
+NAT = np.iinfo(np.int64).min
+
+# Buffer layouts shared with workers
+CODES = "codes"        # category or factorized codes, -1 for missing
+NUMERIC = "numeric"    # float/int values, NaN for missing
+DATETIME = "datetime"  # int64 nanoseconds, NaT sentinel for missing
+
+
+@dataclass
+class ColumnStats:
+    """Per-column statistics shared by quality and metric calculations"""
+    missing: int
+    unique: int
+    top_values: Distribution
+    value_counts: Optional[Distribution] = None
+
+
+@dataclass(frozen=True)
+class _Segment:
+    offset: int
+    length: int
+    dtype: str
+
+
+@dataclass(frozen=True)
+class _ColumnSpec:
+    name: Any
+    layout: str
+    segments: Tuple[_Segment, ...]
+    with_counts: bool
+
+
+def compute_column_stats(series: pd.Series, with_counts: bool = False) -> ColumnStats:
+    """Single-process statistics for one column"""
+    counts = Distribution.from_series(series)
+
+    return ColumnStats(
+        missing=int(series.isna().sum()),
+        unique=len(counts),
+        top_values=counts.head(TOP_K),
+        value_counts=counts if with_counts else None
+    )
+
+
+def _attach(shm: shared_memory.SharedMemory, segment: _Segment) -> np.ndarray:
+    return np.ndarray((segment.length,), dtype=np.dtype(segment.dtype), buffer=shm.buf, offset=segment.offset)
+
+
+def _summarize(counts: pd.Series, with_counts: bool) -> Tuple[List[Any], List[int], Optional[Tuple[List[Any], List[int]]]]:
+    top = counts.head(TOP_K)
+    full = (counts.index.tolist(), counts.tolist()) if with_counts else None
+    return top.index.tolist(), top.tolist(), full
+
+
+def _column_worker(shm_name: str, spec: _ColumnSpec) -> Tuple[Any, int, int, List[Any], List[int], Any]:
+    """Compute statistics for one column inside a worker process"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        if spec.layout == CODES:
+            codes = _attach(shm, spec.segments[0])
+            valid = codes[codes >= 0]
+            missing = int(len(codes) - len(valid))
+            bins = np.bincount(valid.astype(np.int64))
+            observed = np.flatnonzero(bins)
+            counts = pd.Series(bins[observed], index=observed).sort_values(ascending=False, kind="stable")
+            del codes, valid
+
+        elif spec.layout == DATETIME:
+            values = _attach(shm, spec.segments[0])
+            valid = values[values != NAT]
+            missing = int(len(values) - len(valid))
+            counts = pd.Series(valid).value_counts()
+            del values, valid
+
+        else:
+            values = _attach(shm, spec.segments[0])
+            series = pd.Series(values.copy())
+            missing = int(series.isna().sum())
+            counts = series.value_counts()
+            del values
+
+        top_keys, top_counts, full_counts = _summarize(counts, spec.with_counts)
+        return spec.name, missing, int(len(counts)), top_keys, top_counts, full_counts
+    finally:
+        shm.close()
+
+
+class ColumnParallelExecutor:
+    """Compute per-column statistics serially or across a process pool"""
+
+    def __init__(self, workers: Optional[int] = None, min_cells: int = 1_000_000):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.min_cells = min_cells
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def should_parallelize(self, df: pd.DataFrame) -> bool:
+        return self.workers > 1 and len(df.columns) > 1 and df.size >= self.min_cells
+
+    def column_stats(self, df: pd.DataFrame, count_columns: Set[Any]) -> Dict[Any, ColumnStats]:
+        """Statistics for every column, merged into one mapping"""
+        if not self.should_parallelize(df):
+            return self._serial_stats(df, count_columns)
+
+        try:
+            return self._parallel_stats(df, count_columns)
+        except Exception as e:
+            logger.warning(f"Column-parallel statistics failed, falling back to single process: {e}")
+            return self._serial_stats(df, count_columns)
+
+    @staticmethod
+    def _serial_stats(df: pd.DataFrame, count_columns: Set[Any]) -> Dict[Any, ColumnStats]:
+        return {
+            col: compute_column_stats(df[col], col in count_columns)
+            for col in df.columns
+        }
+
+    def _parallel_stats(self, df: pd.DataFrame, count_columns: Set[Any]) -> Dict[Any, ColumnStats]:
+        buffers, total_bytes, specs, decoders, serial_cols = self._encode_columns(df, count_columns)
+        if not specs:
+            return self._serial_stats(df, count_columns)
+        stats: Dict[Any, ColumnStats] = {}
+
+        shm = shared_memory.SharedMemory(create=True, size=max(1, total_bytes))
+        try:
+            for segment, array in buffers:
+                target = _attach(shm, segment)
+                target[:] = array
+                del target
+
+            pool = self._get_pool()
+            futures = [pool.submit(_column_worker, shm.name, spec) for spec in specs]
+
+            # Columns kept in this process run here meanwhile
+            for col in serial_cols:
+                stats[col] = compute_column_stats(df[col], col in count_columns)
+
+            for future in futures:
+                name, missing, unique, top_keys, top_counts, full_counts = future.result()
+                decode = decoders.get(name, np.asarray)
+                total = float(len(df) - missing)
+                stats[name] = ColumnStats(
+                    missing=missing,
+                    unique=unique,
+                    top_values=Distribution.from_arrays(decode(top_keys), top_counts, total),
+                    value_counts=Distribution.from_arrays(decode(full_counts[0]), full_counts[1], total) if full_counts else None
+                )
+        finally:
+            shm.close()
+            shm.unlink()
+
+        logger.debug(f"Computed statistics for {len(specs)} columns across {self.workers} workers")
+        return {col: stats[col] for col in df.columns}
+
+    def _encode_columns(self, df: pd.DataFrame, count_columns: Set[Any]):
+        """Lay columns out as flat arrays for shared memory"""
+        buffers: List[Tuple[_Segment, np.ndarray]] = []
+        specs: List[_ColumnSpec] = []
+        decoders: Dict[Any, Any] = {}
+        serial_cols: List[Any] = []
+        offset = 0
+
+        def add(array: np.ndarray) -> _Segment:
+            nonlocal offset
+            array = np.ascontiguousarray(array)
+            segment = _Segment(offset, len(array), array.dtype.str)
+            buffers.append((segment, array))
+            # Keep every segment 8-byte aligned
+            offset += (array.nbytes + 7) // 8 * 8
+            return segment
+
+        for col in df.columns:
+            series = df[col]
+            with_counts = col in count_columns
+
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                categories = series.cat.categories
+                segments = (add(series.cat.codes.to_numpy()),)
+                specs.append(_ColumnSpec(col, CODES, segments, with_counts))
+                decoders[col] = lambda codes, categories=categories: np.asarray(categories.take(codes))
+
+            elif is_datetime64_ns_dtype(series) and series.dt.tz is None:
+                segments = (add(series.to_numpy().view(np.int64)),)
+                specs.append(_ColumnSpec(col, DATETIME, segments, with_counts))
+                decoders[col] = lambda values: np.asarray(values, dtype=np.int64).view('datetime64[ns]')
+
+            elif series.dtype.kind in "if" and not is_bool_dtype(series):
+                segments = (add(series.to_numpy()),)
+                specs.append(_ColumnSpec(col, NUMERIC, segments, with_counts))
+
+            elif series.dtype == object or is_string_dtype(series):
+                # Factorized here, so workers get flat int codes instead of Python strings
+                try:
+                    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+                except TypeError:
+                    # Unhashable values (lists, dicts) cannot be coded
+                    serial_cols.append(col)
+                    continue
+                segments = (add(codes.astype(np.int64, copy=False)),)
+                specs.append(_ColumnSpec(col, CODES, segments, with_counts))
+                decoders[col] = lambda codes, uniques=uniques: np.asarray(uniques.take(codes), dtype=object)
+
+            else:
+                serial_cols.append(col)
+
+        return buffers, offset, specs, decoders, serial_cols
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            _running.add(self)
+        return self._pool
+
+    def shutdown(self) -> None:
+        """Release worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        _running.discard(self)
+
+
+# Executors holding a worker pool, so application shutdown can release them all
+_running: "weakref.WeakSet[ColumnParallelExecutor]" = weakref.WeakSet()
+
+
+def shutdown_executors() -> None:
+    """Release the worker pools of every executor"""
+    for executor in list(_running):
+        executor.shutdown()
@@ -0,0 +1,176 @@
+"""
+Compiled, immutable schema plans for ticket datasets
+"""
+from typing import Dict, Any, Optional, Tuple, TYPE_CHECKING
+from dataclasses import dataclass
+import hashlib
+import logging
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_numeric_dtype, is_bool_dtype
+from .timestamp_formats import TimestampFormatDetector, schema_fingerprint, is_time_hinted
+from .cardinality import CardinalityEstimator
+
+if TYPE_CHECKING:
+    from .ticket_processor import ProcessingConfig
+
+logger = logging.getLogger(__name__)
+
+# Column roles
+TEMPORAL = "temporal"
+CATEGORICAL = "categorical"
+NUMERIC = "numeric"
+TEXT = "text"
+OTHER = "other"
+
+# Conversions applied when a plan runs
+TO_DATETIME = "datetime"
+TO_CATEGORY = "category"
+
+
+@dataclass(frozen=True)
+class ColumnPlan:
+    """Role, source dtype and conversion for a single column"""
+    name: str
+    role: str
+    dtype: str
+    conversion: Optional[str] = None
+    datetime_format: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class SchemaPlan:
+    """Immutable column plan derived from a header and a sample"""
+    fingerprint: str
+    columns: Tuple[ColumnPlan, ...]
+
+    @property
+    def column_names(self) -> Tuple[str, ...]:
+        return tuple(col.name for col in self.columns)
+
+    @property
+    def time_columns(self) -> Tuple[str, ...]:
+        return tuple(col.name for col in self.columns if col.role == TEMPORAL)
+
+    @property
+    def categorical_columns(self) -> Tuple[str, ...]:
+        return tuple(col.name for col in self.columns if col.role == CATEGORICAL)
+
+    @property
+    def text_columns(self) -> Tuple[str, ...]:
+        return tuple(col.name for col in self.columns if col.role == TEXT)
+
+    def roles(self) -> Dict[str, str]:
+        """Map of column name to role"""
+        return {col.name: col.role for col in self.columns}
+
+    def apply(self, df: pd.DataFrame, detector: Optional[TimestampFormatDetector] = None) -> pd.DataFrame:
+        """Run the planned conversions without re-detecting anything"""
+        if schema_fingerprint(df.columns) != self.fingerprint:
+            raise ValueError("Schema plan does not match dataset header")
+
+        detector = detector or TimestampFormatDetector()
+        for col in self.columns:
+            if col.conversion == TO_DATETIME:
+                df[col.name] = detector.parse(df[col.name], col.datetime_format)
+            elif col.conversion == TO_CATEGORY:
+                df[col.name] = df[col.name].astype('category')
+        return df
+
+
+class SchemaPlanCompiler:
+    """Compile and cache schema plans keyed by header hash"""
+
+    # Shared across processor instances so recurring exports reuse their plan
+    _cache: Dict[str, SchemaPlan] = {}
+
+    def __init__(self, config: 'ProcessingConfig', sample_size: int = 2000,
+                 categorical_ratio: float = 0.05, max_cache_size: int = 256):
+        self.config = config
+        self.sample_size = sample_size
+        self.categorical_ratio = categorical_ratio
+        self.max_cache_size = max_cache_size
+        self._format_detector = TimestampFormatDetector()
+        self._cardinality = CardinalityEstimator(ratio=categorical_ratio, sample_size=sample_size)
+
+    def compile(self, df: pd.DataFrame) -> SchemaPlan:
+        """Return the cached plan for this header, compiling it on first sight"""
+        fingerprint = schema_fingerprint(df.columns)
+        key = self._cache_key(fingerprint)
+        plan = self._cache.get(key)
+        if plan is not None and self._formats_match(df, plan):
+            return plan
+
+        plan = self._compile(df, fingerprint)
+        self._store(key, plan)
+        logger.info(f"Compiled schema plan {fingerprint[:8]} for {len(plan.columns)} columns")
+        return plan
+
+    def _compile(self, df: pd.DataFrame, fingerprint: str) -> SchemaPlan:
+        time_candidates = [
+            col for col in df.columns
+            if is_time_hinted(col) or col in self.config.time_columns
+        ]
+        formats = self._format_detector.detect(df, time_candidates)
+
+        columns = tuple(
+            self._plan_column(col, df[col], formats.get(col), col in formats)
+            for col in df.columns
+        )
+        return SchemaPlan(fingerprint=fingerprint, columns=columns)
+
+    def _plan_column(self, name: Any, series: pd.Series, fmt: Optional[str], is_time_candidate: bool) -> ColumnPlan:
+        dtype = str(series.dtype)
+
+        if is_datetime64_any_dtype(series):
+            return ColumnPlan(name, TEMPORAL, dtype)
+        # Name-hinted columns convert with a fixed format when one fits the sample,
+        # else with one inferred parse when pandas can read the sample at all
+        if is_time_candidate and (fmt is not None or name in self.config.time_columns
+                                  or self._format_detector.infers(series)):
+            return ColumnPlan(name, TEMPORAL, dtype, TO_DATETIME, fmt)
+        if name in self.config.categorical_columns:
+            # Configured categoricals only convert when they are low cardinality
+            conversion = TO_CATEGORY if self._is_low_cardinality(series) else None
+            return ColumnPlan(name, CATEGORICAL, dtype, conversion)
+        if is_bool_dtype(series) or is_numeric_dtype(series):
+            return ColumnPlan(name, NUMERIC, dtype)
+        if dtype in ('object', 'category', 'string'):
+            if self._is_low_cardinality(series):
+                return ColumnPlan(name, CATEGORICAL, dtype, TO_CATEGORY)
+            return ColumnPlan(name, TEXT, dtype)
+
+        return ColumnPlan(name, OTHER, dtype)
+
+    def _formats_match(self, df: pd.DataFrame, plan: SchemaPlan) -> bool:
+        """A cached plan is reused only while its date formats still parse this file"""
+        for col in plan.columns:
+            if col.datetime_format and not self._format_detector.matches(df[col.name], col.datetime_format):
+                logger.info(f"Schema plan {plan.fingerprint[:8]} no longer fits column {col.name!r}; recompiling")
+                return False
+        return True
+
+    def _is_low_cardinality(self, series: pd.Series) -> bool:
+        """Less than the configured share of unique values, estimated with early exit"""
+        return self._cardinality.is_low_cardinality(series)
+
+    def _cache_key(self, fingerprint: str) -> str:
+        """Plans depend on the header and on the processing configuration"""
+        settings = "|".join([
+            ",".join(sorted(map(str, self.config.time_columns))),
+            ",".join(sorted(map(str, self.config.categorical_columns))),
+            str(self.sample_size),
+            str(self.categorical_ratio)
+        ])
+        return f"{fingerprint}:{hashlib.sha1(settings.encode('utf-8')).hexdigest()[:12]}"
+
+    def _store(self, key: str, plan: SchemaPlan) -> None:
+        if key not in self._cache and len(self._cache) >= self.max_cache_size:
+            # Remove oldest entry
+            oldest_key = next(iter(self._cache))
+            del self._cache[oldest_key]
+        self._cache[key] = plan
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Drop all cached plans"""
+        cls._cache.clear()
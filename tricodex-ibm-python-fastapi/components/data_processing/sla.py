@@ -0,0 +1,360 @@
+"""
+SLA analytics: response and resolution percentiles, breach rates and survival curves
+"""
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, field, asdict
+from itertools import combinations
+import hashlib
+import json
+import logging
+import os
+import re
+import numpy as np
+import pandas as pd
+from .timestamp_formats import TimestampFormatDetector
+
+logger = logging.getLogger(__name__)
+
+# Targets in hours per normalized priority; "default" covers unknown priorities
+DEFAULT_RESPONSE_TARGETS = {"critical": 1.0, "urgent": 1.0, "high": 4.0, "medium": 8.0, "low": 24.0, "default": 24.0}
+DEFAULT_RESOLUTION_TARGETS = {"critical": 8.0, "urgent": 8.0, "high": 24.0, "medium": 72.0, "low": 120.0, "default": 72.0}
+
+CLOSED_STATUSES = ('closed', 'resolved', 'solved', 'done', 'completed')
+
+
+def _targets_from_env(name: str, default: Dict[str, float]) -> Dict[str, float]:
+    """Default targets overridden by a JSON object of priority -> hours"""
+    raw = os.getenv(name)
+    if not raw:
+        return dict(default)
+    return {**default, **{str(key).lower(): float(hours) for key, hours in json.loads(raw).items()}}
+
+
+def _normalize(name: Any) -> str:
+    return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+
+def _number(value: Any) -> Optional[float]:
+    return None if value is None or pd.isna(value) else float(value)
+
+
+@dataclass
+class SLAConfig:
+    """Dimensions, percentiles and per-priority targets for SLA analytics"""
+    # Grouping dimensions, matched against normalized column names
+    dimensions: Tuple[str, ...] = ('priority', 'channel')
+    percentiles: Tuple[float, ...] = (0.5, 0.9, 0.95)
+    response_targets: Dict[str, float] = field(
+        default_factory=lambda: _targets_from_env("SLA_RESPONSE_TARGETS_HOURS", DEFAULT_RESPONSE_TARGETS))
+    resolution_targets: Dict[str, float] = field(
+        default_factory=lambda: _targets_from_env("SLA_RESOLUTION_TARGETS_HOURS", DEFAULT_RESOLUTION_TARGETS))
+    survival_points: int = 20
+    min_group_size: int = 5
+    # Column name fragments per role, most specific first
+    column_hints: Dict[str, Tuple[str, ...]] = field(default_factory=lambda: {
+        "opened": ('createdat', 'openedat', 'submittedat', 'created', 'opened', 'submitted'),
+        "first_response": ('firstresponse', 'respondedat', 'responsetime'),
+        "resolved": ('timetoresolution', 'resolvedat', 'closedat', 'resolutiontime', 'resolved'),
+        "status": ('status', 'state'),
+        "satisfaction": ('satisfaction', 'csat', 'rating')
+    })
+
+
+def kaplan_meier(durations: np.ndarray, observed: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Event times and the probability a ticket is still open after each of them
+
+    Tickets that are not resolved yet are censored at their current age.
+    """
+    order = np.argsort(durations, kind="stable")
+    ordered = durations[order]
+    events = observed[order].astype(np.int64)
+    times, first, _ = np.unique(ordered, return_index=True, return_counts=True)
+    resolved = np.add.reduceat(events, first) if len(first) else np.zeros(0, dtype=np.int64)
+    at_risk = len(ordered) - first
+    survival = np.cumprod(1.0 - resolved / at_risk)
+    has_event = resolved > 0
+    return times[has_event], survival[has_event]
+
+
+class SLAEngine:
+    """Response and resolution SLA metrics for every combination of dimensions
+
+    The relevant columns are parsed once, each ticket row is stacked once per
+    grouping set (overall, each dimension, each combination), and a single
+    groupby over the stacked keys yields percentiles, breach rates and
+    satisfaction for all groups. Results are cached per dataset fingerprint.
+    """
+
+    # Shared across instances so re-analysing the same upload is free
+    _cache: Dict[str, Dict[str, Any]] = {}
+
+    def __init__(self, config: Optional[SLAConfig] = None, max_cache_size: int = 32):
+        self.config = config or SLAConfig()
+        self.max_cache_size = max_cache_size
+        self._format_detector = TimestampFormatDetector()
+
+    def resolve_columns(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """Columns playing each SLA role, plus the grouping dimensions"""
+        normalized = {col: _normalize(col) for col in df.columns}
+        used = set()
+        roles: Dict[str, Any] = {}
+        for role, hints in self.config.column_hints.items():
+            roles[role] = next(
+                (col for hint in hints for col, name in normalized.items() if hint in name and col not in used),
+                None
+            )
+            if roles[role] is not None:
+                used.add(roles[role])
+        roles["resolution_duration"] = self._resolution_duration_column(df, used)
+        roles["dimensions"] = [
+            col for col in (
+                next((col for col, name in normalized.items() if name == _normalize(dim)), None)
+                or next((col for col, name in normalized.items() if _normalize(dim) in name and col not in used), None)
+                for dim in self.config.dimensions
+            ) if col is not None
+        ]
+        return roles
+
+    def analyze(self, df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+        """SLA metrics for a ticket dataset, or None when no durations can be derived"""
+        roles = self.resolve_columns(df)
+        columns = [col for col in dict.fromkeys(
+            [roles[role] for role in self.config.column_hints] + [roles["resolution_duration"]] + roles["dimensions"]
+        ) if col is not None]
+        if not columns:
+            return None
+
+        key = self._fingerprint(df[columns])
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = self._analyze(df, roles)
+        self._store(key, result)
+        return result
+
+    def _fingerprint(self, frame: pd.DataFrame) -> str:
+        digest = hashlib.sha1(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+        digest.update(json.dumps([list(map(str, frame.columns)), asdict(self.config)], sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _parse(self, df: pd.DataFrame, col: Any) -> Tuple[Optional[str], Optional[pd.Series]]:
+        """('timestamp', datetimes) or ('duration', hours) for a role column"""
+        if col is None:
+            return None, None
+        series = df[col]
+        if pd.api.types.is_timedelta64_dtype(series):
+            return "duration", series.dt.total_seconds() / 3600
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            return "duration", series.astype(np.float64)
+        fmt = self._format_detector.detect(df, [col])[col]
+        parsed = self._format_detector.parse(series, fmt)
+        if parsed.notna().any():
+            return "timestamp", parsed
+        return None, None
+
+    def _analyze(self, df: pd.DataFrame, roles: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        opened_kind, opened = self._parse(df, roles["opened"])
+        response_kind, response = self._parse(df, roles["first_response"])
+        resolved_kind, resolved = self._parse(df, roles["resolved"])
+        opened = opened if opened_kind == "timestamp" else None
+
+        # Response time needs an opening timestamp unless it is already a duration
+        response_hours, response_basis = None, None
+        if response_kind == "duration":
+            response_hours, response_basis = response, str(roles["first_response"])
+        elif response_kind == "timestamp" and opened is not None:
+            response_hours = (response - opened).dt.total_seconds() / 3600
+            response_basis = f"{roles['opened']} -> {roles['first_response']}"
+
+        # Resolution runs from opening; without an opening time only an explicit duration column can be used
+        resolution_hours, resolution_basis = None, None
+        if resolved_kind == "duration":
+            resolution_hours, resolution_basis = resolved, str(roles["resolved"])
+        elif resolved_kind == "timestamp" and opened is not None:
+            resolution_hours = (resolved - opened).dt.total_seconds() / 3600
+            resolution_basis = f"{roles['opened']} -> {roles['resolved']}"
+        elif roles["resolution_duration"] is not None:
+            resolution_hours = self._parse(df, roles["resolution_duration"])[1]
+            resolution_basis = str(roles["resolution_duration"])
+
+        if response_hours is None and resolution_hours is None:
+            return None
+
+        empty = pd.Series(np.nan, index=df.index)
+        response_hours = empty if response_hours is None else response_hours
+        resolution_hours = empty if resolution_hours is None else resolution_hours
+        invalid = {
+            "response": int((response_hours < 0).sum()),
+            "resolution": int((resolution_hours < 0).sum())
+        }
+        response_hours = response_hours.where(response_hours >= 0)
+        resolution_hours = resolution_hours.where(resolution_hours >= 0)
+
+        if roles["status"] is not None:
+            status = df[roles["status"]].astype(str).str.strip().str.lower()
+            closed = status.isin(CLOSED_STATUSES).to_numpy()
+        else:
+            closed = resolution_hours.notna().to_numpy()
+
+        priority_col = next((col for col in roles["dimensions"] if 'priority' in _normalize(col)), None)
+        priority = df[priority_col].astype(str).str.strip().str.lower() if priority_col is not None else None
+        measures = pd.DataFrame({
+            "response": response_hours.to_numpy(dtype=np.float64),
+            "resolution": resolution_hours.to_numpy(dtype=np.float64),
+            "response_breach": self._breaches(response_hours, priority, self.config.response_targets),
+            "resolution_breach": self._breaches(resolution_hours, priority, self.config.resolution_targets),
+            "satisfaction": (pd.to_numeric(df[roles["satisfaction"]], errors='coerce').to_numpy(dtype=np.float64)
+                             if roles["satisfaction"] is not None else np.full(len(df), np.nan))
+        })
+
+        timestamps = [series for kind, series in ((opened_kind, opened), (response_kind, response), (resolved_kind, resolved))
+                      if kind == "timestamp" and series is not None]
+        as_of = max(series.max() for series in timestamps) if timestamps else None
+
+        return {
+            "columns": {role: (str(roles[role]) if roles[role] is not None else None) for role in self.config.column_hints},
+            "dimensions": [str(col) for col in roles["dimensions"]],
+            "basis": {"response": response_basis, "resolution": resolution_basis},
+            "targets_hours": {"response": self.config.response_targets, "resolution": self.config.resolution_targets},
+            "as_of": as_of.isoformat() if as_of is not None and not pd.isna(as_of) else None,
+            "groups": self._grouped_metrics(df, roles["dimensions"], measures),
+            "survival": self._survival(df, roles["dimensions"][:1], resolution_hours, closed, opened, as_of),
+            "data_quality": {
+                "negative_durations": invalid,
+                "open_tickets": int((~closed).sum()),
+                "closed_without_resolution_time": int((closed & resolution_hours.isna().to_numpy()).sum())
+            }
+        }
+
+    @staticmethod
+    def _resolution_duration_column(df: pd.DataFrame, used: set) -> Optional[Any]:
+        """Numeric or timedelta column holding time to resolution, used when no interval can be measured"""
+        for col in df.columns:
+            if col in used or not any(hint in _normalize(col) for hint in ('resolution', 'resolve')):
+                continue
+            series = df[col]
+            if pd.api.types.is_timedelta64_dtype(series) or (
+                    pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)):
+                return col
+        return None
+
+    @staticmethod
+    def _breaches(hours: pd.Series, priority: Optional[pd.Series], targets: Dict[str, float]) -> np.ndarray:
+        """1.0 where a duration exceeds its priority target, NaN where unknown"""
+        default = targets.get("default", np.inf)
+        if priority is None:
+            limit = np.full(len(hours), default)
+        else:
+            limit = priority.map(targets).fillna(default).to_numpy(dtype=np.float64)
+        values = hours.to_numpy(dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            return np.where(np.isnan(values), np.nan, (values > limit).astype(np.float64))
+
+    def _grouped_metrics(self, df: pd.DataFrame, dimensions: Sequence[Any],
+                         measures: pd.DataFrame) -> Dict[str, List[Dict[str, Any]]]:
+        """One groupby over all grouping sets stacked into a single key space"""
+        factorized = [pd.factorize(df[col].astype(object), sort=True) for col in dimensions]
+        sizes = [max(len(uniques), 1) for _, uniques in factorized]
+        sets = [combo for r in range(len(dimensions) + 1) for combo in combinations(range(len(dimensions)), r)]
+
+        positions, keys, ranges = [], [], []
+        offset = 0
+        for combo in sets:
+            if combo:
+                codes = np.vstack([factorized[i][0] for i in combo])
+                valid = (codes >= 0).all(axis=0)
+                shape = tuple(sizes[i] for i in combo)
+                combined = np.ravel_multi_index(codes[:, valid], shape)
+                rows = np.flatnonzero(valid)
+            else:
+                shape, combined, rows = (), np.zeros(len(df), dtype=np.int64), np.arange(len(df))
+            positions.append(rows)
+            keys.append(combined + offset)
+            ranges.append((combo, shape, offset))
+            offset += int(np.prod(shape)) if combo else 1
+
+        stacked = measures.iloc[np.concatenate(positions)].reset_index(drop=True)
+        grouped = stacked.groupby(np.concatenate(keys), sort=True)
+        tickets = grouped.size()
+        quantiles = grouped[["response", "resolution"]].quantile(list(self.config.percentiles))
+        means = grouped[["response_breach", "resolution_breach", "satisfaction"]].mean()
+        observed = grouped[["response", "resolution"]].count()
+
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for combo, shape, start in ranges:
+            label = " x ".join(str(dimensions[i]) for i in combo) if combo else "overall"
+            entries = []
+            for key in tickets.index[(tickets.index >= start) & (tickets.index < start + (int(np.prod(shape)) if combo else 1))]:
+                count = int(tickets[key])
+                if combo and count < self.config.min_group_size:
+                    continue
+                entry: Dict[str, Any] = {}
+                if combo:
+                    for i, code in zip(combo, np.unravel_index(key - start, shape)):
+                        value = factorized[i][1][code]
+                        entry[str(dimensions[i])] = value.item() if hasattr(value, "item") else value
+                entry["tickets"] = count
+                for measure in ("response", "resolution"):
+                    entry[f"{measure}_hours"] = {
+                        f"p{int(round(q * 100))}": _number(quantiles.loc[(key, q), measure])
+                        for q in self.config.percentiles
+                    } if observed.loc[key, measure] else None
+                    entry[f"{measure}_breach_rate"] = _number(means.loc[key, f"{measure}_breach"])
+                entry["satisfaction"] = _number(means.loc[key, "satisfaction"])
+                entries.append(entry)
+            if combo:
+                entries.sort(key=lambda entry: -entry["tickets"])
+            groups[label] = entries
+        return groups
+
+    def _survival(self, df: pd.DataFrame, dimensions: Sequence[Any], resolution_hours: pd.Series,
+                  closed: np.ndarray, start: Optional[pd.Series], as_of: Any) -> Optional[Dict[str, Any]]:
+        """Kaplan-Meier curves of time to resolution, overall and per first dimension"""
+        durations = resolution_hours.to_numpy(dtype=np.float64).copy()
+        observed = closed & ~np.isnan(durations)
+        if start is not None and as_of is not None:
+            # Open tickets are censored at their age on the latest observed timestamp
+            age = ((as_of - start).dt.total_seconds() / 3600).to_numpy(dtype=np.float64)
+            censored = ~closed & ~np.isnan(age) & (age >= 0)
+            durations[censored] = age[censored]
+        else:
+            censored = np.zeros(len(durations), dtype=bool)
+        usable = observed | censored
+        if not observed.any():
+            return None
+
+        curves = {"overall": self._curve(durations[usable], observed[usable])}
+        for col in dimensions:
+            values = df[col].astype(object).to_numpy()
+            curves[str(col)] = {
+                str(value): self._curve(durations[usable & (values == value)], observed[usable & (values == value)])
+                for value in pd.unique(values[usable])
+                if not pd.isna(value) and (usable & (values == value)).sum() >= self.config.min_group_size
+            }
+        return curves
+
+    def _curve(self, durations: np.ndarray, observed: np.ndarray) -> Dict[str, Any]:
+        times, survival = kaplan_meier(durations, observed)
+        below_half = np.flatnonzero(survival <= 0.5)
+        points = np.unique(np.linspace(0, len(times) - 1, min(self.config.survival_points, len(times))).round().astype(int)) \
+            if len(times) else np.zeros(0, dtype=int)
+        return {
+            "tickets": int(len(durations)),
+            "resolved": int(observed.sum()),
+            "censored": int((~observed).sum()),
+            "median_hours": float(times[below_half[0]]) if len(below_half) else None,
+            "points": [{"hours": float(times[i]), "open_probability": float(survival[i])} for i in points]
+        }
+
+    def _store(self, key: str, result: Dict[str, Any]) -> None:
+        if key not in self._cache and len(self._cache) >= self.max_cache_size:
+            # Remove oldest entry
+            oldest_key = next(iter(self._cache))
+            del self._cache[oldest_key]
+        self._cache[key] = result
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Drop all cached SLA results"""
+        cls._cache.clear()
@@ -1,12 +1,22 @@
 """
 Efficient ticket processing with functional patterns
 """
-from typing import Dict, Any, List, Set, Callable
+from typing import Dict, Any, List, Optional, Set
 from dataclasses import dataclass, field
 import pandas as pd
 import logging
+import os
 from datetime import datetime
-from functools import reduce
+from .timestamp_formats import TimestampFormatDetector
+from .schema_plan import SchemaPlan, SchemaPlanCompiler
+from .parallel import ColumnParallelExecutor, ColumnStats
+from .duplicates import NearDuplicateDetector, DuplicateReport, select_text_columns
+from .language_profile import profile_languages
+from .anomalies import AnomalyDetector, ticket_durations
+from .sla import SLAEngine
+from ..process_mining.event_log import EventLog, detect_event_log_columns
+from ..process_mining.performance import PerformanceAnalyzer
+from utils.distributions import Distribution, Contingency
 
 logger = logging.getLogger(__name__)
 
@@ -25,82 +35,109 @@ class ProcessingConfig:
     categorical_columns: Set[str] = field(default_factory=lambda: {
         'type', 'priority', 'status', 'language', 'category', 'department'
     })
+    # Column-parallel statistics: worker processes (1 disables) and the
+    # dataset size in cells below which everything stays in-process
+    parallel_workers: int = field(default_factory=lambda: int(os.getenv("PROCESSING_WORKERS", os.cpu_count() or 1)))
+    parallel_min_cells: int = field(default_factory=lambda: int(os.getenv("PROCESSING_PARALLEL_MIN_CELLS", "1000000")))
+    # Estimated Jaccard similarity above which two tickets count as near duplicates
+    duplicate_threshold: float = 0.8
+    # Robust z-score above which a numeric or duration value is an outlier
+    anomaly_threshold: float = 3.5
 
 class TicketProcessor:
     """Functional ticket processor implementation"""
     
     def __init__(self, config: ProcessingConfig = None):
         self.config = config or ProcessingConfig()
-        self._transformers: List[Callable] = [
-            self._preprocess_timestamps,
-            self._preprocess_categories,
-            self._detect_columns
-        ]
-    
-    def _detect_columns(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Detect and categorize available columns"""
-        # Find time-like columns using pandas dtype detection
-        time_cols = df.select_dtypes(include=['datetime64']).columns
-        self.config.time_columns.update(time_cols)
-        
-        # Find categorical-like columns
-        cat_cols = df.select_dtypes(include=['object', 'category']).columns
-        self.config.categorical_columns.update(
-            col for col in cat_cols 
-            if df[col].nunique() < df.shape[0] * 0.05  # Less than 5% unique values
+        self._format_detector = TimestampFormatDetector()
+        self._plan_compiler = SchemaPlanCompiler(self.config)
+        self._executor = ColumnParallelExecutor(
+            workers=self.config.parallel_workers,
+            min_cells=self.config.parallel_min_cells
         )
-        
-        return df
+        self._duplicate_detector = NearDuplicateDetector(threshold=self.config.duplicate_threshold)
+        self._anomaly_detector = AnomalyDetector(z_threshold=self.config.anomaly_threshold)
+        self._sla_engine = SLAEngine()
+    
+    def compile_plan(self, df: pd.DataFrame) -> SchemaPlan:
+        """Get the (cached) schema plan for a dataset header"""
+        return self._plan_compiler.compile(df)
     
     def process_dataset(self, df: pd.DataFrame) -> Dict[str, Any]:
-        """Process dataset through transformation pipeline"""
+        """Process dataset by running its compiled schema plan"""
         try:
-            # Apply all transformers
-            processed_df = reduce(
-                lambda acc, transformer: transformer(acc), 
-                self._transformers, 
-                df.copy()
-            )
+            plan = self.compile_plan(df)
+            processed_df = plan.apply(df.copy(), self._format_detector)
+            
+            # One statistics pass per column, shared by all consumers
+            stats = self._executor.column_stats(processed_df, set(plan.categorical_columns))
+            duplicates = self._detect_duplicates(processed_df, plan)
+            durations, durations_label = ticket_durations(processed_df, plan.time_columns)
             
             return {
-                "metadata": self._extract_metadata(processed_df),
-                "metrics": self._calculate_metrics(processed_df),
-                "patterns": self._identify_patterns(processed_df),
-                "data_quality": self._assess_data_quality(processed_df)
+                "metadata": self._extract_metadata(processed_df, plan, stats),
+                "metrics": self._calculate_metrics(processed_df, plan, stats),
+                "patterns": self._identify_patterns(processed_df, plan),
+                "data_quality": self._assess_data_quality(processed_df, plan, stats, duplicates),
+                "duplicates": duplicates.to_dict() if duplicates else None,
+                "language_profile": self._profile_languages(processed_df, plan, durations, durations_label),
+                "anomalies": self._detect_anomalies(processed_df, plan, durations, durations_label),
+                "sla": self._analyze_sla(processed_df)
             }
             
         except Exception as e:
             logger.error(f"Dataset processing failed: {e}")
             raise
 
-    def _preprocess_timestamps(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Convert timestamp columns efficiently"""
-        # Try to detect additional datetime columns
-        for col in df.columns:
-            if any(time_hint in col.lower() for time_hint in ['date', 'time', 'created', 'updated', 'timestamp']):
-                try:
-                    df[col] = pd.to_datetime(df[col], errors='coerce')
-                    self.config.time_columns.add(col)
-                except:
-                    continue
-        
-        # Process known time columns
-        for col in self.config.time_columns & set(df.columns):
-            df[col] = pd.to_datetime(df[col], errors='coerce')
-        
-        return df
+    def shutdown(self) -> None:
+        """Release column-parallel worker processes"""
+        self._executor.shutdown()
+
+    def _detect_duplicates(self, df: pd.DataFrame, plan: SchemaPlan) -> Optional[DuplicateReport]:
+        """Near-duplicate tickets over subject/body text"""
+        columns = select_text_columns(df, plan.text_columns)
+        if not columns:
+            return None
+        try:
+            return self._duplicate_detector.detect(df, columns)
+        except Exception as e:
+            logger.warning(f"Near-duplicate detection failed: {e}")
+            return None
+
+    def _profile_languages(self, df: pd.DataFrame, plan: SchemaPlan, durations: Optional[pd.Series] = None,
+                           durations_label: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Local language distribution with per-language volume and durations"""
+        try:
+            return profile_languages(df, select_text_columns(df, plan.text_columns), durations, durations_label)
+        except Exception as e:
+            logger.warning(f"Language profiling failed: {e}")
+            return None
 
-    def _preprocess_categories(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Convert categorical columns efficiently"""
-        present_cats = self.config.categorical_columns & set(df.columns)
-        for col in present_cats:
-            if df[col].nunique() < df.shape[0] * 0.05:  # Only if relatively few unique values
-                df[col] = df[col].astype('category')
-        return df
+    def _detect_anomalies(self, df: pd.DataFrame, plan: SchemaPlan, durations: Optional[pd.Series] = None,
+                          durations_label: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Outlier values and ticket volume spikes with row references"""
+        skip = set(plan.time_columns) | set(plan.categorical_columns)
+        numeric_cols = [
+            col for col in df.select_dtypes(include='number').columns
+            if col not in skip and not pd.api.types.is_bool_dtype(df[col])
+        ]
+        try:
+            return self._anomaly_detector.detect(df, numeric_cols, plan.time_columns, durations, durations_label)
+        except Exception as e:
+            logger.warning(f"Anomaly detection failed: {e}")
+            return []
 
-    def _extract_metadata(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_sla(self, df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+        """Response/resolution percentiles, breach rates and survival by priority and channel"""
+        try:
+            return self._sla_engine.analyze(df)
+        except Exception as e:
+            logger.warning(f"SLA analysis failed: {e}")
+            return None
+
+    def _extract_metadata(self, df: pd.DataFrame, plan: SchemaPlan, stats: Dict[str, ColumnStats]) -> Dict[str, Any]:
         """Extract dataset metadata efficiently"""
-        time_cols = self.config.time_columns & set(df.columns)
+        time_cols = plan.time_columns
         earliest_time = None
         latest_time = None
         
@@ -121,17 +158,17 @@ class TicketProcessor:
                 "end": latest_time.isoformat() if latest_time else None
             } if earliest_time and latest_time else {},
             "categories": {
-                col: df[col].value_counts().to_dict()
-                for col in self.config.categorical_columns & set(df.columns)
+                col: stats[col].value_counts
+                for col in plan.categorical_columns
             }
         }
 
-    def _calculate_metrics(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _calculate_metrics(self, df: pd.DataFrame, plan: SchemaPlan, stats: Dict[str, ColumnStats]) -> Dict[str, Any]:
         """Calculate metrics efficiently using vectorized operations"""
         metrics = {}
         
         # Time-based metrics
-        time_cols = sorted(self.config.time_columns & set(df.columns))
+        time_cols = sorted(plan.time_columns)
         if len(time_cols) >= 2:
             for start, end in zip(time_cols[:-1], time_cols[1:]):
                 duration = (df[end] - df[start]).dt.total_seconds()
@@ -141,22 +178,31 @@ class TicketProcessor:
                     "p95": duration.quantile(0.95)
                 }
         
+        # Case-level performance when the dataset is an event log
+        event_columns = detect_event_log_columns(df)
+        if event_columns is not None:
+            try:
+                log = EventLog.from_dataframe(df, event_columns)
+                metrics["case_performance"] = PerformanceAnalyzer(log).summary()
+            except Exception as e:
+                logger.warning(f"Case performance metrics failed: {e}")
+        
         # Categorical metrics
-        cat_cols = self.config.categorical_columns & set(df.columns)
+        cat_cols = plan.categorical_columns
         if cat_cols:
             metrics["distributions"] = {
-                col: df[col].value_counts(normalize=True).to_dict()
+                col: stats[col].value_counts.normalize()
                 for col in cat_cols
             }
         
         return metrics
 
-    def _identify_patterns(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def _identify_patterns(self, df: pd.DataFrame, plan: SchemaPlan) -> List[Dict[str, Any]]:
         """Identify patterns using vectorized operations"""
         patterns = []
         
         # Temporal patterns
-        time_cols = self.config.time_columns & set(df.columns)
+        time_cols = plan.time_columns
         for col in time_cols:
             if not df[col].isna().all():
                 patterns.extend([
@@ -164,42 +210,48 @@ class TicketProcessor:
                         "type": "temporal",
                         "subtype": "daily",
                         "field": col,
-                        "distribution": df[col].dt.day_name().value_counts().to_dict()
+                        "distribution": Distribution.from_series(df[col].dt.day_name())
                     },
                     {
                         "type": "temporal",
                         "subtype": "hourly",
                         "field": col,
-                        "distribution": df[col].dt.hour.value_counts().sort_index().to_dict()
+                        "distribution": Distribution.from_series(df[col].dt.hour, by_key=True)
                     }
                 ])
         
         # Categorical patterns
-        cat_cols = list(self.config.categorical_columns & set(df.columns))
+        cat_cols = list(plan.categorical_columns)
         for i, col1 in enumerate(cat_cols):
             for col2 in cat_cols[i+1:]:
-                cross_tab = pd.crosstab(df[col1], df[col2], normalize='all')
                 patterns.append({
                     "type": "categorical",
                     "fields": [col1, col2],
-                    "distribution": cross_tab.to_dict()
+                    "distribution": Contingency.from_series(df[col1], df[col2], normalize='all')
                 })
         
         return patterns
 
-    def _assess_data_quality(self, df: pd.DataFrame) -> Dict[str, Any]:
+    def _assess_data_quality(self, df: pd.DataFrame, plan: SchemaPlan, stats: Dict[str, ColumnStats],
+                             duplicates: Optional[DuplicateReport] = None) -> Dict[str, Any]:
+        row_count = len(df)
+        missing_rates = {
+            col: stats[col].missing / row_count if row_count else 0.0
+            for col in df.columns
+        }
+        
         # Check completeness for all columns
         completeness = {
-            col: float(df[col].notna().mean())
-            for col in df.columns
+            col: float(1 - missing_rate)
+            for col, missing_rate in missing_rates.items()
         }
         
         # Calculate field statistics
         field_stats = {
             col: {
-                "unique_values": int(df[col].nunique()),
-                "missing_values": int(df[col].isna().sum()),
-                "top_values": df[col].value_counts().head(5).to_dict()
+                "unique_values": stats[col].unique,
+                "missing_values": stats[col].missing,
+                "top_values": stats[col].top_values
             }
             for col in df.columns
         }
@@ -208,7 +260,7 @@ class TicketProcessor:
         warnings = []
         
         # Check for high missing values
-        for col, missing_rate in df.isna().mean().items():
+        for col, missing_rate in missing_rates.items():
             if missing_rate > 0.1:  # Warning threshold for missing values
                 warnings.append({
                     "type": "high_missing_values",
@@ -226,7 +278,7 @@ class TicketProcessor:
             })
         
         # Check timestamp columns
-        time_cols = set(df.columns) & self.config.time_columns
+        time_cols = plan.time_columns
         if not time_cols:
             warnings.append({
                 "type": "no_timestamp_columns",
@@ -234,8 +286,8 @@ class TicketProcessor:
             })
         
         # Check categorical columns quality
-        for col in (set(df.columns) & self.config.categorical_columns):
-            unique_ratio = df[col].nunique() / len(df)
+        for col in plan.categorical_columns:
+            unique_ratio = stats[col].unique / row_count if row_count else 0.0
             if unique_ratio > 0.5:  # More than 50% unique values
                 warnings.append({
                     "type": "high_cardinality_categorical",
@@ -244,13 +296,23 @@ class TicketProcessor:
                     "impact": "Column marked as categorical but has high cardinality"
                 })
         
+        # Check near-duplicate ticket volume
+        if duplicates and duplicates.duplicate_share > 0.05:
+            warnings.append({
+                "type": "near_duplicate_tickets",
+                "fields": duplicates.columns,
+                "duplicate_share": float(duplicates.duplicate_share),
+                "clusters": duplicates.cluster_count,
+                "impact": "Repeated tickets inflate volume and handling effort"
+            })
+        
         return {
             "completeness": completeness,
             "field_stats": field_stats,
             "warnings": warnings,
             "analyzed_columns": {
                 "temporal": list(time_cols),
-                "categorical": list(set(df.columns) & self.config.categorical_columns),
+                "categorical": list(plan.categorical_columns),
                 "total_columns": len(df.columns)
             }
         }
\ No newline at end of file
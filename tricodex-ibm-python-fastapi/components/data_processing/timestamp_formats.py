@@ -0,0 +1,151 @@
+"""
+Sample-based timestamp format inference with schema-level caching
+"""
+from typing import Dict, Any, Iterable, List, Optional
+import hashlib
+import logging
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype, is_integer_dtype, is_object_dtype, is_string_dtype
+
+logger = logging.getLogger(__name__)
+
+# Name fragments that mark a column as a timestamp candidate
+TIME_HINTS = ('date', 'time', 'created', 'updated', 'timestamp')
+
+# Explicit formats tried against the sample, most specific first
+CANDIDATE_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S%z",
+    "%Y-%m-%dT%H:%M:%S.%f%z",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y/%m/%d",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%Y",
+    "%d.%m.%Y %H:%M:%S",
+    "%d.%m.%Y",
+    "%d-%m-%Y",
+    "%Y%m%d%H%M%S",
+    "%Y%m%d",
+)
+
+
+def schema_fingerprint(columns: Iterable[Any]) -> str:
+    """Stable fingerprint of a dataset header"""
+    header = "\x1f".join(str(col) for col in columns)
+    return hashlib.sha1(header.encode("utf-8")).hexdigest()
+
+
+def is_time_hinted(column: Any) -> bool:
+    """Check whether a column name suggests timestamp content"""
+    name = str(column).lower()
+    return any(hint in name for hint in TIME_HINTS)
+
+
+class TimestampFormatDetector:
+    """Detect explicit datetime formats on a sample and cache them per schema"""
+
+    # Shared across instances so recurring exports skip detection entirely
+    _cache: Dict[str, Dict[str, Optional[str]]] = {}
+
+    def __init__(self, sample_size: int = 500, min_match_ratio: float = 0.95, max_cache_size: int = 256,
+                 verify_size: int = 50):
+        self.sample_size = sample_size
+        self.min_match_ratio = min_match_ratio
+        self.max_cache_size = max_cache_size
+        self.verify_size = verify_size
+
+    def detect(self, df: pd.DataFrame, columns: List[Any]) -> Dict[str, Optional[str]]:
+        """Return an explicit format per column, or None when no format fits
+
+        Cached formats are checked against a few values first; a file that
+        shares a header but not a date layout is detected again.
+        """
+        key = schema_fingerprint(df.columns)
+        cached = self._cache.get(key, {})
+        stale = [
+            col for col in columns
+            if cached.get(col) is not None and not self.matches(df[col], cached[col])
+        ]
+        if stale:
+            logger.info(f"Cached timestamp formats no longer fit {stale}; detecting again")
+        pending = [col for col in columns if col not in cached or col in stale]
+
+        if pending:
+            detected = {col: self._detect_column(df[col]) for col in pending}
+            cached = {**cached, **detected}
+            self._store(key, cached)
+            logger.debug(f"Detected timestamp formats for {len(pending)} columns: {detected}")
+
+        return {col: cached.get(col) for col in columns}
+
+    def parse(self, series: pd.Series, fmt: Optional[str]) -> pd.Series:
+        """Parse a column exactly once using the detected format"""
+        if is_datetime64_any_dtype(series):
+            return series
+        if fmt is None:
+            # No fixed format fits; fall back to a single inferred parse
+            return pd.to_datetime(series, errors='coerce')
+        return pd.to_datetime(self._as_text(series), format=fmt, errors='coerce')
+
+    def matches(self, series: pd.Series, fmt: str) -> bool:
+        """Whether a known format still parses a small sample of the column"""
+        if is_datetime64_any_dtype(series):
+            return True
+        sample = self._as_text(series.dropna().head(self.verify_size))
+        if sample.empty:
+            return True
+        return pd.to_datetime(sample, format=fmt, errors='coerce').notna().mean() >= self.min_match_ratio
+
+    def infers(self, series: pd.Series) -> bool:
+        """Whether pandas' own inference parses a sample of a text column with no fixed format"""
+        if not (is_object_dtype(series) or is_string_dtype(series)):
+            return False
+        sample = series.dropna().head(self.sample_size)
+        if sample.empty:
+            return False
+        return pd.to_datetime(sample, errors='coerce').notna().mean() >= self.min_match_ratio
+
+    def _detect_column(self, series: pd.Series) -> Optional[str]:
+        """Try candidate formats on a non-null sample of the column"""
+        if is_datetime64_any_dtype(series):
+            return None
+        if not (is_object_dtype(series) or is_string_dtype(series) or is_integer_dtype(series)):
+            return None
+
+        sample = self._as_text(series.dropna().head(self.sample_size))
+        if sample.empty:
+            return None
+
+        for fmt in CANDIDATE_FORMATS:
+            parsed = pd.to_datetime(sample, format=fmt, errors='coerce')
+            if parsed.notna().mean() >= self.min_match_ratio:
+                return fmt
+        return None
+
+    @staticmethod
+    def _as_text(series: pd.Series) -> pd.Series:
+        """Integer-encoded dates (e.g. 20180111) are parsed from their digits"""
+        if is_integer_dtype(series):
+            return series.astype(str)
+        return series
+
+    def _store(self, key: str, formats: Dict[str, Optional[str]]) -> None:
+        if key not in self._cache and len(self._cache) >= self.max_cache_size:
+            # Remove oldest entry
+            oldest_key = next(iter(self._cache))
+            del self._cache[oldest_key]
+        self._cache[key] = formats
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Drop all cached schema formats"""
+        cls._cache.clear()
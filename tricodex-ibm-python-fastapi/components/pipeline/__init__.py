@@ -2,10 +2,12 @@
 Process analysis pipeline components
 """
 from components.pipeline.analysis_pipeline import EnhancedAnalysisPipeline, AnalysisCache
-from components.pipeline.analysis import Analysis
+from components.pipeline.analysis import Analysis, Transformer, transformer
 
 __all__ = [
     'EnhancedAnalysisPipeline',
     'AnalysisCache',
-    'Analysis'
+    'Analysis',
+    'Transformer',
+    'transformer'
 ]
\ No newline at end of file
@@ -1,13 +1,19 @@
 """
 Enhanced analysis module with functional programming patterns
 """
-from typing import Dict, Any, Optional, List, Callable
-from functools import partial, reduce
+from typing import Dict, Any, Optional, List, Callable, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+import asyncio
 import logging
+import threading
+import numpy as np
 import pandas as pd
 from dataclasses import dataclass
 from datetime import datetime
 from utils.helpers import ProcessLensError
+from utils.distributions import Distribution, Contingency
+from ..data_processing.cardinality import CardinalityEstimator
 
 logger = logging.getLogger(__name__)
 
@@ -20,149 +26,265 @@ class AnalysisMetric:
     confidence: float
     timestamp: datetime = datetime.now()
 
-class Analysis:
-    """Functional analysis implementation"""
-    
-    def __init__(self):
-        self.metrics: List[AnalysisMetric] = []
-        self.transformers: List[Callable] = []
-    
-    def pipe(self, transformer: Callable) -> 'Analysis':
-        """Add a transformer to the analysis pipeline"""
-        self.transformers.append(transformer)
-        return self
-    
-    async def execute(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute analysis pipeline"""
-        try:
-            # Apply transformers in sequence
-            result = reduce(
-                lambda acc, transformer: transformer(acc),
-                self.transformers,
-                data
-            )
-            
-            return self._structure_results(result)
-            
-        except Exception as e:
-            logger.error(f"Analysis execution failed: {e}")
-            raise ProcessLensError(f"Analysis execution failed: {str(e)}")
-    
-    @staticmethod
-    def _structure_results(data: Dict[str, Any]) -> Dict[str, Any]:
-        """Structure analysis results"""
-        return {
-            "metrics": data.get("metrics", {}),
-            "patterns": data.get("patterns", []),
-            "insights": data.get("insights", []),
-            "metadata": {
-                "timestamp": datetime.now().isoformat(),
-                "version": "2.0",
-                "status": "success"
-            }
-        }
+@dataclass(frozen=True)
+class Transformer:
+    """Graph node: a function of named inputs producing one named output"""
+    output: str
+    func: Callable[..., Any]
+    requires: Tuple[str, ...] = ()
+
+def transformer(output: str, requires: Sequence[str] = ()) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Declare the output name and the derived inputs a transformer needs"""
+    def decorate(func: Callable[..., Any]) -> Callable[..., Any]:
+        func.__transformer__ = Transformer(output, func, tuple(requires))
+        return func
+    return decorate
+
+class AnalysisRun:
+    """Memoized evaluation of graph nodes for one execution
+
+    Every node is computed at most once; concurrent requests for the same
+    node wait on its lock instead of recomputing it.
+    """
+
+    def __init__(self, nodes: Dict[str, Transformer], data: Dict[str, Any]):
+        self._nodes = nodes
+        self._values: Dict[str, Any] = {"data": data, "dataframe": data.get("dataframe")}
+        self._locks: Dict[str, threading.Lock] = {name: threading.Lock() for name in nodes}
+
+    @property
+    def computed(self) -> List[str]:
+        return [name for name in self._values if name in self._nodes]
+
+    def get(self, name: str) -> Any:
+        if name in self._values:
+            return self._values[name]
+        node = self._nodes.get(name)
+        if node is None:
+            raise KeyError(f"Unknown analysis input: {name}")
+        with self._locks[name]:
+            if name not in self._values:
+                self._values[name] = node.func(*(self.get(dep) for dep in node.requires))
+        return self._values[name]
+
+_cardinality = CardinalityEstimator()
+
+# Shared intermediates, computed lazily and only when a transformer needs them
+@transformer("column_roles", requires=("dataframe",))
+def column_roles(df: pd.DataFrame) -> Dict[str, List[Any]]:
+    """Column names grouped by role, from a dtype scan and cardinality estimates"""
+    roles: Dict[str, List[Any]] = {"temporal": [], "categorical": [], "numeric": [], "text": [], "other": []}
+    for col, dtype in df.dtypes.items():
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            roles["temporal"].append(col)
+        elif isinstance(dtype, pd.CategoricalDtype):
+            roles["categorical"].append(col)
+        elif dtype == object:
+            # Free text is not factorized or cross-tabulated
+            roles["categorical" if _cardinality.is_low_cardinality(df[col]) else "text"].append(col)
+        elif pd.api.types.is_numeric_dtype(dtype):
+            roles["numeric"].append(col)
+        else:
+            roles["other"].append(col)
+    return roles
+
+@transformer("null_masks", requires=("dataframe",))
+def null_masks(df: pd.DataFrame) -> pd.DataFrame:
+    return df.isna()
+
+@transformer("null_counts", requires=("null_masks",))
+def null_counts(masks: pd.DataFrame) -> pd.Series:
+    return masks.sum()
+
+@transformer("codes", requires=("dataframe", "column_roles"))
+def factorized_codes(df: pd.DataFrame, roles: Dict[str, List[Any]]) -> Dict[Any, Tuple[np.ndarray, pd.Index]]:
+    """Integer codes (-1 for missing) and uniques per categorical column"""
+    encoded = {}
+    for col in roles["categorical"]:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            encoded[col] = (series.cat.codes.to_numpy(), series.cat.categories)
+        else:
+            codes, uniques = pd.factorize(series, sort=True)
+            encoded[col] = (codes, uniques)
+    return encoded
+
+@transformer("category_counts", requires=("codes",))
+def category_counts(codes: Dict[Any, Tuple[np.ndarray, pd.Index]]) -> Dict[Any, Distribution]:
+    """Value counts per categorical column from their codes, most frequent first"""
+    counts = {}
+    for col, (values, uniques) in codes.items():
+        bins = np.bincount(values[values >= 0], minlength=len(uniques))
+        counts[col] = Distribution.from_counts(pd.Series(bins, index=uniques).sort_values(ascending=False, kind="stable"))
+    return counts
+
+@transformer("unique_counts", requires=("dataframe", "category_counts"))
+def unique_counts(df: pd.DataFrame, counts: Dict[Any, Distribution]) -> Dict[Any, int]:
+    return {
+        col: len(counts[col]) if col in counts else int(df[col].nunique())
+        for col in df.columns
+    }
+
+@transformer("calendar", requires=("dataframe", "column_roles"))
+def calendar(df: pd.DataFrame, roles: Dict[str, List[Any]]) -> Dict[Any, Tuple[pd.Series, pd.Series]]:
+    """Day name and hour per temporal column"""
+    return {col: (df[col].dt.day_name(), df[col].dt.hour) for col in roles["temporal"]}
 
 # Predefined transformers
-def analyze_temporal_patterns(data: Dict[str, Any]) -> Dict[str, Any]:
+@transformer("temporal_patterns", requires=("calendar",))
+def analyze_temporal_patterns(calendar: Dict[Any, Tuple[pd.Series, pd.Series]]) -> List[Dict[str, Any]]:
     """Analyze temporal patterns in data"""
-    df = data.get("dataframe")
-    if not isinstance(df, pd.DataFrame):
-        return data
-        
-    time_cols = df.select_dtypes(include=['datetime64']).columns
-    
     patterns = []
-    for col in time_cols:
-        # Daily patterns
-        daily = df[col].dt.day_name().value_counts()
+    for col, (day_names, hours) in calendar.items():
         patterns.append({
             "type": "temporal",
             "subtype": "daily",
             "column": col,
-            "distribution": daily.to_dict()
+            "distribution": Distribution.from_series(day_names)
         })
-        
-        # Hourly patterns
-        hourly = df[col].dt.hour.value_counts().sort_index()
         patterns.append({
             "type": "temporal",
             "subtype": "hourly",
             "column": col,
-            "distribution": hourly.to_dict()
+            "distribution": Distribution.from_series(hours, by_key=True)
         })
-    
-    data["temporal_patterns"] = patterns
-    return data
+    return patterns
 
-def analyze_categorical_correlations(data: Dict[str, Any]) -> Dict[str, Any]:
+@transformer("categorical_correlations", requires=("codes",))
+def analyze_categorical_correlations(codes: Dict[Any, Tuple[np.ndarray, pd.Index]]) -> List[Dict[str, Any]]:
     """Analyze correlations between categorical variables"""
-    df = data.get("dataframe")
-    if not isinstance(df, pd.DataFrame):
-        return data
-        
-    cat_cols = df.select_dtypes(include=['category', 'object']).columns
-    
     correlations = []
-    for col1 in cat_cols:
-        for col2 in cat_cols:
-            if col1 < col2:  # Avoid duplicate combinations
-                matrix = pd.crosstab(df[col1], df[col2], normalize='all')
-                correlations.append({
-                    "type": "categorical_correlation",
-                    "columns": [col1, col2],
-                    "matrix": matrix.to_dict()
-                })
-    
-    data["categorical_correlations"] = correlations
-    return data
-
-def analyze_metrics(data: Dict[str, Any]) -> Dict[str, Any]:
+    for col1, (codes1, uniques1) in codes.items():
+        for col2, (codes2, uniques2) in codes.items():
+            if not col1 < col2:  # Avoid duplicate combinations
+                continue
+            # Joint counts from shared codes, same as crosstab(normalize='all')
+            correlations.append({
+                "type": "categorical_correlation",
+                "columns": [col1, col2],
+                "matrix": Contingency.from_codes(codes1, uniques1, codes2, uniques2, normalize='all')
+            })
+    return correlations
+
+@transformer("metrics", requires=("dataframe", "column_roles", "category_counts"))
+def analyze_metrics(df: pd.DataFrame, roles: Dict[str, List[Any]], counts: Dict[Any, Distribution]) -> Dict[str, Any]:
     """Calculate key process metrics"""
-    df = data.get("dataframe")
-    if not isinstance(df, pd.DataFrame):
-        return data
-        
     metrics = {}
-    
+
     # Time-based metrics
-    time_cols = df.select_dtypes(include=['datetime64']).columns
+    time_cols = roles["temporal"]
     if len(time_cols) >= 2:
         metrics["processing_time"] = (
             df[time_cols[-1]] - df[time_cols[0]]
         ).dt.total_seconds().agg(['mean', 'median', 'std']).to_dict()
-    
+
     # Categorical metrics
-    cat_cols = df.select_dtypes(include=['category', 'object']).columns
-    for col in cat_cols:
-        metrics[f"{col}_distribution"] = df[col].value_counts(normalize=True).to_dict()
-    
-    data["metrics"] = metrics
-    return data
-
-def analyze_data_quality(data: Dict[str, Any]) -> Dict[str, Any]:
+    for col, col_counts in counts.items():
+        metrics[f"{col}_distribution"] = col_counts.normalize()
+
+    return metrics
+
+@transformer("data_quality", requires=("dataframe", "null_counts", "unique_counts"))
+def analyze_data_quality(df: pd.DataFrame, nulls: pd.Series, uniques: Dict[Any, int]) -> Dict[str, Any]:
     """Analyze data quality metrics"""
-    df = data.get("dataframe")
-    if not isinstance(df, pd.DataFrame):
-        return data
-        
+    rows = len(df)
     quality = {
-        "completeness": df.notna().mean().to_dict(),
-        "unique_values": df.nunique().to_dict(),
+        "completeness": (1 - nulls / rows).to_dict() if rows else {col: 1.0 for col in df.columns},
+        "unique_values": uniques,
         "warnings": []
     }
-    
+
     # Check for potential issues
-    for col in df.columns:
-        missing = df[col].isna().sum()
+    for col, missing in nulls.items():
         if missing > 0:
             quality["warnings"].append({
                 "type": "missing_values",
                 "column": col,
                 "count": int(missing)
             })
-    
-    data["data_quality"] = quality
-    return data
+
+    return quality
+
+DERIVED_INPUTS: Tuple[Callable[..., Any], ...] = (
+    column_roles, null_masks, null_counts, factorized_codes,
+    category_counts, unique_counts, calendar
+)
+
+class Analysis:
+    """Functional analysis implementation
+
+    Transformers form a lazily evaluated graph: each declares the derived
+    inputs it needs, shared intermediates are memoized per run, and
+    independent transformers run concurrently on a thread pool.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.metrics: List[AnalysisMetric] = []
+        self.transformers: List[Callable] = []
+        self.max_workers = max_workers
+        self._nodes: Dict[str, Transformer] = {
+            func.__transformer__.output: func.__transformer__ for func in DERIVED_INPUTS
+        }
+        self._outputs: List[str] = []
+        self._legacy: List[Callable] = []
+
+    def pipe(self, transformer: Callable) -> 'Analysis':
+        """Add a transformer to the analysis pipeline"""
+        self.transformers.append(transformer)
+        node = getattr(transformer, "__transformer__", None)
+        if node is None:
+            # Undeclared transformers take and return the whole result dict
+            self._legacy.append(transformer)
+        else:
+            self._nodes[node.output] = node
+            self._outputs.append(node.output)
+        return self
+
+    async def execute(self, data: Dict[str, Any], outputs: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Execute analysis pipeline, computing only what the requested outputs need"""
+        try:
+            requested = list(outputs) if outputs is not None else self._outputs
+            unknown = set(requested) - set(self._nodes)
+            if unknown:
+                raise ValueError(f"Unknown analysis outputs: {sorted(unknown)}")
+
+            result = dict(data)
+            if requested and isinstance(data.get("dataframe"), pd.DataFrame):
+                run = AnalysisRun(self._nodes, data)
+                loop = asyncio.get_running_loop()
+                with ThreadPoolExecutor(max_workers=self.max_workers or min(len(requested), 8)) as pool:
+                    values = await asyncio.gather(*(
+                        loop.run_in_executor(pool, run.get, name) for name in requested
+                    ))
+                result.update(zip(requested, values))
+                logger.debug(f"Analysis computed {run.computed} for outputs {requested}")
+
+            # Apply undeclared transformers in sequence
+            if outputs is None:
+                result = reduce(lambda acc, transformer: transformer(acc), self._legacy, result)
+
+            return self._structure_results(result)
+
+        except Exception as e:
+            logger.error(f"Analysis execution failed: {e}")
+            raise ProcessLensError(f"Analysis execution failed: {str(e)}")
+
+    @staticmethod
+    def _structure_results(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Structure analysis results"""
+        structured = {
+            "metrics": data.get("metrics", {}),
+            "patterns": data.get("patterns", []) + data.get("temporal_patterns", []) + data.get("categorical_correlations", []),
+            "insights": data.get("insights", []),
+            "metadata": {
+                "timestamp": datetime.now().isoformat(),
+                "version": "2.0",
+                "status": "success"
+            }
+        }
+        if "data_quality" in data:
+            structured["data_quality"] = data["data_quality"]
+        return structured
 
 # Create analysis pipeline
 def create_analysis_pipeline() -> Analysis:
@@ -2,8 +2,18 @@
 Analysis pipeline for processing data through multiple agents with enhanced caching
 """
 from typing import Dict, Any, List, Optional
+from dataclasses import asdict
+import hashlib
 import logging
 from ..agents.base_agent import BaseAgent
+from ..process_mining import summarize_event_log
+from ..data_processing.language_profile import profile_languages
+from ..data_processing.anomalies import AnomalyDetector, ticket_durations
+from ..data_processing.sla import SLAEngine
+from ..data_processing.timestamp_formats import TimestampFormatDetector, is_time_hinted
+from .analysis import Analysis, analyze_data_quality
+from utils.deadline import Deadline, current_deadline
+from utils.distributions import Distribution
 import asyncio
 import pandas as pd
 from datetime import datetime
@@ -39,6 +49,10 @@ class EnhancedAnalysisPipeline:
         self._active_agent = None
         self.MAX_TOTAL_API_CALLS = 5
         self.cache = AnalysisCache()
+        self._anomaly_detector = AnomalyDetector()
+        self._format_detector = TimestampFormatDetector()
+        self._sla_engine = SLAEngine()
+        self._quality_analysis = Analysis().pipe(analyze_data_quality)
         self._validate_agents()
         logger.info("Analysis pipeline initialized with agents: %s", list(agents.keys()))
 
@@ -49,6 +63,19 @@ class EnhancedAnalysisPipeline:
         if missing:
             raise ValueError(f"Missing required agents: {missing}")
 
+    def config_key(self) -> str:
+        """Fingerprint of the agents, models and detector settings behind a result"""
+        settings = {
+            "agents": {
+                name: [type(agent).__name__, getattr(agent, "model_id", None) or getattr(agent, "model", None)]
+                for name, agent in self.agents.items()
+            },
+            "max_api_calls": self.MAX_TOTAL_API_CALLS,
+            "anomalies": vars(self._anomaly_detector),
+            "sla": asdict(self._sla_engine.config)
+        }
+        return hashlib.sha1(json.dumps(settings, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
     def _add_thought(self, thought: str) -> None:
         """Add thought with timestamp"""
         self._thoughts.append({
@@ -79,7 +106,7 @@ class EnhancedAnalysisPipeline:
             logger.info("Data preprocessing complete")
             
             # Prepare batched analysis payload
-            analysis_input = self._prepare_analysis_input(processed_data)
+            analysis_input = self._prepare_analysis_input(processed_data, raw_data=data)
             
             # Execute agents in sequence with strict API limits
             api_call_count = 0
@@ -159,7 +186,7 @@ class EnhancedAnalysisPipeline:
         
         return data
 
-    def _prepare_analysis_input(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def _prepare_analysis_input(self, data: pd.DataFrame, raw_data: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
         """Prepare data structure for analysis agents"""
         try:
             # Calculate basic metrics
@@ -182,17 +209,39 @@ class EnhancedAnalysisPipeline:
 
             # Generate patterns
             patterns = self._extract_patterns(data)
+            
+            # Summarize case/activity/timestamp logs for the agents
+            process_mining = summarize_event_log(data)
+            # Times, durations and outliers come from the data before missing values were filled
+            source = raw_data if raw_data is not None else data
+            times = self._parse_times(source)
+            durations, durations_label = ticket_durations(times, list(times.columns))
+            language_profile = self._profile_languages(data, durations, durations_label)
+            anomalies = self._detect_anomalies(source, times, durations, durations_label)
+            sla = self._analyze_sla(source)
 
             # Add thought markers for transparency
             self._add_thought("Calculated basic metrics")
             self._add_thought("Extracted metadata")
             self._add_thought("Generated data patterns")
+            if process_mining:
+                self._add_thought("Mined directly-follows relations and process variants")
+            if language_profile:
+                self._add_thought("Profiled ticket languages locally")
+            if anomalies:
+                self._add_thought(f"Flagged {len(anomalies)} anomalies in values and ticket volume")
+            if sla:
+                self._add_thought("Computed SLA percentiles, breach rates and resolution survival")
 
             return {
                 "data": data.head(1000).to_dict('records'),  # Sample for initial analysis
                 "metadata": metadata,
                 "metrics": metrics,
-                "patterns": patterns
+                "patterns": patterns,
+                "process_mining": process_mining,
+                "language_profile": language_profile,
+                "anomalies": anomalies,
+                "sla": sla
             }
 
         except Exception as e:
@@ -200,6 +249,52 @@ class EnhancedAnalysisPipeline:
             self._add_thought(f"Error preparing analysis input: {str(e)}")
             raise
 
+    def _profile_languages(self, data: pd.DataFrame, durations: Optional[pd.Series] = None,
+                           durations_label: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Language distribution from labels or local trigram scoring, with per-language durations"""
+        try:
+            return profile_languages(data, durations=durations, durations_label=durations_label)
+        except Exception as e:
+            logger.warning(f"Language profiling failed: {e}")
+            return None
+
+    def _analyze_sla(self, data: pd.DataFrame) -> Optional[Dict[str, Any]]:
+        """SLA metrics by priority and channel, cached per dataset"""
+        try:
+            return self._sla_engine.analyze(data)
+        except Exception as e:
+            logger.warning(f"SLA analysis failed: {e}")
+            return None
+
+    def _parse_times(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Parsed time columns, keeping only those with at least one timestamp"""
+        try:
+            time_cols = [
+                col for col in data.columns
+                if pd.api.types.is_datetime64_any_dtype(data[col]) or (data[col].dtype == object and is_time_hinted(col))
+            ]
+            formats = self._format_detector.detect(data, time_cols)
+            times = pd.DataFrame(
+                {col: self._format_detector.parse(data[col], formats[col]) for col in time_cols},
+                index=data.index
+            )
+            return times.loc[:, times.notna().any()]
+        except Exception as e:
+            logger.warning(f"Time column parsing failed: {e}")
+            return pd.DataFrame(index=data.index)
+
+    def _detect_anomalies(self, data: pd.DataFrame, times: pd.DataFrame, durations: Optional[pd.Series] = None,
+                          durations_label: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Outliers in numeric and duration columns and ticket volume spikes"""
+        try:
+            numeric = data.select_dtypes(include=['int64', 'float64'])
+            return self._anomaly_detector.detect(
+                pd.concat([numeric, times], axis=1), list(numeric.columns), list(times.columns), durations, durations_label
+            )
+        except Exception as e:
+            logger.warning(f"Anomaly detection failed: {e}")
+            return []
+
     def _get_numeric_summary(self, data: pd.DataFrame) -> Dict[str, Any]:
         """Get summary of numeric columns"""
         numeric_data = data.select_dtypes(include=['int64', 'float64'])
@@ -228,13 +323,14 @@ class EnhancedAnalysisPipeline:
         if categorical_data.empty:
             return {}
             
-        return {
-            col: {
-                "unique_values": categorical_data[col].nunique(),
-                "top_values": categorical_data[col].value_counts().head(5).to_dict()
+        summary = {}
+        for col in categorical_data.columns:
+            counts = Distribution.from_series(categorical_data[col])
+            summary[col] = {
+                "unique_values": len(counts),
+                "top_values": counts.head(5)
             }
-            for col in categorical_data.columns
-        }
+        return summary
 
     def _calculate_completeness(self, data: pd.DataFrame) -> Dict[str, float]:
         """Calculate data completeness by column"""
@@ -294,6 +390,27 @@ class EnhancedAnalysisPipeline:
         
         return aggregated
 
+    @staticmethod
+    def _out_of_time(deadline: Optional[Deadline]) -> bool:
+        return deadline is not None and deadline.expired
+
+    def _incomplete_stages(self, stages: Dict[str, Any], deadline: Optional[Deadline]) -> List[str]:
+        """Stages cut off by the deadline: never started, or stopped by it"""
+        if not self._out_of_time(deadline):
+            return []
+        return [
+            name for name, result in stages.items()
+            if result is None or (isinstance(result, dict) and result.get("status") == "error")
+        ]
+
+    @staticmethod
+    def _failed_stages(stages: Dict[str, Any]) -> List[str]:
+        """Stages that ran but returned an error or had nothing to work with"""
+        return [
+            name for name, result in stages.items()
+            if isinstance(result, dict) and result.get("status") in ("error", "skipped")
+        ]
+
     async def analyze_dataset(self, df: pd.DataFrame, session_id: str) -> Dict[str, Any]:
         """
         Analyze dataset using multiple agents in parallel
@@ -309,7 +426,8 @@ class EnhancedAnalysisPipeline:
             logger.info(f"Starting analysis for session {session_id} with shape {df.shape}")
             start_time = datetime.now()
             
-            # Prepare common analysis context
+            # Same agent input as execute(): metadata, metrics, patterns and the local profiles
+            analysis_input = self._prepare_analysis_input(self._preprocess_data(df), raw_data=df)
             context = {
                 "session_id": session_id,
                 "timestamp": start_time.isoformat(),
@@ -323,68 +441,151 @@ class EnhancedAnalysisPipeline:
                 }
             }
             
-            # Run initial data quality analysis using function agent
-            data_quality = await self.agents["function"].analyze({
-                "task": "data_quality",
-                "data": df.head(1000).to_dict(),  # Sample for initial analysis
-                "context": context
-            })
+            # Stages stop at the task's deadline; whatever finished is returned as a partial result
+            deadline = current_deadline()
+            stages = {"data_quality": None, "watson_analysis": None, "gemini_analysis": None, "synthesis": None}
+            
+            # Data quality is profiled locally from the shared graph nodes; only Watson and Gemini call a model
+            quality = await self._quality_analysis.execute({"dataframe": df}, outputs=["data_quality"])
+            stages["data_quality"] = data_quality = quality["data_quality"]
+            
+            if not self._out_of_time(deadline):
+                agent_input = {**analysis_input, "data_quality": data_quality, "context": context}
+                
+                # Run parallel analysis with Watson and Gemini
+                watson_results, gemini_results = await asyncio.gather(
+                    self.agents["watson"].analyze(agent_input),
+                    self.agents["gemini"].analyze(agent_input),
+                    return_exceptions=True
+                )
+                
+                # Handle any errors from individual agents
+                for agent_name, result in [("watson", watson_results), ("gemini", gemini_results)]:
+                    if isinstance(result, Exception):
+                        logger.error(f"{agent_name} analysis failed: {result}")
+                        result = {
+                            "status": "error",
+                            "error": str(result),
+                            "timestamp": datetime.now().isoformat()
+                        }
+                    stages[f"{agent_name}_analysis"] = result
+            
+            if not self._out_of_time(deadline):
+                # Combine the results already computed above; no further model calls
+                stages["synthesis"] = await self.agents["function"].analyze({
+                    "task": "synthesize_results",
+                    "watson_results": stages["watson_analysis"],
+                    "gemini_results": stages["gemini_analysis"],
+                    "data_quality": data_quality,
+                    "context": context
+                })
+            
+            processing_time = (datetime.now() - start_time).total_seconds()
+            incomplete = self._incomplete_stages(stages, deadline)
+            if incomplete:
+                logger.warning(f"Deadline reached for session {session_id}; missing stages: {incomplete}")
+            failed = [name for name in self._failed_stages(stages) if name not in incomplete]
+            if failed:
+                logger.warning(f"Analysis stages failed for session {session_id}: {failed}")
             
-            # Run parallel analysis with Watson and Gemini
-            watson_task = self.agents["watson"].analyze({
-                "data": df.to_dict(),
-                "context": {**context, "data_quality": data_quality}
-            })
+            # Without a usable synthesis there is no model analysis to report
+            status = "partial" if incomplete or failed else "success"
+            if "synthesis" in failed:
+                status = "error"
             
-            gemini_task = self.agents["gemini"].analyze({
-                "data": df.to_dict(),
-                "context": {**context, "data_quality": data_quality}
-            })
+            return {
+                "status": status,
+                "session_id": session_id,
+                "timestamp": datetime.now().isoformat(),
+                "processing_time": processing_time,
+                **stages,
+                **({"incomplete_stages": incomplete} if incomplete else {}),
+                **({"failed_stages": failed} if failed else {}),
+                **({"error": "No agent produced a usable analysis"} if status == "error" else {}),
+                "metrics": {
+                    **context["metrics"],
+                    "processing_time": processing_time
+                }
+            }
             
-            # Wait for both analyses to complete
+        except Exception as e:
+            logger.error(f"Analysis pipeline failed: {e}", exc_info=True)
+            return {
+                "status": "error",
+                "error": str(e),
+                "session_id": session_id,
+                "timestamp": datetime.now().isoformat(),
+                "processing_time": (datetime.now() - start_time).total_seconds()
+            }
+
+    async def analyze_process_snapshot(self, snapshot: Dict[str, Any], session_id: str) -> Dict[str, Any]:
+        """
+        Analyze a live process snapshot without reloading event history
+
+        Args:
+            snapshot: Summary produced by IncrementalDiscovery.snapshot
+            session_id: Unique session identifier
+
+        Returns:
+            Combined analysis results from Watson and Gemini
+        """
+        start_time = datetime.now()
+        try:
+            logger.info(f"Starting snapshot analysis for session {session_id} "
+                        f"({snapshot.get('events', 0)} events, {snapshot.get('open_cases', 0)} open cases)")
+
+            analysis_input = {
+                "metadata": {
+                    "source": "event_stream",
+                    "stream_id": snapshot.get("stream_id"),
+                    "timestamp": start_time.isoformat()
+                },
+                "metrics": {
+                    "event_count": snapshot.get("events", 0),
+                    "case_count": snapshot.get("cases", 0),
+                    "open_cases": snapshot.get("open_cases", 0),
+                    "activity_count": snapshot.get("activities", 0)
+                },
+                "patterns": [],
+                "process_mining": snapshot
+            }
+
             watson_results, gemini_results = await asyncio.gather(
-                watson_task, gemini_task,
+                self.agents["watson"].analyze(analysis_input),
+                self.agents["gemini"].analyze(analysis_input),
                 return_exceptions=True
             )
-            
-            # Handle any errors from individual agents
+
+            stages = {}
             for agent_name, result in [("watson", watson_results), ("gemini", gemini_results)]:
                 if isinstance(result, Exception):
-                    logger.error(f"{agent_name} analysis failed: {result}")
+                    logger.error(f"{agent_name} snapshot analysis failed: {result}")
                     result = {
                         "status": "error",
                         "error": str(result),
                         "timestamp": datetime.now().isoformat()
                     }
-            
-            # Combine and synthesize results
-            synthesis = await self.agents["function"].analyze({
-                "task": "synthesize_results",
-                "watson_results": watson_results,
-                "gemini_results": gemini_results,
-                "data_quality": data_quality,
-                "context": context
-            })
-            
+                stages[f"{agent_name}_analysis"] = result
+
             processing_time = (datetime.now() - start_time).total_seconds()
-            
+            incomplete = self._incomplete_stages(stages, current_deadline())
+
             return {
-                "status": "success",
+                "status": "partial" if incomplete else "success",
                 "session_id": session_id,
                 "timestamp": datetime.now().isoformat(),
                 "processing_time": processing_time,
-                "data_quality": data_quality,
-                "watson_analysis": watson_results,
-                "gemini_analysis": gemini_results,
-                "synthesis": synthesis,
+                "process_mining": snapshot,
+                **stages,
+                **({"incomplete_stages": incomplete} if incomplete else {}),
                 "metrics": {
-                    **context["metrics"],
+                    **analysis_input["metrics"],
                     "processing_time": processing_time
                 }
             }
-            
+
         except Exception as e:
-            logger.error(f"Analysis pipeline failed: {e}", exc_info=True)
+            logger.error(f"Snapshot analysis failed: {e}", exc_info=True)
             return {
                 "status": "error",
                 "error": str(e),
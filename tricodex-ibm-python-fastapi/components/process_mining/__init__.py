@@ -0,0 +1,28 @@
+"""
+ProcessLens process mining package
+"""
+from .event_log import (
+    EventLog,
+    EventLogColumns,
+    DirectlyFollowsGraph,
+    VariantTable,
+    detect_event_log_columns
+)
+from .performance import PerformanceAnalyzer, summarize_event_log, summarize_log
+from .variant_index import VariantIndex
+from .streaming import IncrementalDiscovery, RunningStats, StreamRegistry
+
+__all__ = [
+    "EventLog",
+    "EventLogColumns",
+    "DirectlyFollowsGraph",
+    "VariantTable",
+    "detect_event_log_columns",
+    "summarize_event_log",
+    "summarize_log",
+    "PerformanceAnalyzer",
+    "VariantIndex",
+    "IncrementalDiscovery",
+    "RunningStats",
+    "StreamRegistry"
+]
\ No newline at end of file
@@ -0,0 +1,248 @@
+"""
+Vectorized event-log engine: directly-follows relations and process variants
+"""
+from typing import Dict, Any, List, Optional, Tuple
+from dataclasses import dataclass
+import logging
+import re
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Normalized column names recognised for each event-log attribute
+CASE_NAMES = ('caseid', 'case', 'caseconceptname', 'ticketid', 'processinstance', 'instanceid', 'traceid')
+ACTIVITY_NAMES = ('activity', 'conceptname', 'activityname', 'eventname', 'event', 'action', 'task', 'step')
+TIMESTAMP_NAMES = ('timestamp', 'timetimestamp', 'completetimestamp', 'completetime', 'endtime', 'eventtime', 'time', 'datetime')
+START_NAMES = ('starttimestamp', 'starttime', 'timestart', 'start')
+RESOURCE_NAMES = ('resource', 'orgresource', 'agent', 'assignee', 'user', 'performer', 'owner')
+
+# Odd multipliers for the two independent 64-bit sequence hashes
+_HASH_BASES = (np.uint64(0x9E3779B97F4A7C15), np.uint64(0xC2B2AE3D27D4EB4F))
+
+
+@dataclass(frozen=True)
+class EventLogColumns:
+    """Column mapping for case / activity / timestamp event logs"""
+    case: str
+    activity: str
+    timestamp: str
+    resource: Optional[str] = None
+    start_timestamp: Optional[str] = None
+
+
+def _normalize(name: Any) -> str:
+    return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+
+def detect_event_log_columns(df: pd.DataFrame) -> Optional[EventLogColumns]:
+    """Find case, activity and timestamp columns by name"""
+    normalized = {_normalize(col): col for col in df.columns}
+
+    def find(candidates: Tuple[str, ...]) -> Optional[str]:
+        for candidate in candidates:
+            if candidate in normalized:
+                return normalized[candidate]
+        return None
+
+    case, activity, timestamp = find(CASE_NAMES), find(ACTIVITY_NAMES), find(TIMESTAMP_NAMES)
+    if not (case and activity and timestamp) or len({case, activity, timestamp}) < 3:
+        return None
+    return EventLogColumns(case, activity, timestamp, find(RESOURCE_NAMES), find(START_NAMES))
+
+
+@dataclass
+class DirectlyFollowsGraph:
+    """Directly-follows relations with frequencies and mean transition times"""
+    activities: np.ndarray
+    sources: np.ndarray
+    targets: np.ndarray
+    frequencies: np.ndarray
+    mean_seconds: np.ndarray
+    start_counts: np.ndarray
+    end_counts: np.ndarray
+
+    def top(self, k: int = 20) -> List[Dict[str, Any]]:
+        """Most frequent relations, highest first"""
+        order = np.argsort(-self.frequencies, kind='stable')[:k]
+        return [
+            {
+                "source": str(self.activities[self.sources[i]]),
+                "target": str(self.activities[self.targets[i]]),
+                "frequency": int(self.frequencies[i]),
+                "mean_seconds": float(self.mean_seconds[i])
+            }
+            for i in order
+        ]
+
+    def to_summary(self, top_k: int = 20) -> Dict[str, Any]:
+        return {
+            "relations": int(len(self.frequencies)),
+            "top_relations": self.top(top_k),
+            "start_activities": self._labelled_counts(self.start_counts, top_k),
+            "end_activities": self._labelled_counts(self.end_counts, top_k)
+        }
+
+    def _labelled_counts(self, counts: np.ndarray, k: int) -> Dict[str, int]:
+        order = np.argsort(-counts, kind='stable')[:k]
+        return {str(self.activities[i]): int(counts[i]) for i in order if counts[i] > 0}
+
+
+@dataclass
+class VariantTable:
+    """Distinct activity sequences with their case counts"""
+    activities: np.ndarray
+    counts: np.ndarray
+    sequences: List[np.ndarray]
+    case_variant: np.ndarray
+
+    def top(self, k: int = 10) -> List[Dict[str, Any]]:
+        order = np.argsort(-self.counts, kind='stable')[:k]
+        total = self.counts.sum()
+        return [
+            {
+                "variant": [str(self.activities[a]) for a in self.sequences[i]],
+                "cases": int(self.counts[i]),
+                "share": float(self.counts[i] / total) if total else 0.0
+            }
+            for i in order
+        ]
+
+    def to_summary(self, top_k: int = 10) -> Dict[str, Any]:
+        return {
+            "variants": int(len(self.counts)),
+            "top_variants": self.top(top_k)
+        }
+
+
+class EventLog:
+    """Event log sorted once by (case, timestamp) with integer-coded columns"""
+
+    def __init__(self, case_codes: np.ndarray, activity_codes: np.ndarray, timestamps: np.ndarray,
+                 cases: np.ndarray, activities: np.ndarray,
+                 resource_codes: Optional[np.ndarray] = None, resources: Optional[np.ndarray] = None,
+                 start_timestamps: Optional[np.ndarray] = None):
+        self.case_codes = case_codes
+        self.activity_codes = activity_codes
+        self.timestamps = timestamps
+        self.cases = cases
+        self.activities = activities
+        self.resource_codes = resource_codes
+        self.resources = resources
+        self.start_timestamps = start_timestamps
+
+        # Case boundaries over the sorted arrays
+        if len(case_codes):
+            change = np.flatnonzero(case_codes[1:] != case_codes[:-1]) + 1
+            self.case_starts = np.concatenate(([0], change))
+            self.case_ends = np.concatenate((change, [len(case_codes)]))
+        else:
+            self.case_starts = np.empty(0, dtype=np.int64)
+            self.case_ends = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, columns: Optional[EventLogColumns] = None) -> 'EventLog':
+        """Build a sorted, integer-coded event log from a DataFrame"""
+        columns = columns or detect_event_log_columns(df)
+        if columns is None:
+            raise ValueError("Dataset has no case/activity/timestamp columns")
+
+        timestamps = pd.to_datetime(df[columns.timestamp], errors='coerce')
+        valid = (timestamps.notna() & df[columns.case].notna() & df[columns.activity].notna()).to_numpy()
+
+        case_codes, cases = pd.factorize(df[columns.case].to_numpy()[valid])
+        activity_codes, activities = pd.factorize(df[columns.activity].to_numpy()[valid])
+        ts = timestamps.to_numpy()[valid].astype('datetime64[ns]').view(np.int64)
+
+        resource_codes, resources = None, None
+        if columns.resource:
+            resource_codes, resources = pd.factorize(df[columns.resource].to_numpy()[valid])
+
+        start_ts = None
+        if columns.start_timestamp:
+            starts = pd.to_datetime(df[columns.start_timestamp], errors='coerce')
+            start_ts = starts.to_numpy()[valid].astype('datetime64[ns]').view(np.int64)
+
+        # Single sort: by case, then timestamp
+        order = np.lexsort((ts, case_codes))
+        log = cls(
+            case_codes=case_codes[order],
+            activity_codes=activity_codes[order],
+            timestamps=ts[order],
+            cases=np.asarray(cases),
+            activities=np.asarray(activities),
+            resource_codes=resource_codes[order] if resource_codes is not None else None,
+            resources=np.asarray(resources) if resources is not None else None,
+            start_timestamps=start_ts[order] if start_ts is not None else None
+        )
+        logger.info(f"Built event log with {log.num_events} events across {log.num_cases} cases")
+        return log
+
+    @property
+    def num_events(self) -> int:
+        return int(len(self.activity_codes))
+
+    @property
+    def num_cases(self) -> int:
+        return int(len(self.case_starts))
+
+    def transition_mask(self) -> np.ndarray:
+        """True where event i and i+1 belong to the same case"""
+        return self.case_codes[1:] == self.case_codes[:-1]
+
+    def directly_follows(self) -> DirectlyFollowsGraph:
+        """Count a->b relations and their mean transition time on shifted arrays"""
+        n_act = len(self.activities)
+        same_case = self.transition_mask()
+        src = self.activity_codes[:-1][same_case].astype(np.int64)
+        dst = self.activity_codes[1:][same_case].astype(np.int64)
+        seconds = (self.timestamps[1:] - self.timestamps[:-1])[same_case] / 1e9
+
+        pairs = src * n_act + dst
+        if n_act * n_act <= max(4 * len(pairs), 1024):
+            # Dense counting when the activity alphabet is small
+            counts = np.bincount(pairs, minlength=n_act * n_act)
+            totals = np.bincount(pairs, weights=seconds, minlength=n_act * n_act)
+            keys = np.flatnonzero(counts)
+            counts, totals = counts[keys], totals[keys]
+        else:
+            keys, inverse, counts = np.unique(pairs, return_inverse=True, return_counts=True)
+            totals = np.bincount(inverse, weights=seconds, minlength=len(keys))
+
+        return DirectlyFollowsGraph(
+            activities=self.activities,
+            sources=keys // n_act if n_act else keys,
+            targets=keys % n_act if n_act else keys,
+            frequencies=counts,
+            mean_seconds=totals / np.maximum(counts, 1),
+            start_counts=np.bincount(self.activity_codes[self.case_starts], minlength=n_act),
+            end_counts=np.bincount(self.activity_codes[self.case_ends - 1], minlength=n_act)
+        )
+
+    def variants(self) -> VariantTable:
+        """Group cases by hashing their activity sequences"""
+        if not self.num_cases:
+            return VariantTable(self.activities, np.empty(0, dtype=np.int64), [], np.empty(0, dtype=np.int64))
+
+        lengths = self.case_ends - self.case_starts
+        case_index = np.repeat(np.arange(self.num_cases), lengths)
+        position = np.arange(self.num_events) - self.case_starts[case_index]
+        symbols = self.activity_codes.astype(np.uint64) + np.uint64(1)
+
+        keys = []
+        with np.errstate(over='ignore'):
+            for base in _HASH_BASES:
+                # Powers wrap modulo 2**64, giving a polynomial hash per case
+                powers = np.cumprod(np.full(int(lengths.max()), base, dtype=np.uint64))
+                contributions = symbols * powers[position]
+                hashes = np.add.reduceat(contributions, self.case_starts)
+                keys.append(hashes ^ (lengths.astype(np.uint64) * base))
+
+        _, first_case, case_variant, counts = np.unique(
+            np.stack(keys, axis=1), axis=0, return_index=True, return_inverse=True, return_counts=True
+        )
+        sequences = [
+            self.activity_codes[self.case_starts[c]:self.case_ends[c]]
+            for c in first_case
+        ]
+        return VariantTable(self.activities, counts, sequences, case_variant.reshape(-1))
@@ -0,0 +1,195 @@
+"""
+Case-level cycle-time and waiting-time analytics with bottleneck ranking
+"""
+from typing import Dict, Any, List, Optional
+import logging
+import numpy as np
+import pandas as pd
+from .event_log import EventLog, detect_event_log_columns
+
+logger = logging.getLogger(__name__)
+
+NAT = np.iinfo(np.int64).min
+PERCENTILES = (0.5, 0.9, 0.95)
+
+
+def _percentile_table(keys: np.ndarray, values: np.ndarray, labels: np.ndarray) -> pd.DataFrame:
+    """Grouped count/mean/percentiles of values per integer key"""
+    valid = ~np.isnan(values) & (keys >= 0)
+    frame = pd.DataFrame({"key": keys[valid], "value": values[valid]})
+    if frame.empty:
+        return pd.DataFrame(columns=["count", "mean", "total", "p50", "p90", "p95"])
+
+    grouped = frame.groupby("key", sort=False)["value"]
+    table = grouped.agg(["count", "mean", "sum"]).rename(columns={"sum": "total"})
+    quantiles = grouped.quantile(list(PERCENTILES)).unstack()
+    quantiles.columns = [f"p{int(q * 100)}" for q in quantiles.columns]
+    table = table.join(quantiles)
+    table.index = labels[table.index.to_numpy()]
+    return table
+
+
+class PerformanceAnalyzer:
+    """Throughput, waiting and service times computed on a sorted event log"""
+
+    def __init__(self, log: EventLog):
+        self.log = log
+        same_case = log.transition_mask()
+
+        # Grouped diff: time since the previous event of the same case
+        waiting = np.full(log.num_events, np.nan)
+        if log.num_events > 1:
+            waiting[1:] = np.where(same_case, (log.timestamps[1:] - log.timestamps[:-1]) / 1e9, np.nan)
+
+        service = None
+        if log.start_timestamps is not None:
+            has_start = log.start_timestamps != NAT
+            service = np.where(has_start, (log.timestamps - log.start_timestamps) / 1e9, np.nan)
+            # With lifecycle starts, waiting ends when work on the activity begins
+            if log.num_events > 1:
+                waiting[1:] = np.where(
+                    same_case & has_start[1:],
+                    (log.start_timestamps[1:] - log.timestamps[:-1]) / 1e9,
+                    waiting[1:]
+                )
+
+        self.waiting_seconds = waiting
+        self.service_seconds = service
+        self._same_case = same_case
+
+    def throughput_seconds(self) -> np.ndarray:
+        """Per-case time from first to last event"""
+        log = self.log
+        return (log.timestamps[log.case_ends - 1] - log.timestamps[log.case_starts]) / 1e9
+
+    def case_durations(self) -> pd.Series:
+        return pd.Series(self.throughput_seconds(), index=self.log.cases, name="throughput_seconds")
+
+    def activity_stats(self) -> Dict[str, pd.DataFrame]:
+        """Waiting (and service) time distributions per activity"""
+        log = self.log
+        stats = {"waiting": _percentile_table(log.activity_codes, self.waiting_seconds, log.activities)}
+        if self.service_seconds is not None:
+            stats["service"] = _percentile_table(log.activity_codes, self.service_seconds, log.activities)
+        return stats
+
+    def resource_stats(self) -> Optional[Dict[str, pd.DataFrame]]:
+        """Waiting (and service) time distributions per resource"""
+        log = self.log
+        if log.resource_codes is None:
+            return None
+        stats = {"waiting": _percentile_table(log.resource_codes, self.waiting_seconds, log.resources)}
+        if self.service_seconds is not None:
+            stats["service"] = _percentile_table(log.resource_codes, self.service_seconds, log.resources)
+        return stats
+
+    def bottlenecks(self, k: int = 10) -> List[Dict[str, Any]]:
+        """Transitions ranked by the total waiting time they account for"""
+        log = self.log
+        n_act = len(log.activities)
+        if not n_act or log.num_events < 2:
+            return []
+
+        same_case = self._same_case
+        pairs = (log.activity_codes[:-1][same_case].astype(np.int64) * n_act
+                 + log.activity_codes[1:][same_case].astype(np.int64))
+        waits = self.waiting_seconds[1:][same_case]
+        pair_labels, codes = np.unique(pairs, return_inverse=True)
+        table = _percentile_table(codes.reshape(-1), waits, pair_labels)
+        if table.empty:
+            return []
+
+        grand_total = table["total"].sum()
+        ranked = table.sort_values(["total", "p90"], ascending=False).head(k)
+        return [
+            {
+                "source": str(log.activities[int(pair) // n_act]),
+                "target": str(log.activities[int(pair) % n_act]),
+                "frequency": int(row["count"]),
+                "mean_wait_seconds": float(row["mean"]),
+                "p50_wait_seconds": float(row["p50"]),
+                "p90_wait_seconds": float(row["p90"]),
+                "share_of_waiting": float(row["total"] / grand_total) if grand_total else 0.0
+            }
+            for pair, row in ranked.iterrows()
+        ]
+
+    def summary(self, top_k: int = 10) -> Dict[str, Any]:
+        """Compact performance summary suitable for agent prompts"""
+        throughput = self.throughput_seconds()
+        summary = {
+            "throughput_seconds": self._describe(throughput),
+            "activities": self._table_summary(self.activity_stats(), top_k),
+            "bottlenecks": self.bottlenecks(top_k)
+        }
+        resources = self.resource_stats()
+        if resources is not None:
+            summary["resources"] = self._table_summary(resources, top_k)
+        return summary
+
+    @staticmethod
+    def _describe(values: np.ndarray) -> Dict[str, float]:
+        if not len(values):
+            return {}
+        p50, p90, p95 = np.percentile(values, [q * 100 for q in PERCENTILES])
+        return {
+            "mean": float(values.mean()),
+            "p50": float(p50),
+            "p90": float(p90),
+            "p95": float(p95),
+            "max": float(values.max())
+        }
+
+    @staticmethod
+    def _table_summary(tables: Dict[str, pd.DataFrame], top_k: int) -> Dict[str, Any]:
+        """Slowest entries by p90 for each measure"""
+        return {
+            measure: {
+                str(label): {
+                    "count": int(row["count"]),
+                    "mean": float(row["mean"]),
+                    "p50": float(row["p50"]),
+                    "p90": float(row["p90"]),
+                    "p95": float(row["p95"])
+                }
+                for label, row in table.sort_values("p90", ascending=False).head(top_k).iterrows()
+            }
+            for measure, table in tables.items()
+        }
+
+
+def summarize_log(log: EventLog, top_k: int = 10) -> Dict[str, Any]:
+    """Compact process summary suitable for agent prompts"""
+    lengths = log.case_ends - log.case_starts
+    return {
+        "events": log.num_events,
+        "cases": log.num_cases,
+        "activities": int(len(log.activities)),
+        "events_per_case": {
+            "mean": float(lengths.mean()) if len(lengths) else 0.0,
+            "max": int(lengths.max()) if len(lengths) else 0
+        },
+        "directly_follows": log.directly_follows().to_summary(top_k * 2),
+        "variants": log.variants().to_summary(top_k),
+        "performance": PerformanceAnalyzer(log).summary(top_k)
+    }
+
+
+def summarize_event_log(df: pd.DataFrame, top_k: int = 10) -> Optional[Dict[str, Any]]:
+    """Process summary for a dataset, or None when it is not an event log"""
+    columns = detect_event_log_columns(df)
+    if columns is None:
+        return None
+    try:
+        summary = summarize_log(EventLog.from_dataframe(df, columns), top_k)
+        summary["columns"] = {
+            "case": columns.case,
+            "activity": columns.activity,
+            "timestamp": columns.timestamp,
+            "resource": columns.resource,
+            "start_timestamp": columns.start_timestamp
+        }
+        return summary
+    except Exception as e:
+        logger.warning(f"Event log summary failed: {e}")
+        return None
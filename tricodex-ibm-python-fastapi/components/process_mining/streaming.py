@@ -0,0 +1,272 @@
+"""
+Incremental process discovery over streamed ticket events
+"""
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import heapq
+import logging
+import math
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RunningStats:
+    """Welford running mean/variance with min and max"""
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    minimum: float = math.inf
+    maximum: float = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+    @property
+    def total(self) -> float:
+        return self.mean * self.count
+
+    def to_dict(self) -> Dict[str, float]:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "std": math.sqrt(self.m2 / self.count),
+            "min": self.minimum,
+            "max": self.maximum
+        }
+
+
+@dataclass
+class _OpenCase:
+    first_seen: float
+    last_seen: float
+    last_activity: int
+    events: int = 1
+
+
+@dataclass
+class IncrementalDiscovery:
+    """Directly-follows counts, open-case state and running durations for a live stream
+
+    Closed cases (an end activity was seen) and idle cases are evicted, so
+    memory is bounded by max_open_cases plus the activity alphabet.
+    """
+    stream_id: str
+    end_activities: Set[str] = field(default_factory=set)
+    idle_timeout_seconds: float = 7 * 24 * 3600
+    max_open_cases: int = 100_000
+
+    def __post_init__(self):
+        self._activity_ids: Dict[str, int] = {}
+        self._activities: List[str] = []
+        self._transitions: Dict[Tuple[int, int], RunningStats] = {}
+        self._start_counts: Dict[int, int] = {}
+        self._end_counts: Dict[int, int] = {}
+        # Least recently updated first, for capacity eviction
+        self._open: "OrderedDict[str, _OpenCase]" = OrderedDict()
+        # (last_seen, case) entries for idle eviction; superseded entries are skipped when popped
+        self._idle_heap: List[Tuple[float, str]] = []
+        self._throughput = RunningStats()
+        self._clock = -math.inf
+        self.events = 0
+        self.closed_cases = 0
+        self.evicted_cases = 0
+        self.late_events = 0
+        self.updated_at: Optional[datetime] = None
+
+    @property
+    def open_cases(self) -> int:
+        return len(self._open)
+
+    def ingest(self, case_id: Any, activity: str, timestamp: Any) -> None:
+        """Add one event and update all running state
+
+        Naive timestamps are taken as UTC.
+        """
+        ts = pd.Timestamp(timestamp).timestamp()
+        code = self._activity_code(str(activity))
+        case_key = str(case_id)
+        self.events += 1
+        self._clock = max(self._clock, ts)
+
+        case = self._open.get(case_key)
+        if case is None:
+            case = _OpenCase(first_seen=ts, last_seen=ts, last_activity=code)
+            self._open[case_key] = case
+            self._start_counts[code] = self._start_counts.get(code, 0) + 1
+            self._track_idle(case_key, case)
+        else:
+            if ts < case.last_seen:
+                # Out-of-order events still count, with a zero-length transition
+                self.late_events += 1
+            key = (case.last_activity, code)
+            stats = self._transitions.get(key)
+            if stats is None:
+                stats = self._transitions[key] = RunningStats()
+            stats.add(max(ts - case.last_seen, 0.0))
+            case.last_activity = code
+            case.events += 1
+            self._open.move_to_end(case_key)
+            if ts > case.last_seen:
+                case.last_seen = ts
+                self._track_idle(case_key, case)
+
+        if activity in self.end_activities:
+            self._close(case_key)
+        elif len(self._open) > self.max_open_cases:
+            self._evict(next(iter(self._open)))
+
+        self.updated_at = datetime.now()
+
+    def ingest_many(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Add a batch of events, then evict idle cases once"""
+        count = 0
+        for event in events:
+            self.ingest(event["case_id"], event["activity"], event["timestamp"])
+            count += 1
+        self.evict_idle()
+        return count
+
+    def close_case(self, case_id: Any) -> bool:
+        """Explicitly mark a case as finished"""
+        case_key = str(case_id)
+        if case_key not in self._open:
+            return False
+        self._close(case_key)
+        return True
+
+    def evict_idle(self) -> int:
+        """Evict cases with no events within the idle timeout of the stream clock"""
+        cutoff = self._clock - self.idle_timeout_seconds
+        evicted = 0
+        # The heap is ordered by event time, so out-of-order arrivals are still found
+        while self._idle_heap and self._idle_heap[0][0] < cutoff:
+            last_seen, case_key = heapq.heappop(self._idle_heap)
+            case = self._open.get(case_key)
+            if case is not None and case.last_seen == last_seen:
+                self._evict(case_key)
+                evicted += 1
+        return evicted
+
+    def _track_idle(self, case_key: str, case: _OpenCase) -> None:
+        heapq.heappush(self._idle_heap, (case.last_seen, case_key))
+        if len(self._idle_heap) > 2 * len(self._open) + 1024:
+            # Drop superseded entries so the heap stays proportional to the open cases
+            self._idle_heap = [(open_case.last_seen, key) for key, open_case in self._open.items()]
+            heapq.heapify(self._idle_heap)
+
+    def snapshot(self, top_k: int = 10) -> Dict[str, Any]:
+        """Process summary in the same shape as summarize_log"""
+        relations = sorted(self._transitions.items(), key=lambda item: item[1].count, reverse=True)
+        total_wait = sum(stats.total for _, stats in relations)
+        bottlenecks = sorted(relations, key=lambda item: item[1].total, reverse=True)[:top_k]
+
+        open_ages = RunningStats()
+        for case in self._open.values():
+            open_ages.add(self._clock - case.first_seen)
+
+        return {
+            "stream_id": self.stream_id,
+            "events": self.events,
+            "cases": self.open_cases + self.closed_cases + self.evicted_cases,
+            "open_cases": self.open_cases,
+            "closed_cases": self.closed_cases,
+            "evicted_cases": self.evicted_cases,
+            "late_events": self.late_events,
+            "activities": len(self._activities),
+            "clock": datetime.fromtimestamp(self._clock, tz=timezone.utc).isoformat() if self.events else None,
+            "directly_follows": {
+                "relations": len(relations),
+                "top_relations": [
+                    {
+                        "source": self._activities[src],
+                        "target": self._activities[dst],
+                        "frequency": stats.count,
+                        "mean_seconds": stats.mean
+                    }
+                    for (src, dst), stats in relations[:top_k * 2]
+                ],
+                "start_activities": self._labelled(self._start_counts, top_k),
+                "end_activities": self._labelled(self._end_counts, top_k)
+            },
+            "performance": {
+                "throughput_seconds": self._throughput.to_dict(),
+                "open_case_age_seconds": open_ages.to_dict(),
+                "bottlenecks": [
+                    {
+                        "source": self._activities[src],
+                        "target": self._activities[dst],
+                        "frequency": stats.count,
+                        "mean_wait_seconds": stats.mean,
+                        "max_wait_seconds": stats.maximum,
+                        "share_of_waiting": stats.total / total_wait if total_wait else 0.0
+                    }
+                    for (src, dst), stats in bottlenecks
+                ]
+            }
+        }
+
+    def _activity_code(self, activity: str) -> int:
+        code = self._activity_ids.get(activity)
+        if code is None:
+            code = self._activity_ids[activity] = len(self._activities)
+            self._activities.append(activity)
+        return code
+
+    def _close(self, case_key: str) -> None:
+        case = self._open.pop(case_key)
+        self._throughput.add(case.last_seen - case.first_seen)
+        self._end_counts[case.last_activity] = self._end_counts.get(case.last_activity, 0) + 1
+        self.closed_cases += 1
+
+    def _evict(self, case_key: str) -> None:
+        # Evicted cases are incomplete, so they stay out of throughput and end counts
+        self._open.pop(case_key)
+        self.evicted_cases += 1
+
+    def _labelled(self, counts: Dict[int, int], k: int) -> Dict[str, int]:
+        ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:k]
+        return {self._activities[code]: count for code, count in ranked}
+
+
+class StreamRegistry:
+    """Live discovery engines keyed by stream id"""
+
+    def __init__(self, idle_timeout_seconds: float, max_open_cases: int, max_streams: int = 64):
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.max_open_cases = max_open_cases
+        self.max_streams = max_streams
+        self._streams: Dict[str, IncrementalDiscovery] = {}
+
+    def get(self, stream_id: str) -> Optional[IncrementalDiscovery]:
+        return self._streams.get(stream_id)
+
+    def get_or_create(self, stream_id: str, end_activities: Optional[Iterable[str]] = None) -> IncrementalDiscovery:
+        stream = self._streams.get(stream_id)
+        if stream is None:
+            if len(self._streams) >= self.max_streams:
+                # Drop the least recently updated stream
+                stale = min(self._streams, key=lambda key: self._streams[key].updated_at or datetime.min)
+                del self._streams[stale]
+                logger.warning(f"Dropped stream {stale} to stay within {self.max_streams} live streams")
+            stream = self._streams[stream_id] = IncrementalDiscovery(
+                stream_id=stream_id,
+                idle_timeout_seconds=self.idle_timeout_seconds,
+                max_open_cases=self.max_open_cases
+            )
+        if end_activities:
+            stream.end_activities.update(end_activities)
+        return stream
+
+    def remove(self, stream_id: str) -> bool:
+        return self._streams.pop(stream_id, None) is not None
@@ -0,0 +1,185 @@
+"""
+Compact prefix-tree index over process variants
+"""
+from typing import Dict, Any, List, Optional, Sequence
+import logging
+import numpy as np
+from .event_log import EventLog
+
+logger = logging.getLogger(__name__)
+
+ROOT = 0
+
+
+class VariantIndex:
+    """Array-backed trie of activity sequences with per-node count and duration aggregates
+
+    Node ids are assigned level by level in sorted (parent, activity) order, so
+    the child key array is globally sorted and lookups are binary searches.
+    Memory grows with the number of distinct prefixes, not with the number of cases.
+    """
+
+    def __init__(self, log: EventLog):
+        self.activities = log.activities
+        self.cases = log.cases
+        self._activity_lookup = {str(label): code for code, label in enumerate(log.activities)}
+        self._n_act = max(len(log.activities), 1)
+        self._build(log)
+
+    def _build(self, log: EventLog) -> None:
+        n_act = self._n_act
+        starts = log.case_starts
+        lengths = log.case_ends - log.case_starts
+        throughput = (log.timestamps[log.case_ends - 1] - log.timestamps[starts]) / 1e9 if log.num_cases else np.empty(0)
+
+        parents = [np.array([-1], dtype=np.int64)]
+        activity = [np.array([-1], dtype=np.int64)]
+        depth = [np.array([0], dtype=np.int32)]
+        counts = [np.array([log.num_cases], dtype=np.int64)]
+        durations = [np.array([throughput.sum()], dtype=np.float64)]
+
+        case_node = np.zeros(log.num_cases, dtype=np.int64)
+        alive = np.flatnonzero(lengths > 0)
+        next_id = 1
+        level = 0
+
+        # One pass over the events, a level of the trie at a time
+        while len(alive):
+            codes = log.activity_codes[starts[alive] + level].astype(np.int64)
+            keys = case_node[alive] * n_act + codes
+            unique_keys, inverse = np.unique(keys, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            node_ids = next_id + np.arange(len(unique_keys))
+
+            parents.append(unique_keys // n_act)
+            activity.append(unique_keys % n_act)
+            depth.append(np.full(len(unique_keys), level + 1, dtype=np.int32))
+            counts.append(np.bincount(inverse, minlength=len(unique_keys)))
+            durations.append(np.bincount(inverse, weights=throughput[alive], minlength=len(unique_keys)))
+
+            case_node[alive] = node_ids[inverse]
+            next_id += len(unique_keys)
+            level += 1
+            alive = alive[lengths[alive] > level]
+
+        self.parent = np.concatenate(parents)
+        self.activity = np.concatenate(activity)
+        self.depth = np.concatenate(depth)
+        self.count = np.concatenate(counts)
+        self.duration_sum = np.concatenate(durations)
+        self.case_leaf = case_node
+        self.terminal_count = np.bincount(case_node, minlength=len(self.parent))
+        self._child_keys = self.parent[1:] * n_act + self.activity[1:]
+        logger.info(f"Built variant index with {len(self.parent)} prefix nodes for {log.num_cases} cases")
+
+    @property
+    def num_nodes(self) -> int:
+        return int(len(self.parent))
+
+    def find(self, prefix: Sequence[str]) -> Optional[int]:
+        """Node id for an activity prefix, or None when no case starts with it"""
+        node = ROOT
+        for label in prefix:
+            code = self._activity_lookup.get(str(label))
+            if code is None:
+                return None
+            key = node * self._n_act + code
+            pos = np.searchsorted(self._child_keys, key)
+            if pos >= len(self._child_keys) or self._child_keys[pos] != key:
+                return None
+            node = int(pos) + 1
+        return node
+
+    def path(self, node: int) -> List[str]:
+        """Activity labels from the root to a node"""
+        labels = []
+        while node > ROOT:
+            labels.append(str(self.activities[self.activity[node]]))
+            node = int(self.parent[node])
+        return labels[::-1]
+
+    def ancestors_at(self, nodes: np.ndarray, depth: int) -> np.ndarray:
+        """Vectorized ancestor lookup at a given depth (-1 when shallower)"""
+        nodes = np.asarray(nodes, dtype=np.int64).copy()
+        result = np.where(self.depth[nodes] >= depth, nodes, -1)
+        active = result >= 0
+        while True:
+            deeper = active & (self.depth[np.maximum(result, 0)] > depth)
+            if not deeper.any():
+                return result
+            result[deeper] = self.parent[result[deeper]]
+
+    def top_variants(self, k: int = 10, prefix: Sequence[str] = ()) -> List[Dict[str, Any]]:
+        """Most frequent complete variants, optionally restricted to a prefix"""
+        variants = np.flatnonzero(self.terminal_count)
+        if prefix:
+            node = self.find(prefix)
+            if node is None:
+                return []
+            variants = variants[self.ancestors_at(variants, len(prefix)) == node]
+        if not len(variants):
+            return []
+
+        weights = self.terminal_count[variants]
+        if len(variants) > k:
+            selected = np.argpartition(-weights, k - 1)[:k]
+            variants, weights = variants[selected], weights[selected]
+        order = np.argsort(-weights, kind='stable')
+
+        total = self.terminal_count.sum()
+        return [
+            {
+                "variant": self.path(int(node)),
+                "cases": int(self.terminal_count[node]),
+                "share": float(self.terminal_count[node] / total) if total else 0.0
+            }
+            for node in variants[order]
+        ]
+
+    def prefix_stats(self, prefix: Sequence[str]) -> Optional[Dict[str, Any]]:
+        """Case count and mean throughput of cases sharing a prefix"""
+        node = self.find(prefix)
+        if node is None:
+            return None
+        return self._node_stats(node)
+
+    def cases_with_prefix(self, prefix: Sequence[str]) -> np.ndarray:
+        """Case labels whose activity sequence starts with the prefix"""
+        node = self.find(prefix)
+        if node is None:
+            return self.cases[:0]
+        return self.cases[self.ancestors_at(self.case_leaf, len(prefix)) == node]
+
+    def slow_prefixes(self, k: int = 10, min_cases: int = 5, max_depth: Optional[int] = None,
+                      prefix: Sequence[str] = ()) -> List[Dict[str, Any]]:
+        """Prefixes whose cases have the highest mean throughput time, optionally within a prefix's subtree"""
+        eligible = (self.count >= min_cases) & (self.depth > 0)
+        if max_depth is not None:
+            eligible &= self.depth <= max_depth
+        nodes = np.flatnonzero(eligible)
+        if prefix:
+            root = self.find(prefix)
+            if root is None:
+                return []
+            nodes = nodes[self.ancestors_at(nodes, len(prefix)) == root]
+        if not len(nodes):
+            return []
+        means = self.duration_sum[nodes] / self.count[nodes]
+        order = np.argsort(-means, kind='stable')[:k]
+        return [self._node_stats(int(node)) for node in nodes[order]]
+
+    def _node_stats(self, node: int) -> Dict[str, Any]:
+        count = int(self.count[node])
+        return {
+            "prefix": self.path(node),
+            "cases": count,
+            "complete_cases": int(self.terminal_count[node]),
+            "mean_throughput_seconds": float(self.duration_sum[node] / count) if count else 0.0
+        }
+
+    def summary(self, top_k: int = 10) -> Dict[str, Any]:
+        return {
+            "prefix_nodes": self.num_nodes,
+            "top_variants": self.top_variants(top_k),
+            "slow_prefixes": self.slow_prefixes(top_k, max_depth=3)
+        }
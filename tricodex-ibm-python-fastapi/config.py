@@ -21,12 +21,20 @@ class Config:
         "model_id": "ibm/granite-3-8b-instruct",  # Updated to supported model
         "api_key": os.getenv("IBM_API_KEY"),
         "project_id": os.getenv("PROJECT_ID"),
-        "url": os.getenv("WATSONX_URL", "https://us-south.ml.cloud.ibm.com")
+        "url": os.getenv("WATSONX_URL", "https://us-south.ml.cloud.ibm.com"),
+        "max_concurrency": int(os.getenv("WATSON_MAX_CONCURRENCY", "8")),
+        "params": {
+            "decoding_method": "greedy",
+            "max_new_tokens": 1024,
+            "min_new_tokens": 50,
+            "repetition_penalty": 1.2
+        }
     }
     
     GEMINI_CONFIG = {
         "api_key": os.getenv("GOOGLE_API_KEY"),
         "model": "gemini-2.0-flash",  # Using latest flash model
+        "max_concurrency": int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")),
         "params": {
             "temperature": 0.7,
             "top_p": 0.8,
@@ -35,6 +43,54 @@ class Config:
         }
     }
     
+    # Per-provider LLM budgets, applied to each model separately (0 disables a budget)
+    RATE_LIMITS = {
+        "watson": {
+            "requests_per_minute": int(os.getenv("WATSON_REQUESTS_PER_MINUTE", "120")),
+            "tokens_per_minute": int(os.getenv("WATSON_TOKENS_PER_MINUTE", "100000"))
+        },
+        "gemini": {
+            "requests_per_minute": int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60")),
+            "tokens_per_minute": int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+        }
+    }
+    # Share the per-minute budgets across workers through MongoDB
+    RATE_LIMIT_SHARED = os.getenv("RATE_LIMIT_SHARED", "false").lower() == "true"
+    
+    # Circuit breaker per LLM provider: opens on failure or slow-call rate over the window
+    CIRCUIT_BREAKER = {
+        "error_rate": float(os.getenv("CIRCUIT_ERROR_RATE", "0.5")),
+        "slow_call_seconds": float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "60")),
+        "slow_call_rate": float(os.getenv("CIRCUIT_SLOW_CALL_RATE", "0.5")),
+        "min_calls": int(os.getenv("CIRCUIT_MIN_CALLS", "10")),
+        "window_seconds": float(os.getenv("CIRCUIT_WINDOW_SECONDS", "60")),
+        "open_seconds": float(os.getenv("CIRCUIT_OPEN_SECONDS", "30")),
+        "half_open_probes": int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "2"))
+    }
+    
+    # Backup per stage ("provider" or "provider:model", "" for none). Calls go there while the
+    # primary's circuit is open, and are hedged there once a primary call passes its latency percentile
+    HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "true").lower() == "true"
+    HEDGE_BUDGET = float(os.getenv("HEDGE_BUDGET", "0.1"))  # backup calls per primary call, at most 1
+    HEDGING = {
+        "watson": {
+            "backup": os.getenv("WATSON_HEDGE_BACKUP", "gemini"),
+            "percentile": float(os.getenv("WATSON_HEDGE_PERCENTILE", "90")),
+            "min_delay": float(os.getenv("WATSON_HEDGE_MIN_DELAY", "2.0"))  # seconds
+        },
+        "gemini": {
+            "backup": os.getenv("GEMINI_HEDGE_BACKUP", "watson"),
+            "percentile": float(os.getenv("GEMINI_HEDGE_PERCENTILE", "90")),
+            "min_delay": float(os.getenv("GEMINI_HEDGE_MIN_DELAY", "2.0"))
+        }
+    }
+    
+    # LLM response cache
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_responses.sqlite3"))
+    LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))  # seconds
+    LLM_CACHE_MONGO = os.getenv("LLM_CACHE_MONGO", "false").lower() == "true"
+    
     # Database configurations
     MONGODB_URL = os.getenv("MONGODB_URL")
     DB_NAME = "processlens_db"
@@ -45,10 +101,16 @@ class Config:
     }
     
     # Analysis configurations
-    DEFAULT_TIMEOUT = int(os.getenv("DEFAULT_TIMEOUT", "300"))
+    DEFAULT_TIMEOUT = int(os.getenv("DEFAULT_TIMEOUT", "300"))  # seconds per analysis task, end to end
+    DEADLINE_GRACE = float(os.getenv("DEADLINE_GRACE", "10"))  # seconds allowed past it to store a partial result
     CHUNK_SIZE = 1024 * 1024  # 1MB
     MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
     
+    # Event stream configurations
+    STREAM_IDLE_TIMEOUT = int(os.getenv("STREAM_IDLE_TIMEOUT", str(7 * 24 * 3600)))  # seconds of event time
+    STREAM_MAX_OPEN_CASES = int(os.getenv("STREAM_MAX_OPEN_CASES", "100000"))
+    STREAM_MAX_STREAMS = int(os.getenv("STREAM_MAX_STREAMS", "64"))
+    
     # API configurations
     CORS_ORIGINS = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
     API_VERSION = "2.0.0"
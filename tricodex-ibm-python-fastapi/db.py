@@ -65,6 +65,8 @@ class Database:
                 await cls.db.analyses.create_index([("created_at", -1)])
                 await cls.db.analyses.create_index([("status", 1)])
                 await cls.db.analyses.create_index([("project.name", 1)])
+                await cls.db.rate_limits.create_index("expires_at", expireAfterSeconds=0)
+                await cls.db.llm_responses.create_index("expires_at", expireAfterSeconds=0)
             else:
                 logger.warning("Database not initialized, skipping index creation")
         except Exception as e:
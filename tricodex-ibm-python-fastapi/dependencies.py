@@ -10,6 +10,7 @@ from storage import GridFSStorage
 from services.analysis_service import AnalysisService
 from components.agents.factory import AgentFactory
 from components.pipeline.analysis_pipeline import EnhancedAnalysisPipeline
+from components.process_mining import StreamRegistry
 from config import Config
 
 logger = logging.getLogger(__name__)
@@ -28,21 +29,26 @@ class ConnectionManager:
 
     async def disconnect(self, websocket: WebSocket, task_id: str):
         async with self._lock:
-            if task_id in self.active_connections:
+            if websocket in self.active_connections.get(task_id, []):
                 self.active_connections[task_id].remove(websocket)
                 if not self.active_connections[task_id]:
                     del self.active_connections[task_id]
 
     async def broadcast_update(self, task_id: str, data: Dict[str, Any]):
-        if task_id in self.active_connections:
-            for websocket in self.active_connections[task_id]:
-                try:
-                    await websocket.send_json(data)
-                except:
-                    await self.disconnect(websocket, task_id)
+        # Iterate over a copy; failed sockets are removed while broadcasting
+        for websocket in list(self.active_connections.get(task_id, [])):
+            try:
+                await websocket.send_json(data)
+            except Exception:
+                await self.disconnect(websocket, task_id)
 
 # Global instances
 _connection_manager = ConnectionManager()
+_stream_registry = StreamRegistry(
+    idle_timeout_seconds=Config.STREAM_IDLE_TIMEOUT,
+    max_open_cases=Config.STREAM_MAX_OPEN_CASES,
+    max_streams=Config.STREAM_MAX_STREAMS
+)
 
 async def get_db() -> AsyncGenerator:
     """Get database connection"""
@@ -97,7 +103,7 @@ async def get_analysis_service(
 ) -> AnalysisService:
     """Get analysis service instance"""
     try:
-        return AnalysisService(db, storage, pipeline)
+        return AnalysisService(db, storage, pipeline, _connection_manager)
     except Exception as e:
         logger.error(f"Failed to initialize analysis service: {e}", exc_info=True)
         raise HTTPException(
@@ -107,4 +113,8 @@ async def get_analysis_service(
 
 def get_connection_manager() -> ConnectionManager:
     """Get WebSocket connection manager instance"""
-    return _connection_manager
\ No newline at end of file
+    return _connection_manager
+
+def get_stream_registry() -> StreamRegistry:
+    """Get live event stream registry instance"""
+    return _stream_registry
\ No newline at end of file
@@ -15,6 +15,12 @@ from typing import Dict, Any
 from db import Database
 from routes import api_router, analysis, health, websocket
 from components.agents.factory import AgentFactory
+from components.agents.clients import client_status
+from components.agents.rate_limiter import limiter_status
+from components.agents.hedging import hedge_status
+from components.agents.circuit_breaker import breaker_status
+from components.agents.response_cache import cache_stats
+from components.data_processing.parallel import shutdown_executors
 from config import Config
 from utils.logging_config import setup_logging
 
@@ -86,7 +92,8 @@ async def lifespan(app: FastAPI):
         logger.info("Starting ProcessLens shutdown...")
         try:
             await Database.close_db()
-            AgentFactory.reset_agents()
+            await AgentFactory.shutdown()
+            shutdown_executors()
             logger.info("Cleanup completed successfully")
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
@@ -180,6 +187,11 @@ async def startup_status():
         "startup_time": startup_time.isoformat() if startup_time else None,
         "initialization_errors": initialization_errors,
         "agents": AgentFactory.get_agent_status(),
+        "llm_clients": client_status(),
+        "rate_limits": limiter_status(),
+        "hedging": hedge_status(),
+        "circuit_breakers": breaker_status(),
+        "llm_cache": cache_stats(),
         "database": {"connected": Database.db is not None},
         "config": Config.get_api_config()
     }
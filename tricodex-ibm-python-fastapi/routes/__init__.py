@@ -5,6 +5,7 @@ from fastapi import APIRouter
 from routes.analysis import router as analysis_router
 from routes.health import router as health_router
 from routes.websocket import router as ws_router
+from routes.events import router as events_router
 
 # Create main router
 api_router = APIRouter()
@@ -13,5 +14,6 @@ api_router = APIRouter()
 api_router.include_router(analysis_router, prefix="/analyze", tags=["analysis"])  # Changed from /analysis to /analyze
 api_router.include_router(health_router, prefix="/health", tags=["health"])
 api_router.include_router(ws_router, prefix="/ws", tags=["websocket"])
+api_router.include_router(events_router, prefix="/events", tags=["events"])
 
 __all__ = ["api_router"]
\ No newline at end of file
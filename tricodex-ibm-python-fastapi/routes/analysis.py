@@ -1,23 +1,23 @@
 """
 Analysis routes with dependency injection
 """
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, BackgroundTasks, status, Form
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, BackgroundTasks, status, Form, Query
 from fastapi.responses import JSONResponse
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from services.analysis_service import AnalysisService
 from utils.helpers import ProcessLensError, format_error_response, validate_file_content
+from utils.normalizer import normalize
 from dependencies import get_analysis_service
 from bson import ObjectId
 import logging
 from datetime import datetime
-import json
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 def serialize_response(data: Dict[str, Any]) -> Dict[str, Any]:
     """Serialize response data to ensure JSON compatibility"""
-    return json.loads(json.dumps(data, default=str))
+    return normalize(data, default=str)
 
 @router.post("/")  # Changed from /analyze to / since the prefix will be /analyze
 async def start_analysis(
@@ -114,8 +114,9 @@ async def get_analysis_status(
     service: AnalysisService = Depends(get_analysis_service)
 ) -> JSONResponse:
     try:
+        # Already normalized by the service
         status = await service.get_analysis_status(task_id)
-        return JSONResponse(content=serialize_response(status))
+        return JSONResponse(content=status)
     except ProcessLensError as e:
         logger.error(f"Failed to get analysis status: {e}")
         return JSONResponse(
@@ -128,6 +129,38 @@ async def get_analysis_status(
         )
     except Exception as e:
         logger.error(f"Unexpected error getting status: {e}", exc_info=True)
+        return JSONResponse(
+            content={
+                "status": "error",
+                "error": "Internal server error",
+                "details": str(e)
+            },
+            status_code=500
+        )
+
+@router.get("/{task_id}/variants")
+async def get_variants(
+    task_id: str,
+    prefix: List[str] = Query(default=[]),
+    k: int = Query(default=10, ge=1, le=1000),
+    service: AnalysisService = Depends(get_analysis_service)
+) -> JSONResponse:
+    """Top-k process variants, optionally filtered by an activity prefix"""
+    try:
+        variants = await service.get_variants(task_id, prefix, k)
+        return JSONResponse(content=serialize_response(variants))
+    except ProcessLensError as e:
+        logger.error(f"Failed to get variants: {e}")
+        return JSONResponse(
+            content={
+                "status": "error",
+                "error": str(e),
+                "details": e.details if hasattr(e, 'details') else None
+            },
+            status_code=404
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error getting variants: {e}", exc_info=True)
         return JSONResponse(
             content={
                 "status": "error",
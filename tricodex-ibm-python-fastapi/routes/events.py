@@ -0,0 +1,129 @@
+"""
+Live ticket event ingestion and incremental process discovery routes
+"""
+from fastapi import APIRouter, Depends, BackgroundTasks, Query
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from datetime import datetime
+import logging
+from components.process_mining import StreamRegistry
+from services.analysis_service import AnalysisService
+from utils.helpers import ProcessLensError
+from dependencies import get_analysis_service, get_stream_registry
+from routes.analysis import serialize_response
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+class TicketEvent(BaseModel):
+    """Single case/activity/timestamp event"""
+    case_id: str
+    activity: str
+    timestamp: datetime
+
+class EventBatch(BaseModel):
+    """Batch of events for one stream"""
+    events: List[TicketEvent] = Field(default_factory=list)
+    end_activities: Optional[List[str]] = None
+    closed_cases: Optional[List[str]] = None
+
+def _stream_not_found(stream_id: str) -> JSONResponse:
+    return JSONResponse(
+        content={
+            "status": "error",
+            "error": "Stream not found",
+            "details": {"stream_id": stream_id}
+        },
+        status_code=404
+    )
+
+@router.post("/{stream_id}")
+async def ingest_events(
+    stream_id: str,
+    batch: EventBatch,
+    registry: StreamRegistry = Depends(get_stream_registry)
+) -> JSONResponse:
+    """Fold a batch of events into the stream's running process model"""
+    try:
+        stream = registry.get_or_create(stream_id, batch.end_activities)
+        ingested = stream.ingest_many(event.model_dump() for event in batch.events)
+        closed = sum(stream.close_case(case_id) for case_id in batch.closed_cases or [])
+        return JSONResponse(
+            status_code=202,
+            content=serialize_response({
+                "status": "accepted",
+                "stream_id": stream_id,
+                "ingested": ingested,
+                "closed": closed,
+                "events": stream.events,
+                "open_cases": stream.open_cases
+            })
+        )
+    except Exception as e:
+        logger.error(f"Event ingestion failed for stream {stream_id}: {e}", exc_info=True)
+        return JSONResponse(
+            content={
+                "status": "error",
+                "error": "Event ingestion failed",
+                "details": str(e)
+            },
+            status_code=400
+        )
+
+@router.get("/{stream_id}/snapshot")
+async def get_snapshot(
+    stream_id: str,
+    k: int = Query(default=10, ge=1, le=100),
+    registry: StreamRegistry = Depends(get_stream_registry)
+) -> JSONResponse:
+    """Current directly-follows relations and running durations"""
+    stream = registry.get(stream_id)
+    if stream is None:
+        return _stream_not_found(stream_id)
+    return JSONResponse(content=serialize_response(stream.snapshot(k)))
+
+@router.post("/{stream_id}/analyze")
+async def analyze_snapshot(
+    stream_id: str,
+    background_tasks: BackgroundTasks,
+    k: int = Query(default=10, ge=1, le=100),
+    registry: StreamRegistry = Depends(get_stream_registry),
+    service: AnalysisService = Depends(get_analysis_service)
+) -> JSONResponse:
+    """Start an agent analysis of the current snapshot"""
+    stream = registry.get(stream_id)
+    if stream is None:
+        return _stream_not_found(stream_id)
+    try:
+        snapshot = stream.snapshot(k)
+        task = await service.start_snapshot_analysis(snapshot, {"stream_id": stream_id, "events": stream.events})
+        background_tasks.add_task(service.process_snapshot_analysis, task["task_id"], snapshot)
+        return JSONResponse(
+            status_code=202,
+            content=serialize_response({
+                "status": "accepted",
+                "task_id": task["task_id"],
+                "message": "Snapshot analysis started successfully"
+            })
+        )
+    except ProcessLensError as e:
+        logger.error(f"Failed to start snapshot analysis: {e}")
+        return JSONResponse(
+            content={
+                "status": "error",
+                "error": str(e),
+                "details": e.details if hasattr(e, 'details') else None
+            },
+            status_code=500
+        )
+
+@router.delete("/{stream_id}")
+async def delete_stream(
+    stream_id: str,
+    registry: StreamRegistry = Depends(get_stream_registry)
+) -> JSONResponse:
+    """Drop a stream and its state"""
+    if not registry.remove(stream_id):
+        return _stream_not_found(stream_id)
+    return JSONResponse(content={"status": "deleted", "stream_id": stream_id})
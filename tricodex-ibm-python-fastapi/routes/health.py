@@ -8,6 +8,7 @@ from datetime import datetime
 import logging
 from db import Database
 from components.agents.factory import AgentFactory
+from components.agents.circuit_breaker import breaker_status
 from dependencies import get_db
 
 logger = logging.getLogger(__name__)
@@ -87,6 +88,16 @@ async def model_health() -> Dict[str, Any]:
                 }
                 continue
 
+            # An open circuit answers for the provider without another request
+            breaker = agent.client.breaker
+            if not breaker.allows_calls:
+                model_status[agent_type] = {
+                    "status": "circuit_open",
+                    "error": f"{agent.client.provider} circuit is {breaker.state}",
+                    "circuit_breaker": breaker.status()
+                }
+                continue
+
             # Simple health check with timeout
             result = await asyncio.wait_for(
                 agent.analyze({"type": "health_check"}),
@@ -96,7 +107,8 @@ async def model_health() -> Dict[str, Any]:
             model_status[agent_type] = {
                 "status": "healthy",
                 "latency": result.get("latency", 0),
-                "error": None
+                "error": None,
+                "circuit_breaker": breaker.status()
             }
             
         except asyncio.TimeoutError:
@@ -118,5 +130,6 @@ async def model_health() -> Dict[str, Any]:
     return {
         "status": overall_status,
         "timestamp": datetime.utcnow().isoformat(),
-        "models": model_status
+        "models": model_status,
+        "circuit_breakers": breaker_status()
     }
\ No newline at end of file
@@ -21,54 +21,32 @@ class DateTimeEncoder(json.JSONEncoder):
             return obj.isoformat()
         return super().default(obj)
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
+def format_message(task_id: str, message: Dict[str, Any]) -> Dict[str, Any]:
+    """Status message in the structure the client expects"""
+    formatted_message = {
+        "type": message.get("type", "status_update"),
+        "data": {
+            "taskId": task_id,
+            "status": message.get("status", "processing"),
+            "progress": message.get("progress", 0),
+            "thoughts": message.get("thoughts", []),
+            "results": message.get("results"),
+            "error": message.get("error")
+        }
+    }
     
-    async def connect(self, task_id: str, websocket: WebSocket):
-        try:
-            await websocket.accept()
-            self.active_connections[task_id] = websocket
-            logger.info(f"WebSocket connection established for task: {task_id}")
-        except Exception as e:
-            logger.error(f"Failed to establish WebSocket connection: {e}")
-            raise
-    
-    def disconnect(self, task_id: str):
-        if task_id in self.active_connections:
-            del self.active_connections[task_id]
-            logger.info(f"WebSocket disconnected: {task_id}")
-
-    async def send_message(self, task_id: str, message: Dict[str, Any]):
-        """Send formatted message to client"""
-        if task_id in self.active_connections:
-            try:
-                # Ensure message has required structure
-                formatted_message = {
-                    "type": message.get("type", "status_update"),
-                    "data": {
-                        "taskId": task_id,
-                        "status": message.get("status", "processing"),
-                        "progress": message.get("progress", 0),
-                        "thoughts": message.get("thoughts", []),
-                        "results": message.get("results"),
-                        "error": message.get("error")
-                    }
-                }
-                
-                # Convert all timestamps to ISO format
-                if "thoughts" in formatted_message["data"]:
-                    for thought in formatted_message["data"]["thoughts"]:
-                        if "timestamp" in thought:
-                            thought["timestamp"] = thought["timestamp"].isoformat()
+    # Convert all timestamps to ISO format
+    for thought in formatted_message["data"]["thoughts"]:
+        if "timestamp" in thought and hasattr(thought["timestamp"], "isoformat"):
+            thought["timestamp"] = thought["timestamp"].isoformat()
+    return formatted_message
 
-                await self.active_connections[task_id].send_text(
-                    json.dumps(formatted_message)
-                )
-            except Exception as e:
-                logger.error(f"Failed to send message: {e}")
-
-manager = ConnectionManager()
+async def send_message(websocket: WebSocket, task_id: str, message: Dict[str, Any]):
+    """Send formatted message to one client"""
+    try:
+        await websocket.send_text(json.dumps(format_message(task_id, message), cls=DateTimeEncoder))
+    except Exception as e:
+        logger.error(f"Failed to send message: {e}")
 
 @router.websocket("/{task_id}")
 async def analysis_updates(
@@ -79,20 +57,23 @@ async def analysis_updates(
 ):
     """WebSocket endpoint with enhanced error handling"""
     try:
-        await manager.connect(task_id, websocket)
+        await websocket.accept()
+        # Shared manager, so streamed insights for the task reach this socket
+        await connection_manager.connect(websocket, task_id)
+        logger.info(f"WebSocket connection established for task: {task_id}")
         
         # Send initial state with error handling
         if service:
             try:
                 status = await service.get_analysis_status(task_id)
                 if status:
-                    await manager.send_message(task_id, {
+                    await send_message(websocket, task_id, {
                         "type": "initial_state",
                         **status
                     })
             except Exception as e:
                 logger.error(f"Failed to get initial status: {e}")
-                await manager.send_message(task_id, {
+                await send_message(websocket, task_id, {
                     "type": "error",
                     "error": format_error_response(e)
                 })
@@ -108,13 +89,13 @@ async def analysis_updates(
                     try:
                         status = await service.get_analysis_status(task_id)
                         if status:
-                            await manager.send_message(task_id, {
+                            await send_message(websocket, task_id, {
                                 "type": "status_update",
                                 **status
                             })
                     except Exception as e:
                         logger.error(f"Status request failed: {e}")
-                        await manager.send_message(task_id, {
+                        await send_message(websocket, task_id, {
                             "type": "error",
                             "error": format_error_response(e)
                         })
@@ -125,7 +106,7 @@ async def analysis_updates(
             except Exception as e:
                 logger.error(f"WebSocket error: {e}")
                 try:
-                    await manager.send_message(task_id, {
+                    await send_message(websocket, task_id, {
                         "type": "error",
                         "error": format_error_response(e)
                     })
@@ -136,4 +117,4 @@ async def analysis_updates(
     except Exception as e:
         logger.error(f"WebSocket connection error: {e}")
     finally:
-        manager.disconnect(task_id)
\ No newline at end of file
+        await connection_manager.disconnect(websocket, task_id)
\ No newline at end of file
@@ -1,27 +1,43 @@
 """
 ProcessLens service layer for business logic
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+import asyncio
 import pandas as pd
 from bson import ObjectId
 from datetime import datetime
 import logging
 import json
+from config import Config
 from db import Database
 from storage import GridFSStorage
-from components.pipeline.analysis_pipeline import EnhancedAnalysisPipeline
-from utils.helpers import ProcessLensError
+from components.pipeline.analysis_pipeline import EnhancedAnalysisPipeline, AnalysisCache
+from components.agents.rate_limiter import request_priority, PRIORITY_BATCH
+from components.agents.streaming import stream_insights
+from components.process_mining import EventLog, VariantIndex, detect_event_log_columns
+from utils.helpers import ProcessLensError, dataframe_fingerprint
+from utils.deadline import Deadline
+from utils.singleflight import SingleFlight
 from utils.serializer import serialize_analysis_results, deserialize_analysis_results
+from utils.normalizer import normalize
 
 logger = logging.getLogger(__name__)
 
 class AnalysisService:
     """Service layer for handling analysis operations"""
     
-    def __init__(self, db: Database, storage: GridFSStorage, pipeline: EnhancedAnalysisPipeline):
+    # Variant indexes per uploaded file, shared across requests
+    _variant_indexes = AnalysisCache(max_size=16)
+    # Identical uploads analysed concurrently share one pipeline run
+    _analysis_flights = SingleFlight()
+    _flight_publishers: Dict[str, List[Any]] = {}
+    
+    def __init__(self, db: Database, storage: GridFSStorage, pipeline: EnhancedAnalysisPipeline,
+                 connection_manager: Optional[Any] = None):
         self.db = db
         self.storage = storage
         self.pipeline = pipeline
+        self.connection_manager = connection_manager
     
     async def start_analysis(self, file_content: bytes, filename: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Start a new analysis task"""
@@ -57,51 +73,58 @@ class AnalysisService:
             raise ProcessLensError("Failed to start analysis", {"error": str(e)})
     
     async def process_analysis(self, task_id: str, file_id: ObjectId) -> Dict[str, Any]:
-        """Process analysis task with enhanced logging and error handling"""
+        """Process analysis task with enhanced logging and error handling
+        
+        The whole task runs under one deadline of Config.DEFAULT_TIMEOUT;
+        stages still running when it passes are cancelled and the finished
+        ones are stored as a partial result.
+        """
+        deadline = Deadline(Config.DEFAULT_TIMEOUT)
         try:
             logger.info(f"Processing analysis task: {task_id}, file: {file_id}")
             
-            # Load and validate DataFrame
-            df = await self.storage.get_dataframe(file_id)
-            if df.empty:
-                raise ProcessLensError("Empty dataset provided")
-            logger.info(f"Loaded DataFrame with shape: {df.shape}")
-            logger.debug(f"DataFrame columns: {df.columns.tolist()}")
-            
-            # Run analysis with debug logging
-            results = await self.pipeline.analyze_dataset(df, f"analysis_{task_id}")
-            logger.debug(f"Raw analysis results: {json.dumps(self._sanitize_data(results), indent=2, default=str)}")
+            with deadline.scope():
+                # Load and validate DataFrame
+                df = await deadline.run(self.storage.get_dataframe(file_id))
+                if df.empty:
+                    raise ProcessLensError("Empty dataset provided")
+                logger.info(f"Loaded DataFrame with shape: {df.shape}")
+                logger.debug(f"DataFrame columns: {df.columns.tolist()}")
+                
+                # Run analysis, pushing insights to WebSocket subscribers as the models stream them
+                results = await self._coalesced_analysis(df, task_id)
             
-            # Serialize and validate results
+            # Serialize results once; the stored form is already JSON safe
             try:
                 serialized_results = serialize_analysis_results(results)
-                logger.debug(f"Serialized results: {json.dumps(serialized_results, indent=2)}")
             except Exception as e:
                 logger.error(f"Results serialization failed: {e}", exc_info=True)
                 raise ProcessLensError(f"Failed to serialize results: {str(e)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Serialized results: {json.dumps(serialized_results, indent=2)}")
             
-            # Update analysis record with sanitized data
-            sanitized_results = self._sanitize_data(serialized_results)
-            await self.db.analyses.update_one(
+            # Storing the result may overrun the deadline by the grace period, never more
+            await deadline.run(self.db.analyses.update_one(
                 {"_id": ObjectId(task_id)},
                 {
                     "$set": {
                         "status": "completed",
-                        "results": sanitized_results,
+                        "partial": results.get("status") == "partial",
+                        "results": serialized_results,
                         "completed_at": datetime.utcnow().isoformat(),
                         "progress": 100
                     }
                 }
-            )
+            ), grace=Config.DEADLINE_GRACE)
             logger.info(f"Analysis completed successfully for task: {task_id}")
             return results
             
         except Exception as e:
-            error_msg = str(e)
+            error_msg = "Analysis deadline exceeded" if isinstance(e, TimeoutError) else str(e)
             logger.error(f"Analysis failed for task {task_id}: {error_msg}", exc_info=True)
             
             # Update task with error status
-            await self.db.analyses.update_one(
+            await deadline.run(self.db.analyses.update_one(
                 {"_id": ObjectId(task_id)},
                 {
                     "$set": {
@@ -110,9 +133,46 @@ class AnalysisService:
                         "completed_at": datetime.utcnow().isoformat()
                     }
                 }
-            )
+            ), grace=Config.DEADLINE_GRACE)
             raise ProcessLensError(f"Analysis processing failed: {error_msg}")
     
+    async def _coalesced_analysis(self, df: pd.DataFrame, task_id: str) -> Dict[str, Any]:
+        """Run the pipeline, or join an identical run already in flight
+        
+        Runs are keyed by dataset content and pipeline configuration. Every
+        attached task receives the shared run's streamed insights and result.
+        """
+        key = f"{dataframe_fingerprint(df)}:{self.pipeline.config_key()}"
+        publishers = self._flight_publishers.setdefault(key, [])
+        publisher = self._insight_publisher(task_id)
+        publishers.append(publisher)
+        if len(publishers) > 1:
+            logger.info(f"Task {task_id} joined an in-flight analysis of the same dataset")
+        
+        async def fan_out(event: Dict[str, Any]) -> None:
+            for publish in list(self._flight_publishers.get(key, [])):
+                await publish(event)
+        
+        try:
+            with stream_insights(fan_out):
+                return await self._analysis_flights.do(
+                    key, lambda: self.pipeline.analyze_dataset(df, f"analysis_{task_id}")
+                )
+        finally:
+            publishers.remove(publisher)
+            if not publishers:
+                self._flight_publishers.pop(key, None)
+    
+    def _insight_publisher(self, task_id: str):
+        """Listener that forwards streamed agent output to the task's WebSocket subscribers"""
+        async def publish(event: Dict[str, Any]) -> None:
+            if self.connection_manager is not None:
+                await self.connection_manager.broadcast_update(task_id, {
+                    "type": "insight",
+                    "data": {"taskId": task_id, **self._sanitize_data(event)}
+                })
+        return publish
+    
     async def get_analysis_status(self, task_id: str) -> Dict[str, Any]:
         """Get analysis task status with deserialization"""
         try:
@@ -127,6 +187,7 @@ class AnalysisService:
             return self._sanitize_data({
                 "task_id": str(analysis["_id"]),
                 "status": analysis["status"],
+                "partial": analysis.get("partial", False),
                 "progress": analysis.get("progress", 0),
                 "results": analysis.get("results"),
                 "error": analysis.get("error"),
@@ -137,20 +198,94 @@ class AnalysisService:
             logger.error(f"Failed to get analysis status: {e}")
             raise ProcessLensError("Failed to get analysis status", {"error": str(e)})
 
+    async def get_variants(self, task_id: str, prefix: List[str], k: int = 10) -> Dict[str, Any]:
+        """Top-k variants and prefix statistics for an analysed event log"""
+        try:
+            analysis = await self.db.analyses.find_one({"_id": ObjectId(task_id)})
+            if not analysis:
+                raise ProcessLensError("Analysis task not found", {"task_id": task_id})
+            
+            file_id = analysis["file_id"]
+            index = self._variant_indexes.get(str(file_id))
+            if index is None:
+                df = await self.storage.get_dataframe(file_id)
+                columns = detect_event_log_columns(df)
+                if columns is None:
+                    raise ProcessLensError("Dataset is not an event log", {"columns": df.columns.tolist()})
+                index = await asyncio.to_thread(lambda: VariantIndex(EventLog.from_dataframe(df, columns)))
+                self._variant_indexes.set(str(file_id), index)
+            
+            return {
+                "task_id": task_id,
+                "prefix": prefix,
+                "prefix_stats": index.prefix_stats(prefix) if prefix else None,
+                "variants": index.top_variants(k, prefix),
+                "slow_prefixes": index.slow_prefixes(k, max_depth=len(prefix) + 1, prefix=prefix) if prefix else index.slow_prefixes(k, max_depth=3)
+            }
+            
+        except ProcessLensError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to get variants: {e}")
+            raise ProcessLensError("Failed to get variants", {"error": str(e)})
+
+    async def start_snapshot_analysis(self, snapshot: Dict[str, Any], metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Create an analysis task for a live process snapshot"""
+        try:
+            task_id = ObjectId()
+            await self.db.analyses.insert_one({
+                "_id": task_id,
+                "stream_id": snapshot.get("stream_id"),
+                "status": "processing",
+                "progress": 0,
+                "created_at": datetime.utcnow(),
+                "metadata": metadata,
+                "thoughts": []
+            })
+            logger.info(f"Snapshot analysis task created with ID: {task_id}")
+            return {"task_id": str(task_id), "status": "processing", "metadata": metadata}
+
+        except Exception as e:
+            logger.error(f"Failed to start snapshot analysis: {str(e)}", exc_info=True)
+            raise ProcessLensError("Failed to start snapshot analysis", {"error": str(e)})
+
+    async def process_snapshot_analysis(self, task_id: str, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the agents on a process snapshot and store the results"""
+        deadline = Deadline(Config.DEFAULT_TIMEOUT)
+        try:
+            # Periodic stream snapshots yield LLM capacity to interactive uploads
+            with request_priority(PRIORITY_BATCH), stream_insights(self._insight_publisher(task_id)), deadline.scope():
+                results = await self.pipeline.analyze_process_snapshot(snapshot, f"stream_{task_id}")
+            await deadline.run(self.db.analyses.update_one(
+                {"_id": ObjectId(task_id)},
+                {
+                    "$set": {
+                        "status": "completed",
+                        "partial": results.get("status") == "partial",
+                        "results": serialize_analysis_results(results),
+                        "completed_at": datetime.utcnow().isoformat(),
+                        "progress": 100
+                    }
+                }
+            ), grace=Config.DEADLINE_GRACE)
+            logger.info(f"Snapshot analysis completed for task: {task_id}")
+            return results
+
+        except Exception as e:
+            error_msg = "Analysis deadline exceeded" if isinstance(e, TimeoutError) else str(e)
+            logger.error(f"Snapshot analysis failed for task {task_id}: {error_msg}", exc_info=True)
+            await deadline.run(self.db.analyses.update_one(
+                {"_id": ObjectId(task_id)},
+                {
+                    "$set": {
+                        "status": "failed",
+                        "error": error_msg,
+                        "completed_at": datetime.utcnow().isoformat()
+                    }
+                }
+            ), grace=Config.DEADLINE_GRACE)
+            raise ProcessLensError(f"Snapshot analysis failed: {error_msg}")
+
     def _sanitize_data(self, data: Any) -> Any:
-        """Enhanced data sanitization for MongoDB storage"""
-        if isinstance(data, dict):
-            return {str(k): self._sanitize_data(v) for k, v in data.items()}
-        elif isinstance(data, list):
-            return [self._sanitize_data(item) for item in data]
-        elif isinstance(data, (datetime, pd.Timestamp)):
-            return data.isoformat()
-        elif isinstance(data, ObjectId):
-            return str(data)
-        elif pd.isna(data) or (isinstance(data, float) and pd.isna(data)):
-            return None
-        elif hasattr(data, 'to_dict'):  # Handle Pandas objects
-            return self._sanitize_data(data.to_dict())
-        elif hasattr(data, 'item'):  # Handle numpy types
-            return data.item()
-        return data
\ No newline at end of file
+        """Normalize data for MongoDB storage and JSON transport"""
+        return normalize(data)
\ No newline at end of file
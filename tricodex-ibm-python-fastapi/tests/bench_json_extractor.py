@@ -0,0 +1,107 @@
+"""
+Micro-benchmark: shared JSON extractor vs the previous model output parsers
+
+Run from the project root: python -m tests.bench_json_extractor
+"""
+import json
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.json_extractor import JSONExtractor, extract_json
+
+PAYLOAD = {
+    "insights": [
+        {"title": f"Insight {i}", "description": "Tickets in {queue} wait \"long\" before triage", "confidence": 0.8}
+        for i in range(20)
+    ],
+    "patterns": [{"name": "after-hours spike", "support": 0.12}],
+    "metrics": {"avg_resolution_hours": 31.5, "reopen_rate": 0.07},
+    "recommendations": ["Route P1 tickets directly", "Add weekend coverage"]
+}
+CLEAN = json.dumps(PAYLOAD, indent=2)
+
+CASES = {
+    "clean": CLEAN,
+    "fenced": f"```json\n{CLEAN}\n```",
+    "prose": f"Here is the analysis you asked for:\n\n{CLEAN}\n\nLet me know if you need more detail.",
+    "trailing_commas": CLEAN.replace('"Add weekend coverage"', '"Add weekend coverage",').replace("0.07", "0.07,"),
+    "truncated": CLEAN[:int(len(CLEAN) * 0.7)]
+}
+
+
+def previous_agent_parser(text):
+    """BaseAgent._validate_json before the shared extractor"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        sections = {}
+        current_section = None
+        current_items = []
+        for line in text.split("\n"):
+            if ":" in line and not line.strip().startswith("-"):
+                if current_section and current_items:
+                    sections[current_section] = current_items
+                current_section = line.split(":")[0].strip().lower()
+                current_items = []
+            elif line.strip().startswith("-"):
+                current_items.append(line.strip("- ").strip())
+        if current_section and current_items:
+            sections[current_section] = current_items
+        return sections
+
+
+def previous_helper_parser(text):
+    """helpers.validate_json_response before the shared extractor"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        for match in re.finditer(r'\{(?:[^{}]|(?R))*\}', text):
+            try:
+                return json.loads(match.group())
+            except json.JSONDecodeError:
+                continue
+        raise ValueError("Failed to extract valid JSON from response")
+
+
+def streamed(text, chunk_size=16):
+    """Incremental extraction fed in model-sized chunks"""
+    extractor = JSONExtractor(keys=("insights", "recommendations"))
+    for start in range(0, len(text), chunk_size):
+        extractor.feed(text[start:start + chunk_size])
+    return extractor.finish()
+
+
+def describe(result):
+    if isinstance(result, Exception):
+        return f"error ({type(result).__name__})"
+    if not result:
+        return "empty"
+    insights = result.get("insights")
+    return f"{len(insights)} insights" if isinstance(insights, list) else f"keys {sorted(result)[:3]}"
+
+
+def main(number=200):
+    parsers = {
+        "agent (old)": previous_agent_parser,
+        "helper (old)": previous_helper_parser,
+        "extract_json": extract_json,
+        "streamed": streamed
+    }
+    print(f"{'case':<16}{'parser':<14}{'us/call':>10}  result")
+    for case, text in CASES.items():
+        for name, parser in parsers.items():
+            try:
+                result = parser(text)
+            except Exception as e:
+                print(f"{case:<16}{name:<14}{'-':>10}  {describe(e)}")
+                continue
+            seconds = timeit.timeit(lambda: parser(text), number=number)
+            print(f"{case:<16}{name:<14}{seconds / number * 1e6:>10.1f}  {describe(result)}")
+
+
+if __name__ == "__main__":
+    main()
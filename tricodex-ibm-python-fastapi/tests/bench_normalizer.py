@@ -0,0 +1,135 @@
+"""
+Micro-benchmark: single-pass normalizer vs the previous per-boundary sanitizer walks
+
+Run from the project root: python -m tests.bench_normalizer
+"""
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.distributions import ArrayResult, Distribution, json_default
+from utils.normalizer import normalize
+from utils.serializer import MongoDBSerializer, serialize_analysis_results
+
+
+def previous_sanitize(data):
+    """AnalysisService._sanitize_data / BaseAgent._sanitize_data before the normalizer"""
+    if isinstance(data, ArrayResult):
+        return data.to_dict()
+    elif isinstance(data, dict):
+        return {str(k): previous_sanitize(v) for k, v in data.items()}
+    elif isinstance(data, list):
+        return [previous_sanitize(item) for item in data]
+    elif isinstance(data, (datetime, pd.Timestamp)):
+        return data.isoformat()
+    elif pd.isna(data) or (isinstance(data, float) and pd.isna(data)):
+        return None
+    elif hasattr(data, 'to_dict'):
+        return previous_sanitize(data.to_dict())
+    elif hasattr(data, 'item'):
+        return data.item()
+    return data
+
+
+def previous_serialize_for_mongodb(data):
+    """MongoDBSerializer.serialize_for_mongodb before the normalizer"""
+    if isinstance(data, ArrayResult):
+        return data.to_dict()
+    elif isinstance(data, dict):
+        return {MongoDBSerializer._serialize_key(k): previous_serialize_for_mongodb(v) for k, v in data.items()}
+    elif isinstance(data, (list, tuple)):
+        return [previous_serialize_for_mongodb(item) for item in data]
+    elif isinstance(data, (pd.Timestamp, datetime)):
+        return data.isoformat()
+    elif isinstance(data, (np.int64, np.int32)):
+        return int(data)
+    elif isinstance(data, (np.float64, np.float32)):
+        return float(data)
+    elif pd.isna(data):
+        return None
+    return data
+
+
+def make_results(records=20000, columns=40):
+    """Analysis result shaped like the pipeline output, with NumPy scalars throughout"""
+    rng = np.random.default_rng(7)
+    created = pd.Timestamp("2024-01-01")
+    rows = [
+        {
+            "ticket_id": np.int64(i),
+            "resolution_hours": np.float64(rng.exponential(20)) if i % 17 else np.nan,
+            "created": created + pd.Timedelta(minutes=int(i)),
+            "priority": ["P1", "P2", "P3"][i % 3],
+            "reopened": np.bool_(i % 11 == 0)
+        }
+        for i in range(records)
+    ]
+    field_stats = {
+        f"field_{c}": {
+            "mean": np.float64(rng.normal()),
+            "missing": np.int64(rng.integers(0, 100)),
+            "top_values": Distribution.from_series(pd.Series(rng.integers(0, 20, 500)))
+        }
+        for c in range(columns)
+    }
+    return {
+        "dataset_analysis": {"field_stats": field_stats, "warnings": [{"missing_rate": np.float64(0.2)}]},
+        "records": rows,
+        "insights": [{"title": f"Insight {i}", "confidence": np.float32(0.8)} for i in range(200)],
+        "timestamp": datetime.utcnow()
+    }
+
+
+def previous_boundaries(results):
+    """Walks one analysis paid before: debug log, storage twice, status twice"""
+    json.dumps(previous_sanitize(results), default=str)
+    stored = previous_sanitize(previous_serialize_for_mongodb(results))
+    status = previous_sanitize({"task_id": "x", "results": stored})
+    return json.loads(json.dumps(status, default=json_default))
+
+
+def current_boundaries(results):
+    """One walk to store, one to build the status response"""
+    stored = serialize_analysis_results(results)
+    return normalize({"task_id": "x", "results": stored})
+
+
+def best_of(fn, data, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        fn(data)
+        best = min(best, time.process_time() - start)
+    return best
+
+
+def main():
+    results = make_results()
+    print(f"{'path':<28}{'ms CPU':>10}")
+    timings = {
+        "previous walks": best_of(previous_boundaries, results),
+        "normalizer": best_of(current_boundaries, results),
+        "sanitize (previous)": best_of(previous_sanitize, results),
+        "normalize": best_of(normalize, results)
+    }
+    for name, seconds in timings.items():
+        print(f"{name:<28}{seconds * 1e3:>10.1f}")
+    saved = timings["previous walks"] - timings["normalizer"]
+    print(f"CPU saved per analysis: {saved * 1e3:.1f} ms ({saved / timings['previous walks']:.0%})")
+
+    # Whole frames convert a column at a time instead of value by value
+    frame = pd.DataFrame(results["records"])
+    # The old walks could not take a frame directly (pd.isna on it is ambiguous)
+    print(f"{'DataFrame to_dict walk':<28}{best_of(lambda df: previous_sanitize(df.to_dict()), frame) * 1e3:>10.1f}")
+    print(f"{'DataFrame normalize':<28}{best_of(normalize, frame) * 1e3:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Tests for the dataset analysis pipeline with stubbed model clients
+"""
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from components.agents import gemini_agent, watson_agent
+from components.agents.function_calling_agent import FunctionCallingAgent
+from components.agents.gemini_agent import GeminiAgent
+from components.agents.watson_agent import WatsonAgent
+from components.pipeline.analysis_pipeline import EnhancedAnalysisPipeline
+from utils.deadline import Deadline
+
+ANSWER = json.dumps({
+    "insights": ["Assignment is the main bottleneck"],
+    "patterns": [{"name": "rework", "type": "loop"}],
+    "metrics": {"cycle_time": {"value": 5.0, "unit": "hours"}},
+    "recommendations": ["Automate assignment"]
+})
+
+
+class RecordingClient:
+    """Model client that records prompts and answers from a script"""
+
+    def __init__(self, answer=ANSWER):
+        self.answer = answer
+        self.delay = 0.0
+        self.prompts = []
+
+    async def generate(self, prompt, model, params):
+        self.prompts.append(prompt)
+        await asyncio.sleep(self.delay)
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        return self.answer
+
+
+def _tickets(n=60):
+    rng = np.random.default_rng(0)
+    created = pd.Timestamp("2024-01-01") + pd.to_timedelta(np.arange(n) * 3, unit="h")
+    hours = rng.uniform(1, 10, n)
+    hours[5] = 400
+    return pd.DataFrame({
+        "case_id": np.repeat(np.arange(n // 3), 3),
+        "activity": ["Open", "Assign", "Close"] * (n // 3),
+        "timestamp": created,
+        "created_at": created,
+        "resolved_at": created + pd.to_timedelta(hours, unit="h"),
+        "priority": ["high", "low"] * (n // 2),
+        "subject": ["Cannot log in to my account, please help"] * n,
+        "cost": hours,
+    })
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    recorded = {"watson": RecordingClient(), "gemini": RecordingClient()}
+    monkeypatch.setattr(watson_agent, "get_watsonx_client", lambda config: recorded["watson"])
+    monkeypatch.setattr(gemini_agent, "get_gemini_client", lambda config: recorded["gemini"])
+    return recorded
+
+
+def _pipeline():
+    watson = WatsonAgent({"model_id": "granite"})
+    gemini = GeminiAgent({"api_key": "key"})
+    return EnhancedAnalysisPipeline({
+        "watson": watson,
+        "gemini": gemini,
+        "function": FunctionCallingAgent(watson, gemini)
+    })
+
+
+def test_dataset_analysis_calls_each_model_once(clients):
+    result = asyncio.run(_pipeline().analyze_dataset(_tickets(), "session"))
+
+    assert len(clients["watson"].prompts) == 1
+    assert len(clients["gemini"].prompts) == 1
+    assert result["status"] == "success"
+    assert result["watson_analysis"]["status"] == "success"
+    assert result["gemini_analysis"]["status"] == "success"
+    assert result["synthesis"]["status"] == "success"
+    assert result["data_quality"]["unique_values"]["priority"] == 2
+
+
+def test_agent_prompts_include_local_analyses(clients):
+    asyncio.run(_pipeline().analyze_dataset(_tickets(), "session"))
+
+    for name in ("watson", "gemini"):
+        prompt = clients[name].prompts[0]
+        assert "Process Mining Summary" in prompt
+        assert "Anomalies (flagged locally" in prompt
+        assert "SLA Metrics" in prompt
+        assert "created_at -> resolved_at" in prompt
+    assert "Language Profile (computed locally)" in clients["gemini"].prompts[0]
+
+
+def test_run_fails_when_no_agent_result_is_usable(clients):
+    for client in clients.values():
+        client.answer = ConnectionError("provider down")
+
+    result = asyncio.run(_pipeline().analyze_dataset(_tickets(), "session"))
+
+    assert result["synthesis"]["status"] == "skipped"
+    assert result["status"] == "error"
+    assert set(result["failed_stages"]) == {"watson_analysis", "gemini_analysis", "synthesis"}
+
+
+def test_run_is_partial_when_one_agent_fails(clients):
+    clients["gemini"].answer = ConnectionError("provider down")
+
+    result = asyncio.run(_pipeline().analyze_dataset(_tickets(), "session"))
+
+    assert result["synthesis"]["status"] == "success"
+    assert result["status"] == "partial"
+    assert result["failed_stages"] == ["gemini_analysis"]
+
+
+def _analyze_within(seconds):
+    async def run():
+        with Deadline(seconds).scope():
+            return await _pipeline().analyze_dataset(_tickets(), "session")
+    return asyncio.run(run())
+
+
+def test_failures_before_the_deadline_are_not_incomplete(clients):
+    clients["gemini"].answer = ConnectionError("provider down")
+
+    result = _analyze_within(60)
+
+    assert result["status"] == "partial"
+    assert "incomplete_stages" not in result
+    assert result["failed_stages"] == ["gemini_analysis"]
+
+
+def test_stages_cut_off_by_the_deadline_are_incomplete(clients):
+    for client in clients.values():
+        client.delay = 5
+
+    result = _analyze_within(0.5)
+
+    assert result["status"] == "partial"
+    assert result["data_quality"] is not None
+    assert result["incomplete_stages"] == ["watson_analysis", "gemini_analysis", "synthesis"]
+    assert result["synthesis"] is None
+    assert "failed_stages" not in result
@@ -0,0 +1,14 @@
+"""
+Tests for ticket duration columns
+"""
+from components.data_processing.anomalies import select_time_pair
+
+
+def test_first_response_never_starts_a_duration():
+    assert select_time_pair(["First Response Time", "Time to Resolution"]) == (None, "Time to Resolution")
+
+
+def test_opening_column_starts_a_duration():
+    columns = ["created_at", "first_response_at", "resolved_at"]
+
+    assert select_time_pair(columns) == ("created_at", "resolved_at")
@@ -0,0 +1,94 @@
+"""
+Tests for circuit breaker probing across half-open periods
+"""
+import pytest
+
+from components.agents import circuit_breaker
+from components.agents.circuit_breaker import CLOSED, HALF_OPEN, OPEN, BreakerSettings, CircuitBreaker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker, "time", clock)
+    return clock
+
+
+def _breaker():
+    return CircuitBreaker("test", BreakerSettings(min_calls=2, open_seconds=10, half_open_probes=2))
+
+
+def _call(breaker):
+    """Entered attempt context; finish it with _end"""
+    attempt = breaker.attempt()
+    attempt.__enter__()
+    return attempt
+
+
+def _end(attempt, error=None):
+    """Leave the attempt as a call that returned, or raised error"""
+    if error is None:
+        attempt.__exit__(None, None, None)
+    else:
+        # False: the error is not swallowed
+        assert attempt.__exit__(type(error), error, None) is False
+
+
+def _second_half_open_period(breaker, clock):
+    """Half-open again, with a probe from the first period still in flight"""
+    for _ in range(2):
+        _end(_call(breaker), ConnectionError("down"))
+    assert breaker.state == OPEN
+    clock.now += 10
+    assert breaker.state == HALF_OPEN
+
+    stale = _call(breaker)
+    _end(_call(breaker), ConnectionError("still down"))
+    assert breaker.state == OPEN
+    clock.now += 10
+    assert breaker.state == HALF_OPEN
+    return stale
+
+
+def test_failed_probe_from_earlier_period_is_ignored(clock):
+    breaker = _breaker()
+    stale = _second_half_open_period(breaker, clock)
+
+    _end(stale, ConnectionError("late failure"))
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.allows_calls
+
+
+def test_successful_probe_from_earlier_period_does_not_close(clock):
+    breaker = _breaker()
+    stale = _second_half_open_period(breaker, clock)
+
+    _end(_call(breaker))
+    _end(stale)
+    assert breaker.state == HALF_OPEN
+
+    _end(_call(breaker))
+    assert breaker.state == CLOSED
+
+
+def test_stale_probe_does_not_free_a_current_slot(clock):
+    breaker = _breaker()
+    stale = _second_half_open_period(breaker, clock)
+    current = [_call(breaker), _call(breaker)]
+    assert not breaker.allows_calls
+
+    _end(stale)
+
+    assert not breaker.allows_calls
+    for attempt in current:
+        _end(attempt)
+    assert breaker.state == CLOSED
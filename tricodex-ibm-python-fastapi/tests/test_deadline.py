@@ -0,0 +1,51 @@
+"""
+Tests for per-task deadlines
+"""
+import asyncio
+
+import pytest
+
+from utils.deadline import Deadline, current_deadline, within_deadline
+
+
+def test_deadline_expires_after_its_budget():
+    async def scenario():
+        deadline = Deadline(0.05)
+        assert not deadline.expired
+        assert 0 < deadline.remaining() <= 0.05
+        await asyncio.sleep(0.06)
+        assert deadline.expired
+        assert deadline.remaining() == 0.0
+
+    asyncio.run(scenario())
+
+
+def test_hung_call_is_cancelled_at_the_deadline():
+    async def scenario():
+        cancelled = asyncio.Event()
+
+        async def hung():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with Deadline(0.05).scope():
+            with pytest.raises(TimeoutError):
+                await within_deadline(hung())
+        assert cancelled.is_set()
+        assert current_deadline() is None
+
+    asyncio.run(scenario())
+
+
+def test_cap_bounds_a_call_before_the_deadline():
+    async def scenario():
+        with Deadline(10).scope() as deadline:
+            with pytest.raises(TimeoutError):
+                await within_deadline(asyncio.sleep(1), cap=0.05)
+            assert not deadline.expired
+            assert await within_deadline(asyncio.sleep(0, result="done"), cap=0.05) == "done"
+
+    asyncio.run(scenario())
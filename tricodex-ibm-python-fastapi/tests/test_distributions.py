@@ -0,0 +1,25 @@
+"""
+Tests for array-backed results
+"""
+import json
+
+import pytest
+
+from utils.distributions import ArrayResult, Distribution, json_default
+
+
+def test_array_result_requires_to_dict():
+    class Incomplete(ArrayResult):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_json_default_expands_distributions():
+    dist = Distribution.from_arrays(["a", "b"], [3, 1])
+
+    encoded = json.loads(json.dumps({"top": dist}, default=json_default))
+
+    assert encoded["top"]["keys"] == ["a", "b"]
+    assert encoded["top"]["counts"] == [3, 1]
@@ -0,0 +1,46 @@
+"""
+Tests for near-duplicate clustering
+"""
+import numpy as np
+import pandas as pd
+
+from components.data_processing.duplicates import NearDuplicateDetector
+
+
+def _chain_signatures(detector):
+    """Rows 0-1 and 1-2 clear the threshold, rows 0-2 do not"""
+    first = np.arange(detector.num_perm, dtype=np.uint32)
+    second = first.copy()
+    second[::6] += 1000
+    third = second.copy()
+    third[3::6] += 1000
+    return np.stack([first, second, third])
+
+
+def test_cluster_does_not_chain_through_intermediate_rows():
+    detector = NearDuplicateDetector(threshold=0.8)
+    signatures = _chain_signatures(detector)
+    similarity = detector.similarity(signatures, np.array([0, 1, 0]), np.array([1, 2, 2]))
+    assert (similarity[:2] >= 0.8).all() and similarity[2] < 0.8
+
+    labels = detector.cluster(signatures)
+
+    assert labels.tolist() == [0, 0, 2]
+
+
+def test_detect_reports_minimum_similarity_to_representative():
+    detector = NearDuplicateDetector(threshold=0.5)
+    df = pd.DataFrame({"subject": [
+        "Password reset link does not arrive in my inbox",
+        "Password reset link does not arrive in my inbox!",
+        "Password reset link does not arrive in my inbox today",
+        "Invoice for March is missing the VAT number",
+    ]})
+
+    report = detector.detect(df)
+
+    assert report.cluster_count == 1
+    cluster = report.clusters[0]
+    assert cluster["size"] == 3
+    assert cluster["representative_row"] == 0
+    assert 0.5 <= cluster["min_similarity"] <= cluster["mean_similarity"] <= 1.0
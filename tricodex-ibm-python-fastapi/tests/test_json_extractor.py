@@ -0,0 +1,40 @@
+"""
+Tests for extracting JSON objects from model output
+"""
+from utils.json_extractor import JSONExtractor, extract_json
+
+
+def test_fenced_object_with_trailing_comma():
+    text = 'Here you go:\n```json\n{"insights": ["a", "b"], "metrics": {"x": 1},}\n```\nThanks'
+
+    assert extract_json(text) == {"insights": ["a", "b"], "metrics": {"x": 1}}
+
+
+def test_truncated_object_is_closed():
+    text = '{"insights": ["slow queue", "rework"], "patterns": [{"name": "loop", "steps": ["a", "b'
+
+    assert extract_json(text) == {
+        "insights": ["slow queue", "rework"],
+        "patterns": [{"name": "loop", "steps": ["a", "b"]}]
+    }
+
+
+def test_nested_object_after_prose_braces():
+    text = 'Note {not json} then {"outer": {"inner": {"deep": [1, {"k": "v}"}]}}, "flag": True}'
+
+    assert extract_json(text) == {"outer": {"inner": {"deep": [1, {"k": "v}"}]}}, "flag": True}
+
+
+def test_array_elements_are_emitted_as_chunks_complete():
+    extractor = JSONExtractor(keys=["insights"])
+
+    events = []
+    for chunk in ['{"insi', 'ghts": ["one", "tw', 'o"], "x": 1}']:
+        events.extend(extractor.feed(chunk))
+
+    assert events == [("insights", "one"), ("insights", "two")]
+    assert extractor.finish() == {"insights": ["one", "two"], "x": 1}
+
+
+def test_text_without_object():
+    assert extract_json("The model declined to answer.") is None
@@ -0,0 +1,46 @@
+"""
+Tests for per-language ticket durations
+"""
+import pandas as pd
+
+from components.data_processing.language_profile import profile_languages
+from components.pipeline.analysis_pipeline import EnhancedAnalysisPipeline
+
+
+def _tickets():
+    return pd.DataFrame({
+        "language": ["en", "en", "de", "de"],
+        "subject": ["Cannot log in", "Printer is broken", "Drucker defekt", "Passwort vergessen"],
+        "created_at": pd.to_datetime(["2024-01-01 09:00", "2024-01-01 10:00", "2024-01-02 09:00", "2024-01-02 12:00"]),
+        "resolved_at": pd.to_datetime(["2024-01-01 10:00", "2024-01-01 13:00", "2024-01-02 11:00", "2024-01-02 08:00"]),
+    })
+
+
+def test_negative_durations_are_left_out_of_language_averages():
+    durations = pd.Series([3600.0, 10800.0, 7200.0, -14400.0])
+
+    profile = profile_languages(_tickets(), durations=durations, durations_label="hours")
+
+    assert profile["per_language"]["en"]["hours"] == {"mean": 7200.0, "median": 7200.0}
+    assert profile["per_language"]["de"]["hours"] == {"mean": 7200.0, "median": 7200.0}
+
+
+def test_pipeline_profiles_languages_with_ticket_durations():
+    pipeline = EnhancedAnalysisPipeline({"watson": object(), "gemini": object(), "function": object()})
+    df = _tickets()
+
+    analysis_input = pipeline._prepare_analysis_input(pipeline._preprocess_data(df), raw_data=df)
+
+    per_language = analysis_input["language_profile"]["per_language"]
+    assert per_language["en"]["created_at_to_resolved_at_seconds"]["mean"] == 7200.0
+    assert per_language["de"]["created_at_to_resolved_at_seconds"]["mean"] == 7200.0
+
+
+def test_language_distributions_are_array_results():
+    df = _tickets().assign(priority=["high", "low", "low", "low"])
+
+    profile = profile_languages(df)
+
+    assert profile["distribution"].as_mapping() == {"de": 0.5, "en": 0.5}
+    assert profile["per_language"]["en"]["priority"].as_mapping() == {"high": 0.5, "low": 0.5}
+    assert profile["per_language"]["de"]["priority"].to_dict()["keys"] == ["low"]
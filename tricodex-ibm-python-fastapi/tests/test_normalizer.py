@@ -0,0 +1,67 @@
+"""
+Tests for normalizing analysis data into JSON-safe values
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from utils.normalizer import normalize
+
+
+def test_missing_values_become_none():
+    data = {"a": pd.NaT, "b": np.datetime64("NaT"), "c": [pd.NaT, pd.NA, float("nan")],
+            "d": pd.Series([1.0, np.nan]), "e": np.array(["2024-01-01", "NaT"], dtype="datetime64[s]")}
+
+    assert normalize(data) == {
+        "a": None, "b": None, "c": [None, None, None],
+        "d": {"0": 1.0, "1": None}, "e": ["2024-01-01T00:00:00", None]
+    }
+
+
+def test_categoricals_keep_their_values():
+    data = {
+        "series": pd.Series(pd.Categorical(["x", None, "y"])),
+        "codes": pd.Categorical([1, None, 2]),
+        "index": pd.CategoricalIndex(["p", "q"])
+    }
+
+    assert normalize(data) == {
+        "series": {"0": "x", "1": None, "2": "y"},
+        "codes": [1, None, 2],
+        "index": ["p", "q"]
+    }
+
+
+def test_nested_numpy_values():
+    data = {
+        "matrix": np.array([[1, 2], [3, 4]]),
+        "objects": np.array([np.array([1.5, np.nan]), {"k": np.int64(3)}], dtype=object),
+        "deep": {"x": [np.float32(1.5), (np.bool_(True),)], 7: np.str_("label")}
+    }
+
+    normalized = normalize(data)
+
+    assert normalized == {
+        "matrix": [[1, 2], [3, 4]],
+        "objects": [[1.5, None], {"k": 3}],
+        "deep": {"x": [1.5, [True]], "7": "label"}
+    }
+    json.dumps(normalized)
+
+
+def test_sub_second_timestamps_match_isoformat():
+    stamps = pd.Series(pd.to_datetime(
+        ["2024-01-01 10:00:00", "2024-01-01 10:00:00.250", "2024-01-01 10:00:00.000000123", None],
+        format="ISO8601"
+    ))
+
+    assert normalize(stamps) == {
+        "0": "2024-01-01T10:00:00",
+        "1": "2024-01-01T10:00:00.250000",
+        "2": "2024-01-01T10:00:00.000000123",
+        "3": None
+    }
+    assert list(normalize(stamps).values())[:3] == [stamp.isoformat() for stamp in stamps[:3]]
+    assert normalize(pd.Timestamp("2024-01-01 10:00:00.5")) == "2024-01-01T10:00:00.500000"
+    assert normalize(np.datetime64("2024-01-01T10:00:00.000001")) == "2024-01-01T10:00:00.000001"
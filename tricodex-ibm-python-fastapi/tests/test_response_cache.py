@@ -0,0 +1,92 @@
+"""
+Tests for committing cached LLM responses only after validation
+"""
+import asyncio
+import json
+
+import pytest
+
+from config import Config
+from components.agents import response_cache
+from components.agents.base_agent import BaseAgent
+from components.agents.clients import LLMClient
+from components.agents.response_cache import ResponseCache, response_key
+
+USABLE = json.dumps({"insights": ["Triage queue is the bottleneck"], "patterns": [], "metrics": {}})
+
+
+class ScriptedClient(LLMClient):
+    """Client that answers every prompt with a fixed text"""
+
+    provider = "scripted"
+
+    def __init__(self, answer):
+        super().__init__("http://localhost", max_concurrency=2, timeout=5)
+        self.answer = answer
+        self.calls = 0
+
+    async def _generate(self, prompt, model, params):
+        self.calls += 1
+        return self.answer
+
+    async def _stream(self, prompt, model, params):
+        yield await self._generate(prompt, model, params)
+
+
+class PromptAgent(BaseAgent):
+    """Agent that sends its prompt and structures the parsed answer"""
+
+    name = "prompt"
+
+    def __init__(self, client, structured=True):
+        super().__init__(timeout=5)
+        self.client = client
+        self.structured = structured
+
+    async def _run_analysis(self, data):
+        text = await self._complete(self.client, data["metadata"]["prompt"], "model", {})
+        if not self.structured:
+            return {"status": "error", "error": "unexpected answer"}
+        return self._structure_output(self._validate_json(text))
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ResponseCache(path=None)
+    monkeypatch.setattr(Config, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(response_cache, "_cache", cache)
+    return cache
+
+
+def _analyze(agent, prompt):
+    return asyncio.run(agent.analyze({"metadata": {"prompt": prompt}, "metrics": {}}))
+
+
+def _cached(cache, prompt):
+    return asyncio.run(cache.get(response_key(ScriptedClient.provider, "model", {}, prompt)))
+
+
+def test_validated_answer_is_committed(cache):
+    result = _analyze(PromptAgent(ScriptedClient(USABLE)), "usable")
+
+    assert result["status"] == "success"
+    assert _cached(cache, "usable") == USABLE
+
+
+def test_answer_without_findings_is_not_committed(cache):
+    result = _analyze(PromptAgent(ScriptedClient("{}")), "empty")
+
+    assert result["status"] == "success"
+    assert _cached(cache, "empty") is None
+
+
+def test_answer_failing_output_validation_is_not_committed(cache):
+    client = ScriptedClient(USABLE)
+
+    result = _analyze(PromptAgent(client, structured=False), "invalid")
+
+    assert result["status"] == "error"
+    assert _cached(cache, "invalid") is None
+    # The retry reaches the provider again instead of replaying the bad answer
+    _analyze(PromptAgent(client, structured=False), "invalid")
+    assert client.calls == 2
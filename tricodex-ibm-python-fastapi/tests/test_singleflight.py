@@ -0,0 +1,125 @@
+"""
+Tests for single-flight coalescing and cancellation
+"""
+import asyncio
+
+import pytest
+
+from config import Config
+from components.agents import clients
+from components.agents.clients import LLMClient
+from components.agents.response_cache import response_key
+from utils.singleflight import SingleFlight
+
+
+def test_cancelled_waiter_does_not_cancel_shared_flight():
+    async def scenario():
+        flights = SingleFlight()
+        release = asyncio.Event()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await release.wait()
+            return "answer"
+
+        first = asyncio.ensure_future(flights.do("key", fetch))
+        second = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await second == "answer"
+        assert first.cancelled()
+        assert len(calls) == 1
+        assert flights.stats() == {"in_flight": 0, "executions": 1, "coalesced": 1}
+
+    asyncio.run(scenario())
+
+
+def test_last_cancelled_waiter_cancels_the_flight():
+    async def scenario():
+        flights = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def fetch():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        caller = asyncio.ensure_future(flights.do("key", fetch))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        await asyncio.sleep(0)
+
+        assert flights.in_flight("key") is None
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_a_led_flight_to_its_leader():
+    async def scenario():
+        flights = SingleFlight()
+        future = flights.lead("key")
+        follower = asyncio.ensure_future(flights.wait(future))
+        await asyncio.sleep(0)
+        follower.cancel()
+        await asyncio.sleep(0)
+
+        assert not future.done()
+        future.set_result("answer")
+        assert await flights.wait(future) == "answer"
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def no_response_cache(monkeypatch):
+    monkeypatch.setattr(Config, "LLM_CACHE_ENABLED", False)
+
+
+class ScriptedClient(LLMClient):
+    """Client whose stream yields a fixed sequence of chunks"""
+
+    provider = "scripted"
+
+    def __init__(self, chunks):
+        super().__init__("http://localhost", max_concurrency=2, timeout=5)
+        self.chunks = chunks
+        self.streams = 0
+
+    async def _generate(self, prompt, model, params):
+        return "".join(self.chunks)
+
+    async def _stream(self, prompt, model, params):
+        self.streams += 1
+        for chunk in self.chunks:
+            await asyncio.sleep(0.01)
+            yield chunk
+
+
+def test_stream_follower_gets_the_full_text_when_the_leader_stops_early(no_response_cache):
+    async def scenario():
+        client = ScriptedClient(["Bottle", "neck ", "at ", "triage"])
+        leader = client.stream("prompt", "model")
+        assert await leader.__anext__() == "Bottle"
+
+        follower = asyncio.ensure_future(_collect(client.stream("prompt", "model")))
+        flight = clients._prompt_flights.in_flight(response_key(client.provider, "model", {}, "prompt"))
+        while not clients._prompt_flights.waiters(flight):
+            await asyncio.sleep(0)
+        # A losing hedge or a disconnect ends the leader's stream early
+        await leader.aclose()
+
+        assert await asyncio.wait_for(follower, 1) == ["Bottleneck at triage"]
+        assert client.streams == 1
+
+    asyncio.run(scenario())
+
+
+async def _collect(chunks):
+    return [chunk async for chunk in chunks]
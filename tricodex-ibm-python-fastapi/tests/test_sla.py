@@ -0,0 +1,51 @@
+"""
+Tests for the SLA interval basis
+"""
+import pandas as pd
+
+from components.data_processing.sla import SLAEngine
+
+
+def _times(values):
+    return pd.to_datetime(values)
+
+
+def test_resolution_is_not_measured_from_first_response():
+    df = pd.DataFrame({
+        "Ticket Priority": ["High"] * 6,
+        "First Response Time": _times(["2024-01-01 10:00"] * 6),
+        "Time to Resolution": _times(["2024-01-01 12:00"] * 6),
+    })
+
+    result = SLAEngine().analyze(df)
+
+    assert result is None
+
+
+def test_resolution_falls_back_to_an_explicit_duration_column():
+    df = pd.DataFrame({
+        "Ticket Priority": ["High"] * 6,
+        "First Response Time": _times(["2024-01-01 10:00"] * 6),
+        "Time to Resolution": _times(["2024-01-01 12:00"] * 6),
+        "Resolution Hours": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+    })
+
+    result = SLAEngine().analyze(df)
+
+    assert result["basis"]["resolution"] == "Resolution Hours"
+    assert result["basis"]["response"] is None
+    assert result["groups"]["overall"][0]["resolution_hours"]["p50"] == 3.5
+
+
+def test_resolution_is_measured_from_creation():
+    df = pd.DataFrame({
+        "created_at": _times(["2024-01-01 08:00"] * 6),
+        "first_response_at": _times(["2024-01-01 10:00"] * 6),
+        "resolved_at": _times(["2024-01-01 12:00"] * 6),
+    })
+
+    result = SLAEngine().analyze(df)
+
+    assert result["basis"]["resolution"] == "created_at -> resolved_at"
+    assert result["groups"]["overall"][0]["resolution_hours"]["p50"] == 4.0
+    assert result["groups"]["overall"][0]["response_hours"]["p50"] == 2.0
@@ -0,0 +1,68 @@
+"""
+Per-task deadlines shared by the pipeline, agents and storage calls
+"""
+from typing import Awaitable, Optional, TypeVar
+from contextlib import contextmanager
+from contextvars import ContextVar
+import asyncio
+import time
+
+T = TypeVar('T')
+
+
+class Deadline:
+    """Absolute point in time by which a task must finish
+
+    Each await made under the deadline is bounded by ``asyncio.timeout``
+    with the remaining budget, so a hung call is cancelled (not orphaned)
+    when the budget runs out and raises ``TimeoutError``.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, cap: Optional[float] = None, grace: float = 0.0) -> asyncio.Timeout:
+        """asyncio.timeout for the remaining budget, optionally capped or extended by a grace period"""
+        budget = self.remaining() + grace
+        return asyncio.timeout(budget if cap is None else min(budget, cap))
+
+    async def run(self, awaitable: Awaitable[T], grace: float = 0.0) -> T:
+        """Await within the remaining budget"""
+        async with self.timeout(grace=grace):
+            return await awaitable
+
+    @contextmanager
+    def scope(self):
+        """Make this the deadline of everything awaited inside the block"""
+        token = _deadline.set(self)
+        try:
+            yield self
+        finally:
+            _deadline.reset(token)
+
+
+_deadline: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _deadline.get()
+
+
+async def within_deadline(awaitable: Awaitable[T], cap: Optional[float] = None) -> T:
+    """Await bounded by the current deadline and the optional cap in seconds"""
+    deadline = current_deadline()
+    if deadline is not None:
+        async with deadline.timeout(cap=cap):
+            return await awaitable
+    if cap is not None:
+        async with asyncio.timeout(cap):
+            return await awaitable
+    return await awaitable
@@ -0,0 +1,189 @@
+"""
+Array-backed distributions, histograms and contingency tables
+"""
+from typing import Dict, Any, List, Optional, Sequence
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+
+def _keys_to_list(keys: np.ndarray) -> List[Any]:
+    """JSON-safe key list in one conversion per dtype"""
+    if keys.dtype.kind == "M":
+        return np.datetime_as_string(keys, unit="s").tolist()
+    if keys.dtype.kind == "m":
+        return (keys / np.timedelta64(1, "s")).tolist()
+    if keys.dtype.kind in "biuf":
+        return keys.tolist()
+    return [key if isinstance(key, (str, int, float, bool)) else str(key) for key in keys.tolist()]
+
+
+def _key_array(index: Sequence[Any]) -> np.ndarray:
+    if isinstance(index, pd.Index) and isinstance(index, pd.CategoricalIndex):
+        index = index.astype(index.categories.dtype)
+    return np.asarray(index)
+
+
+def _factorize(series: pd.Series):
+    """Codes with sorted uniques, falling back to appearance order for unorderable mixes"""
+    try:
+        return pd.factorize(series, sort=True)
+    except TypeError:
+        return pd.factorize(series)
+
+
+class ArrayResult(ABC):
+    """Base class for results stored as arrays and converted once at the boundary"""
+
+    @abstractmethod
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-safe representation"""
+        pass
+
+
+@dataclass(frozen=True)
+class Distribution(ArrayResult):
+    """Value counts as parallel key and count arrays, most frequent first"""
+    keys: np.ndarray
+    counts: np.ndarray
+    total: float
+    normalized: bool = False
+
+    @classmethod
+    def from_series(cls, series: pd.Series, normalize: bool = False, by_key: bool = False) -> 'Distribution':
+        """Counts of a series, most frequent first or ordered by key"""
+        counts = series.value_counts()
+        if by_key:
+            counts = counts.sort_index()
+        return cls.from_counts(counts, normalize=normalize)
+
+    @classmethod
+    def from_counts(cls, counts: pd.Series, normalize: bool = False) -> 'Distribution':
+        """From a value_counts() result; zero counts of unused categories are dropped"""
+        counts = counts[counts > 0]
+        dist = cls(_key_array(counts.index), counts.to_numpy(), float(counts.sum()))
+        return dist.normalize() if normalize else dist
+
+    @classmethod
+    def from_arrays(cls, keys: Sequence[Any], counts: Sequence[float], total: Optional[float] = None) -> 'Distribution':
+        counts = np.asarray(counts)
+        return cls(np.asarray(keys), counts, float(counts.sum()) if total is None else float(total))
+
+    def __len__(self) -> int:
+        return int(len(self.keys))
+
+    def head(self, k: int) -> 'Distribution':
+        return Distribution(self.keys[:k], self.counts[:k], self.total, self.normalized)
+
+    def normalize(self) -> 'Distribution':
+        """Shares of the total, like value_counts(normalize=True)"""
+        if self.normalized:
+            return self
+        shares = self.counts / self.total if self.total else self.counts.astype(np.float64)
+        return Distribution(self.keys, shares, self.total, True)
+
+    def as_mapping(self) -> Dict[Any, Any]:
+        """Plain key -> count dict, for callers that need lookups"""
+        return dict(zip(self.keys.tolist(), self.counts.tolist()))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "type": "distribution",
+            "dtype": str(self.keys.dtype),
+            "keys": _keys_to_list(self.keys),
+            "counts": self.counts.tolist(),
+            "total": self.total,
+            "normalized": self.normalized
+        }
+
+
+@dataclass(frozen=True)
+class Histogram(ArrayResult):
+    """Counts over contiguous bins"""
+    edges: np.ndarray
+    counts: np.ndarray
+
+    @classmethod
+    def from_values(cls, values: Any, bins: Any = 20) -> 'Histogram':
+        values = np.asarray(values, dtype=np.float64)
+        counts, edges = np.histogram(values[~np.isnan(values)], bins=bins)
+        return cls(edges, counts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "type": "histogram",
+            "edges": self.edges.tolist(),
+            "counts": self.counts.tolist()
+        }
+
+
+@dataclass(frozen=True)
+class Contingency(ArrayResult):
+    """Joint counts (or shares) of two categorical variables as a dense matrix"""
+    rows: np.ndarray
+    columns: np.ndarray
+    values: np.ndarray
+    normalize: Optional[str] = None
+
+    @classmethod
+    def from_codes(cls, row_codes: np.ndarray, row_keys: Sequence[Any],
+                   col_codes: np.ndarray, col_keys: Sequence[Any], normalize: Optional[str] = None) -> 'Contingency':
+        """From integer codes (-1 for missing); empty rows and columns are dropped like crosstab"""
+        n_rows, n_cols = len(row_keys), len(col_keys)
+        valid = (row_codes >= 0) & (col_codes >= 0)
+        joint = np.bincount(
+            row_codes[valid].astype(np.int64) * n_cols + col_codes[valid],
+            minlength=n_rows * n_cols
+        ).reshape(n_rows, n_cols)
+        keep_rows, keep_cols = joint.any(axis=1), joint.any(axis=0)
+        joint = joint[keep_rows][:, keep_cols]
+        table = cls(_key_array(row_keys)[keep_rows], _key_array(col_keys)[keep_cols], joint)
+        return table.normalized(normalize) if normalize else table
+
+    @classmethod
+    def from_series(cls, rows: pd.Series, columns: pd.Series, normalize: Optional[str] = None) -> 'Contingency':
+        row_codes, row_keys = _factorize(rows)
+        col_codes, col_keys = _factorize(columns)
+        return cls.from_codes(row_codes, row_keys, col_codes, col_keys, normalize)
+
+    def normalized(self, how: str = "all") -> 'Contingency':
+        """Shares over the whole table, each row ('index') or each column ('columns')"""
+        values = self.values.astype(np.float64)
+        if how == "all":
+            values = values / max(values.sum(), 1)
+        elif how == "index":
+            values = values / np.maximum(values.sum(axis=1, keepdims=True), 1)
+        elif how == "columns":
+            values = values / np.maximum(values.sum(axis=0, keepdims=True), 1)
+        else:
+            raise ValueError(f"Unknown normalization: {how}")
+        return Contingency(self.rows, self.columns, values, how)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.values, index=self.rows, columns=self.columns)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Dense nested values, or (row, column, value) triplets when mostly empty"""
+        table = {
+            "type": "contingency",
+            "rows": _keys_to_list(self.rows),
+            "columns": _keys_to_list(self.columns),
+            "normalize": self.normalize
+        }
+        row_idx, col_idx = np.nonzero(self.values)
+        if len(row_idx) * 3 < self.values.size:
+            # Near-unique column pairs would otherwise expand to millions of zeros
+            table["format"] = "sparse"
+            table["cells"] = [row_idx.tolist(), col_idx.tolist(), self.values[row_idx, col_idx].tolist()]
+        else:
+            table["format"] = "dense"
+            table["values"] = self.values.tolist()
+        return table
+
+
+def json_default(value: Any) -> Any:
+    """json.dumps default that expands array results and stringifies the rest"""
+    if isinstance(value, ArrayResult):
+        return value.to_dict()
+    return str(value)
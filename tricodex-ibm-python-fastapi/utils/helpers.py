@@ -4,6 +4,7 @@ Common utilities for ProcessLens
 from typing import Dict, Any, Optional, TypeVar, Callable
 from functools import wraps
 import asyncio
+import hashlib
 import traceback
 import logging
 import json
@@ -11,6 +12,8 @@ from datetime import datetime
 import pandas as pd
 import io
 import csv
+from .normalizer import normalize
+from .json_extractor import extract_json
 
 logger = logging.getLogger(__name__)
 
@@ -67,27 +70,21 @@ def async_retry(
         return wrapper
     return decorator
 
+def dataframe_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a DataFrame's values, index, columns and dtypes"""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    digest.update(json.dumps([list(map(str, df.columns)), list(map(str, df.dtypes))]).encode("utf-8"))
+    return digest.hexdigest()
+
 def validate_json_response(response: str) -> Dict[str, Any]:
     """Validate and extract JSON from model response"""
-    try:
-        # Try direct JSON parsing first
-        return json.loads(response)
-    except json.JSONDecodeError:
-        # Attempt to extract JSON from text
-        import re
-        json_pattern = r'\{(?:[^{}]|(?R))*\}'
-        matches = re.finditer(json_pattern, response)
-        
-        for match in matches:
-            try:
-                return json.loads(match.group())
-            except json.JSONDecodeError:
-                continue
-                
+    parsed = extract_json(response)
+    if parsed is None:
         raise ValidationError(
             "Failed to extract valid JSON from response",
-            {"response": response}
+            {"response": response[:500]}
         )
+    return parsed
 
 def format_error_response(error: Exception) -> Dict[str, Any]:
     """Format exception for API response"""
@@ -112,19 +109,7 @@ def format_error_response(error: Exception) -> Dict[str, Any]:
 
 def sanitize_data(data: Dict[str, Any]) -> Dict[str, Any]:
     """Sanitize data for safe storage and transmission"""
-    def _sanitize_value(value: Any) -> Any:
-        if isinstance(value, (str, int, float, bool, type(None))):
-            return value
-        elif isinstance(value, (list, tuple)):
-            return [_sanitize_value(v) for v in value]
-        elif isinstance(value, dict):
-            return {str(k): _sanitize_value(v) for k, v in value.items()}
-        elif isinstance(value, datetime):
-            return value.isoformat()
-        else:
-            return str(value)
-            
-    return {str(k): _sanitize_value(v) for k, v in data.items()}
+    return normalize(data, default=str)
 
 def validate_file_content(content: bytes, filename: str) -> None:
     """
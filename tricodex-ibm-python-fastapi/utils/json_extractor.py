@@ -0,0 +1,230 @@
+"""
+Single-pass, incremental extraction of JSON objects from model output
+"""
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+# Strings are matched first so nothing inside them is rewritten
+_REPAIRS = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|,\s*(?=[}\]])|//[^\n]*|/\*.*?\*/|\b(?:True|False|None)\b', re.S)
+# A complete string, a structural character, a bare number or literal, or an unterminated string
+_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\],:]|[^\s"{}\[\],:]+|"')
+
+
+def _loads(text: str) -> Any:
+    # strict=False accepts raw newlines and tabs inside strings
+    return json.loads(text, strict=False)
+
+
+def _repair_token(match: "re.Match") -> str:
+    token = match.group()
+    if token[0] == '"':
+        return token
+    if token[0] in ",/":
+        return ""
+    return _LITERALS[token]
+
+
+def repair_json(text: str) -> str:
+    """Drop trailing commas and comments, and map Python literals, outside strings"""
+    return _REPAIRS.sub(_repair_token, text)
+
+
+class _Frame:
+    __slots__ = ("kind", "key", "start", "expect_key", "last_comma")
+
+    def __init__(self, kind: str, key: Optional[str], start: int):
+        self.kind = kind
+        self.key = key
+        self.start = start
+        self.expect_key = kind == "{"
+        self.last_comma: Optional[int] = None
+
+
+class JSONExtractor:
+    """Find the outermost JSON object in text that may arrive in chunks
+
+    A brace and string state machine walks the text once, a token at a
+    time, skipping prose and markdown fences around the object. Complete candidates are
+    parsed directly, then after repair (trailing commas, comments, Python
+    literals); ``finish`` also closes objects cut off mid-stream. Elements
+    of arrays stored under ``keys`` are returned from ``feed`` as soon as
+    each one closes.
+    """
+
+    def __init__(self, keys: Iterable[str] = ()):
+        self.keys = set(keys)
+        self._text = ""
+        self._pos = 0
+        self._stack: List[_Frame] = []
+        self._first_candidate: Optional[int] = None
+        self.value: Optional[Dict[str, Any]] = None
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """(array key, element) pairs completed by this chunk"""
+        if self.done:
+            return []
+        self._text += chunk
+        text, events = self._text, []
+        pos, end = self._pos, len(text)
+        while pos < end:
+            if not self._stack:
+                # Outside a candidate only an opening brace matters
+                start = text.find("{", pos)
+                if start < 0:
+                    pos = end
+                    break
+                self._stack.append(_Frame("{", None, start))
+                if self._first_candidate is None:
+                    self._first_candidate = start
+                pos = start + 1
+                continue
+
+            match = _TOKEN.search(text, pos)
+            if match is None:
+                pos = end
+                break
+            token, first = match.group(), match.group()[0]
+            if first == '"':
+                if len(token) == 1:
+                    # Unterminated string: resume here when more text arrives
+                    pos = match.start()
+                    break
+                frame = self._stack[-1]
+                if frame.kind == "{" and frame.expect_key:
+                    frame.key = token[1:-1] if "\\" not in token else _loads(token)
+                else:
+                    self._value_closed(match.start(), match.end(), events)
+            elif first in "{[":
+                self._stack.append(_Frame(first, self._child_key(), match.start()))
+            elif first in "}]":
+                frame = self._stack.pop()
+                if not self._stack:
+                    if self._complete(text[frame.start:match.end()]):
+                        self._pos = match.end()
+                        return events
+                else:
+                    self._value_closed(frame.start, match.end(), events)
+            elif first == ",":
+                frame = self._stack[-1]
+                frame.last_comma = match.start()
+                if frame.kind == "{":
+                    frame.expect_key = True
+            elif first == ":":
+                self._stack[-1].expect_key = False
+            elif match.end() == end:
+                # A number or literal may continue in the next chunk
+                pos = match.start()
+                break
+            else:
+                self._value_closed(match.start(), match.end(), events)
+            pos = match.end()
+        self._pos = pos
+        return events
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        """The extracted object, closing a truncated one if the text ended inside it"""
+        if self.done:
+            return self.value
+        if self._stack and self._close_truncated():
+            return self.value
+        if self._first_candidate is not None:
+            self._decode_from(self._first_candidate + 1)
+        return self.value
+
+    def _complete(self, candidate: str) -> bool:
+        for attempt in (candidate, repair_json(candidate)):
+            try:
+                value = _loads(attempt)
+            except ValueError:
+                continue
+            if isinstance(value, dict):
+                self.value, self.done = value, True
+                return True
+        return False
+
+    def _close_truncated(self) -> bool:
+        """Close the open strings and containers, dropping a partial last member if needed"""
+        start = self._stack[0].start
+        in_string = self._text.startswith('"', self._pos)
+        body = self._text[start:] + ('"' if in_string else "")
+        closers = "".join(_CLOSERS[frame.kind] for frame in reversed(self._stack))
+        if self._complete(body + closers):
+            return True
+        # Cut back to the last comma of the innermost container that has one
+        for depth in range(len(self._stack) - 1, -1, -1):
+            comma = self._stack[depth].last_comma
+            if comma is not None:
+                closers = "".join(_CLOSERS[frame.kind] for frame in reversed(self._stack[:depth + 1]))
+                if self._complete(self._text[start:comma] + closers):
+                    return True
+        return False
+
+    def _decode_from(self, offset: int) -> None:
+        """Fallback when braces in prose unbalanced the scan: try each later '{'"""
+        decoder = json.JSONDecoder(strict=False)
+        position = self._text.find("{", offset)
+        while position >= 0:
+            try:
+                value, _ = decoder.raw_decode(self._text, position)
+                if isinstance(value, dict):
+                    self.value, self.done = value, True
+                    return
+            except ValueError:
+                pass
+            position = self._text.find("{", position + 1)
+
+    def _child_key(self) -> Optional[str]:
+        frame = self._stack[-1]
+        return frame.key if frame.kind == "{" else None
+
+    def _value_closed(self, start: int, end: int, events: List[Tuple[str, Any]]) -> None:
+        parent = self._stack[-1]
+        if parent.kind == "[" and parent.key in self.keys:
+            element = self._text[start:end]
+            for attempt in (element, repair_json(element)):
+                try:
+                    events.append((parent.key, _loads(attempt)))
+                    break
+                except ValueError:
+                    continue
+            else:
+                logger.debug(f"Skipping malformed streamed {parent.key} element")
+
+
+def extract_json(text: str) -> Optional[Dict[str, Any]]:
+    """Outermost JSON object in model output, repaired if needed; None if there is none"""
+    if text.lstrip().startswith("{"):
+        # Well-formed output needs no scan
+        try:
+            value = _loads(text)
+            if isinstance(value, dict):
+                return value
+        except ValueError:
+            pass
+    start = text.find("{")
+    if start < 0:
+        return None
+    decoder = json.JSONDecoder(strict=False)
+    # Fenced or prose-wrapped output decodes in place
+    try:
+        value, _ = decoder.raw_decode(text, start)
+        if isinstance(value, dict):
+            return value
+    except ValueError:
+        pass
+    try:
+        value, _ = decoder.raw_decode(repair_json(text[start:]))
+        if isinstance(value, dict):
+            return value
+    except ValueError:
+        pass
+    extractor = JSONExtractor()
+    extractor.feed(text)
+    return extractor.finish()
@@ -0,0 +1,213 @@
+"""
+Single-pass normalization of analysis data into JSON and MongoDB safe values
+"""
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+from .distributions import ArrayResult
+
+KeyFn = Callable[[Any], str]
+# A container still to be filled: the empty target and the source items
+Pending = Tuple[Any, Any]
+
+_PASSTHROUGH = frozenset({str, int, bool, type(None)})
+
+
+def _isoformat(values: np.ndarray) -> np.ndarray:
+    """Object array of strings as Timestamp.isoformat() gives them
+
+    Whole seconds print without a fraction, others with microseconds, or
+    nanoseconds when those are set.
+    """
+    values = values.astype("datetime64[ns]")
+    converted = np.datetime_as_string(values, unit="s").astype(object)
+    fraction = values.view(np.int64) % 1_000_000_000
+    for unit, mask in (("us", (fraction != 0) & (fraction % 1000 == 0)), ("ns", fraction % 1000 != 0)):
+        if mask.any():
+            converted[mask] = np.datetime_as_string(values[mask], unit=unit)
+    return converted
+
+
+def array_to_list(values: np.ndarray) -> Optional[List[Any]]:
+    """JSON-safe nested list in one conversion per dtype; None for object arrays"""
+    kind = values.dtype.kind
+    if kind == "f":
+        missing = np.isnan(values)
+        if missing.any():
+            values = values.astype(object)
+            values[missing] = None
+        return values.tolist()
+    if kind in "Mm":
+        missing = np.isnat(values)
+        if kind == "M":
+            converted = _isoformat(values)
+        else:
+            converted = (values / np.timedelta64(1, "s")).astype(object)
+        if missing.any():
+            converted[missing] = None
+        return converted.tolist()
+    if kind == "O":
+        return None
+    return values.tolist()
+
+
+def _float(value: float, key: KeyFn) -> Tuple[Any, None]:
+    return (None if value != value else float(value)), None
+
+
+def _timestamp(value: datetime, key: KeyFn) -> Tuple[Any, None]:
+    return (None if value is pd.NaT else value.isoformat()), None
+
+
+def _datetime64(value: np.datetime64, key: KeyFn) -> Tuple[Any, None]:
+    return (None if np.isnat(value) else pd.Timestamp(value).isoformat()), None
+
+
+def _missing(value: Any, key: KeyFn) -> Tuple[None, None]:
+    return None, None
+
+
+def _mapping(value: Dict[Any, Any], key: KeyFn) -> Tuple[Dict[str, Any], Pending]:
+    target: Dict[str, Any] = {}
+    return target, (target, value.items())
+
+
+def _sequence(value: Any, key: KeyFn) -> Tuple[List[Any], Pending]:
+    target: List[Any] = []
+    return target, (target, value)
+
+
+def _array(value: np.ndarray, key: KeyFn) -> Tuple[List[Any], Optional[Pending]]:
+    converted = array_to_list(value)
+    if converted is None:
+        return _sequence(value.tolist(), key)
+    return converted, None
+
+
+def _index(value: pd.Index, key: KeyFn) -> Tuple[List[Any], Optional[Pending]]:
+    if isinstance(value.dtype, pd.CategoricalDtype):
+        return _sequence(value.tolist(), key)
+    return _array(value.to_numpy(), key)
+
+
+def _series(value: pd.Series, key: KeyFn) -> Tuple[Dict[str, Any], Optional[Pending]]:
+    """Index to value mapping, as Series.to_dict() would give"""
+    labels = value.index.tolist()
+    if isinstance(value.dtype, pd.CategoricalDtype):
+        # Category values as they are; to_numpy() would upcast integers with missing entries to float
+        return _mapping(dict(zip(labels, value.tolist())), key)
+    converted = array_to_list(value.to_numpy())
+    if converted is None:
+        return _mapping(dict(zip(labels, value.tolist())), key)
+    return {label if type(label) is str else key(label): item for label, item in zip(labels, converted)}, None
+
+
+def _categorical(value: pd.Categorical, key: KeyFn) -> Tuple[List[Any], Pending]:
+    return _sequence(value.tolist(), key)
+
+
+def _frame(value: pd.DataFrame, key: KeyFn) -> Tuple[Dict[str, Any], Pending]:
+    """Column to series mapping, as DataFrame.to_dict() would give"""
+    return _mapping(dict(value.items()), key)
+
+
+def _array_result(value: ArrayResult, key: KeyFn) -> Tuple[Dict[str, Any], None]:
+    # Arrays convert in one step and carry no keys to mangle
+    return value.to_dict(), None
+
+
+_HANDLERS: Dict[type, Callable[[Any, KeyFn], Tuple[Any, Optional[Pending]]]] = {
+    float: _float,
+    dict: _mapping,
+    list: _sequence,
+    tuple: _sequence,
+    pd.Series: _series,
+    pd.DataFrame: _frame,
+    np.ndarray: _array,
+    type(pd.NaT): _missing,
+    type(pd.NA): _missing,
+}
+
+# Checked in order for types without an exact entry; the match is cached per type
+_FALLBACKS = (
+    (ArrayResult, _array_result),
+    (np.bool_, lambda value, key: (bool(value), None)),
+    (np.integer, lambda value, key: (int(value), None)),
+    (np.floating, _float),
+    (np.datetime64, _datetime64),
+    (np.str_, lambda value, key: (str(value), None)),
+    (datetime, _timestamp),
+    (date, lambda value, key: (value.isoformat(), None)),
+    (ObjectId, lambda value, key: (str(value), None)),
+    (pd.Categorical, _categorical),
+    (pd.Index, _index),
+    (pd.Series, _series),
+    (pd.DataFrame, _frame),
+    (dict, _mapping),
+    ((list, tuple, set, frozenset), _sequence),
+    (float, _float),
+    (str, lambda value, key: (str(value), None)),
+    (int, lambda value, key: (int(value), None)),
+)
+
+
+def _handler(kind: type) -> Optional[Callable[[Any, KeyFn], Tuple[Any, Optional[Pending]]]]:
+    handler = _HANDLERS.get(kind)
+    if handler is None:
+        for base, candidate in _FALLBACKS:
+            if issubclass(kind, base):
+                handler = _HANDLERS[kind] = candidate
+                break
+    return handler
+
+
+def _visit(value: Any, key: KeyFn, default: Optional[Callable[[Any], Any]]) -> Tuple[Any, Optional[Pending]]:
+    handler = _handler(type(value))
+    if handler is not None:
+        return handler(value, key)
+    if hasattr(value, "to_dict"):
+        return _visit(value.to_dict(), key, default)
+    if hasattr(value, "item"):
+        return _visit(value.item(), key, default)
+    return (default(value) if default is not None else value), None
+
+
+def normalize(data: Any, key: KeyFn = str, default: Optional[Callable[[Any], Any]] = None) -> Any:
+    """Plain dicts, lists and scalars for any mix of Python, NumPy and pandas values
+
+    Walks the structure once with an explicit stack, so depth is not bounded
+    by the recursion limit. Handlers are looked up by exact type; pandas and
+    NumPy containers convert whole columns at a time, with NaN and NaT
+    becoming None. Mapping keys that are not strings go through ``key``;
+    values of unknown types through ``default`` (kept as they are if None).
+    """
+    kind = type(data)
+    if kind in _PASSTHROUGH:
+        return data
+    result, pending = _visit(data, key, default)
+    stack = [pending] if pending is not None else []
+    while stack:
+        target, items = stack.pop()
+        if type(target) is dict:
+            for label, value in items:
+                if type(label) is not str:
+                    label = key(label)
+                if type(value) in _PASSTHROUGH:
+                    target[label] = value
+                    continue
+                target[label], pending = _visit(value, key, default)
+                if pending is not None:
+                    stack.append(pending)
+        else:
+            append = target.append
+            for value in items:
+                if type(value) in _PASSTHROUGH:
+                    append(value)
+                    continue
+                value, pending = _visit(value, key, default)
+                append(value)
+                if pending is not None:
+                    stack.append(pending)
+    return result
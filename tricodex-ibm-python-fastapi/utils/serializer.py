@@ -1,11 +1,10 @@
 """
 MongoDB data serialization utilities for ProcessLens
 """
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, Union
 import pandas as pd
 from datetime import datetime
-import numpy as np
-import json
+from .normalizer import normalize
 
 class MongoDBSerializer:
     """Serializer for MongoDB-compatible data structures"""
@@ -13,24 +12,7 @@ class MongoDBSerializer:
     @classmethod
     def serialize_for_mongodb(cls, data: Any) -> Any:
         """Convert data structure to MongoDB-compatible format"""
-        if isinstance(data, dict):
-            return {
-                cls._serialize_key(k): cls.serialize_for_mongodb(v)
-                for k, v in data.items()
-            }
-        elif isinstance(data, list):
-            return [cls.serialize_for_mongodb(item) for item in data]
-        elif isinstance(data, tuple):
-            return [cls.serialize_for_mongodb(item) for item in data]
-        elif isinstance(data, (pd.Timestamp, datetime)):
-            return data.isoformat()
-        elif isinstance(data, (np.int64, np.int32)):
-            return int(data)
-        elif isinstance(data, (np.float64, np.float32)):
-            return float(data)
-        elif pd.isna(data):
-            return None
-        return data
+        return normalize(data, key=cls._serialize_key)
     
     @staticmethod
     def _serialize_key(key: Any) -> str:
@@ -74,43 +56,8 @@ class MongoDBSerializer:
         return key
 
 def serialize_analysis_results(results: Dict[str, Any]) -> Dict[str, Any]:
-    """Serialize analysis results for MongoDB storage"""
-    serializer = MongoDBSerializer()
-    
-    # Handle special cases for analysis results
-    def _process_value_counts(data: Dict[str, Any]) -> Dict[str, Any]:
-        if 'top_values' in data:
-            # Convert value_counts to list of tuples for consistent ordering
-            top_values = data['top_values']
-            data['top_values'] = {
-                serializer._serialize_key(k): v
-                for k, v in top_values.items()
-            }
-        return data
-    
-    def _process_warnings(warnings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        for warning in warnings:
-            if 'missing_rate' in warning:
-                warning['missing_rate'] = float(warning['missing_rate'])
-        return warnings
-    
-    # Process the results
-    serialized = {}
-    for key, value in results.items():
-        if isinstance(value, dict):
-            if 'field_stats' in value:
-                # Handle field statistics
-                value['field_stats'] = {
-                    k: _process_value_counts(v)
-                    for k, v in value['field_stats'].items()
-                }
-            if 'warnings' in value:
-                # Handle warnings
-                value['warnings'] = _process_warnings(value['warnings'])
-                
-        serialized[key] = serializer.serialize_for_mongodb(value)
-    
-    return serialized
+    """Serialize analysis results for MongoDB storage in a single pass"""
+    return MongoDBSerializer.serialize_for_mongodb(results)
 
 def deserialize_analysis_results(data: Dict[str, Any]) -> Dict[str, Any]:
     """Deserialize analysis results from MongoDB storage"""
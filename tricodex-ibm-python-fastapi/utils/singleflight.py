@@ -0,0 +1,87 @@
+"""
+Single-flight coalescing of identical concurrent async calls
+"""
+from typing import Dict, Any, Awaitable, Callable, Hashable, Optional, Set, TypeVar
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """Run at most one execution per key; concurrent callers share its result
+
+    The shared execution is shielded, so a caller that is cancelled (a
+    client disconnecting, a timeout, a losing hedge) does not cancel it for
+    the others; only when its last waiter is cancelled is it cancelled too,
+    and only if ``do`` started it. Flights from ``lead`` belong to their
+    leader, which must resolve them.
+    Failures are shared, and the key is released as soon as the
+    execution finishes, so the next call after it starts fresh.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self._owned: Set[asyncio.Future] = set()
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Result of fn(), or of the identical call already in flight"""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(fn())
+            self._owned.add(flight)
+            self._track(key, flight)
+        else:
+            self.coalesced += 1
+        return await self.wait(flight)
+
+    async def wait(self, flight: asyncio.Future) -> Any:
+        """Result of a flight, awaited as one of its waiters"""
+        self._waiters[flight] = self._waiters.get(flight, 0) + 1
+        try:
+            return await asyncio.shield(flight)
+        except asyncio.CancelledError:
+            if self._waiters.get(flight) == 1 and flight in self._owned and not flight.done():
+                # Nobody is left to use the result
+                flight.cancel()
+            raise
+        finally:
+            remaining = self._waiters.get(flight, 1) - 1
+            if remaining > 0:
+                self._waiters[flight] = remaining
+            else:
+                self._waiters.pop(flight, None)
+
+    def waiters(self, flight: asyncio.Future) -> int:
+        """Callers currently awaiting a flight, not counting a leader"""
+        return self._waiters.get(flight, 0)
+
+    def in_flight(self, key: Hashable) -> Optional[asyncio.Future]:
+        return self._flights.get(key)
+
+    def lead(self, key: Hashable) -> asyncio.Future:
+        """Future for an execution the caller runs itself and must resolve"""
+        future = asyncio.get_running_loop().create_future()
+        self._track(key, future)
+        return future
+
+    def _track(self, key: Hashable, flight: asyncio.Future) -> None:
+        self.executions += 1
+        self._flights[key] = flight
+        flight.add_done_callback(lambda done: self._release(key, done))
+
+    def _release(self, key: Hashable, flight: asyncio.Future) -> None:
+        self._owned.discard(flight)
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.cancelled() and flight.exception() is not None:
+            # Retrieved here so a failure nobody awaited is not reported as unhandled
+            logger.debug(f"Single-flight execution for {key!r} failed: {flight.exception()}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._flights), "executions": self.executions, "coalesced": self.coalesced}